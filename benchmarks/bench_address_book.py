@@ -0,0 +1,78 @@
+"""Time fileInfoScript's directory walk over a synthetic instrument tree.
+
+Lays out the acquired files of a generate_dataset.py database as empty sparse
+files under <tmp>/<instrument>/<year>/ (every tenth one as a Bruker .d folder
+holding analysis.tdf, analysis.tdf_bin and a method folder of --method-files
+small files), then times SpectraAddressBook.collect() over it:
+
+    python benchmarks/bench_address_book.py bench.db --files 100000
+
+timsTOF folders are sized from their two analysis files, so collect() time
+should not move with --method-files.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_tree(db, root, limit, method_files=20):
+    conn = sqlite3.connect(db)
+    rows = conn.execute(
+        "SELECT instrument_initial, file_date, filename, size_bytes FROM acquired_file"
+        " ORDER BY id LIMIT ?", (limit,),
+    ).fetchall()
+    conn.close()
+    for n, (inst, day, filename, size) in enumerate(rows):
+        folder = os.path.join(root, inst or "unknown", (day or "0000")[:4])
+        os.makedirs(folder, exist_ok=True)
+        if n % 10 == 0:
+            bruker = os.path.join(folder, filename.rsplit(".", 1)[0] + ".d")
+            method = os.path.join(bruker, "run.m")
+            os.makedirs(method, exist_ok=True)
+            for m in range(method_files):
+                with open(os.path.join(method, f"part{m}.xml"), "wb") as f:
+                    f.write(b"<method/>")
+            with open(os.path.join(bruker, "analysis.tdf"), "wb") as f:
+                f.truncate(4 * 1024 * 1024)
+            path = os.path.join(bruker, "analysis.tdf_bin")
+        else:
+            path = os.path.join(folder, filename)
+        # Sparse: the reported size without the disk space.
+        with open(path, "wb") as f:
+            f.truncate(size or 0)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="database made by generate_dataset.py")
+    parser.add_argument("--files", type=int, default=100000, help="how many acquired files to lay out")
+    parser.add_argument("--method-files", type=int, default=20, help="small files inside each .d folder")
+    parser.add_argument("--keep", action="store_true", help="leave the tree in place afterwards")
+    args = parser.parse_args()
+
+    from fileInfoScript import SpectraAddressBook
+
+    root = tempfile.mkdtemp(prefix="bench-tree-")
+    try:
+        start = time.perf_counter()
+        n = build_tree(args.db, root, args.files, args.method_files)
+        print(f"laid out {n} files in {time.perf_counter() - start:.1f} s under {root}")
+        book = SpectraAddressBook(root, outfile=os.devnull, logfile=os.devnull)
+        start = time.perf_counter()
+        found = sum(1 for _ in book.collect())
+        elapsed = time.perf_counter() - start
+        print(f"collect(): {found} entries in {elapsed:.2f} s ({found / elapsed:,.0f} entries/s)")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
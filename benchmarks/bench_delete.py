@@ -0,0 +1,111 @@
+"""Compare the old per-row experiment delete with the set-based one.
+
+Builds a throwaway database with two identical experiments of N samples, each
+sample with queued runs, deletes one the old way (ORM load of every sample,
+lazy acquired_files check per sample, one DELETE per queued run) and the other
+with the current code path, and reports wall time and SQL statement count:
+
+    python benchmarks/bench_delete.py --samples 1000 --runs-per-sample 3
+
+Samples get no species/cell-line links: with those, the old path fails outright
+(StaleDataError) on any experiment of more than one sample — each lazy load
+autoflushes the previous samples' deletes together with their link rows, and
+the final flush then tries to delete those link rows again.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def populate(conn, experiments, samples, runs_per_sample):
+    conn.executescript("""
+        INSERT INTO user VALUES ('BM', 'Bench Mark', 1);
+        INSERT INTO project VALUES ('BENCH', 'Benchmark', 'benchmark data', 'BM', 1);
+    """)
+    for exp in experiments:
+        conn.execute(
+            "INSERT INTO experiment VALUES ('BENCH', ?, ?, 'benchmark', 'BM', 1)", (exp, exp)
+        )
+        codes = [f"S{n:04d}" for n in range(1, samples + 1)]
+        conn.executemany(
+            "INSERT INTO mass_spec_sample (project_code, experiment_code, code, name,"
+            " description, user_initials, crosslinked_sample) VALUES ('BENCH', ?, ?, ?, 'd', 'BM', 0)",
+            [(exp, c, c) for c in codes],
+        )
+        conn.executemany(
+            "INSERT INTO queued_file (instrument_initial, date_queued, daily_counter, run_number,"
+            " project_code, experiment_code, sample_code, user_initials, postfix)"
+            " VALUES ('X', ?, ?, ?, 'BENCH', ?, ?, 'BM', 'f01')",
+            [
+                (f"2024-{1 + experiments.index(exp):02d}-01", i * runs_per_sample + r + 1,
+                 i * runs_per_sample + r + 1, exp, c)
+                for i, c in enumerate(codes) for r in range(runs_per_sample)
+            ],
+        )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--runs-per-sample", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-delete-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmp, "bench.db")
+    os.environ.setdefault("FLASK_DEBUG", "1")
+
+    import sqlite3
+
+    from sqlalchemy import event
+
+    import app as sample_tracker
+    from models import Experiment, db
+    from views import catalogue
+
+    conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+    conn.execute("PRAGMA foreign_keys=ON")
+    with open(os.path.join(os.path.dirname(sample_tracker.__file__), "schema.sql")) as f:
+        conn.executescript(f.read())
+    populate(conn, ["OLD", "NEW"], args.samples, args.runs_per_sample)
+    conn.close()
+
+    def legacy(project_code, code):
+        experiment = db.session.get(Experiment, (project_code, code))
+        if any(s.acquired_files for s in experiment.samples):
+            raise RuntimeError("experiment has acquired files")
+        for sample in list(experiment.samples):
+            for qf in list(sample.queued_files):
+                db.session.delete(qf)
+            db.session.delete(sample)
+        db.session.delete(experiment)
+        db.session.commit()
+
+    def set_based(project_code, code):
+        experiment = db.session.get(Experiment, (project_code, code))
+        if catalogue._samples_have_files(project_code, code):
+            raise RuntimeError("experiment has acquired files")
+        catalogue._delete_samples(project_code, code)
+        db.session.delete(experiment)
+        db.session.commit()
+
+    with sample_tracker.create_app().app_context():
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(1))
+        print(f"{args.samples} samples x {args.runs_per_sample} queued runs")
+        print(f"{'variant':<10} {'seconds':>9} {'statements':>11}")
+        for label, fn, exp in (("legacy", legacy, "OLD"), ("set-based", set_based, "NEW")):
+            statements.clear()
+            db.session.expunge_all()
+            start = time.perf_counter()
+            fn("BENCH", exp)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<10} {elapsed:>9.3f} {len(statements):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Time the db_match watcher's scan, match and log phases per cycle.
+
+Runs against a folder made by instrument_folder.py, or builds one in a temp
+directory first:
+
+    python benchmarks/instrument_folder.py /tmp/acq --files 100000
+    python benchmarks/bench_match.py /tmp/acq --cycles 5
+    python benchmarks/bench_match.py --files 20000        # throwaway folder
+
+Each cycle does what Run.run_once does in --watch mode — read the pending
+queue, scan the input directory, match and append the TSV log, dump the JSON
+report (to /dev/null here) — and the phases are timed separately. The CPU
+column is process time for the whole cycle; divided by the poll interval it
+is the steady-state load the watcher puts on the acquisition PC.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "db_match"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_cycle(database, scanner, logger):
+    queued, t_queue = _timed(database.get_queued_files)
+    acquired, t_scan = _timed(scanner.scan)
+    _, t_log = _timed(lambda: logger.write(acquisition_files=acquired, queued_files=queued))
+
+    def report():
+        with open(os.devnull, "w") as sink:
+            json.dump([asdict(f) for f in queued], sink, indent=2)
+            json.dump([asdict(f) for f in acquired], sink, indent=2, default=str)
+
+    _, t_report = _timed(report)
+    return {
+        "queued": len(queued), "candidates": len(acquired),
+        "queue_s": t_queue, "scan_s": t_scan, "log_s": t_log, "report_s": t_report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", nargs="?", help="directory made by instrument_folder.py")
+    parser.add_argument("--files", type=int, default=20000, help="size of the throwaway folder")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--poll-seconds", type=float, default=180, help="for the steady-state CPU figure")
+    parser.add_argument("--min-file-size-mb", type=float, default=250)
+    parser.add_argument("--min-file-age-minutes", type=float, default=20)
+    args = parser.parse_args()
+
+    from match_db import AcquisitionDirectoryScanner, MoveAuditLogger, SampleTrackerDB
+
+    workdir = tempfile.mkdtemp(prefix="bench-match-")
+    try:
+        target = args.target
+        if target is None:
+            from instrument_folder import make_folder, make_queue_db
+
+            target = workdir
+            os.makedirs(os.path.join(target, "input"))
+            queued = make_queue_db(os.path.join(target, "samples.db"), args.files)
+            make_folder(os.path.join(target, "input"), queued, args.files,
+                        min_size_mb=args.min_file_size_mb, min_age_minutes=args.min_file_age_minutes)
+
+        database = SampleTrackerDB(Path(target, "samples.db"))
+        scanner = AcquisitionDirectoryScanner(
+            Path(target, "input"), args.min_file_size_mb, args.min_file_age_minutes,
+        )
+        logger = MoveAuditLogger(Path(workdir, "move_log.tsv"))
+
+        print(f"{'cycle':>5} {'queued':>8} {'matched':>8} {'queue s':>8} {'scan s':>8}"
+              f" {'log s':>8} {'report s':>8} {'wall s':>8} {'cpu s':>8}")
+        cpu = []
+        for cycle in range(1, args.cycles + 1):
+            log_size = os.path.getsize(logger.log_tsv_path) if logger.log_tsv_path.exists() else 0
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            with contextlib.redirect_stdout(None):
+                row = run_cycle(database, scanner, logger)
+            wall = time.perf_counter() - wall_start
+            cpu.append(time.process_time() - cpu_start)
+            with logger.log_tsv_path.open(encoding="utf-8") as f:
+                f.seek(log_size)
+                moved = sum(1 for line in f if "\tmoved\t" in line)
+            print(f"{cycle:>5} {row['queued']:>8} {moved:>8} {row['queue_s']:>8.2f} {row['scan_s']:>8.2f}"
+                  f" {row['log_s']:>8.2f} {row['report_s']:>8.2f} {wall:>8.2f} {cpu[-1]:>8.2f}")
+        steady = statistics.median(cpu[1:] or cpu)
+        print(f"steady state: {steady:.2f} s CPU per cycle = "
+              f"{100 * steady / args.poll_seconds:.1f}% of one core at --poll-seconds {args.poll_seconds:g}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Latency and SQL statement count for every GET route.
+
+Point it at a database made by generate_dataset.py (or a copy of a real one):
+
+    python benchmarks/generate_dataset.py bench.db
+    python benchmarks/bench_routes.py bench.db --repeat 10
+
+Each route is requested through the Flask test client, with URL arguments
+taken from the biggest project, experiment and sample in the database (the
+worst case a user can reach from the UI). Reports p50/p95/max wall time and
+the statements issued per request; --json writes the same numbers for
+comparing two runs. Routes whose arguments can't be filled are listed as
+skipped rather than guessed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SKIP_ENDPOINTS = {"static", "reports.debug_queries"}
+
+
+def _fixtures(conn):
+    """Values for URL arguments and query strings, from the biggest rows."""
+    project, experiment, sample = None, None, None
+    biggest_project = conn.execute(
+        "SELECT project_code FROM acquired_file GROUP BY project_code ORDER BY count(*) DESC LIMIT 1"
+    ).fetchone()
+    if biggest_project:
+        project = biggest_project[0]
+        experiment, sample = conn.execute(
+            "SELECT experiment_code, sample_code FROM acquired_file WHERE project_code = ?"
+            " GROUP BY experiment_code, sample_code ORDER BY count(*) DESC LIMIT 1",
+            (project,),
+        ).fetchone()
+
+    def one(sql):
+        row = conn.execute(sql).fetchone()
+        return row[0] if row else None
+
+    instrument, day = conn.execute(
+        "SELECT instrument_initial, date_queued FROM queued_file"
+        " ORDER BY date_queued DESC, instrument_initial LIMIT 1"
+    ).fetchone() or (None, None)
+    day = day.replace("-", "") if day else None  # the queue API takes YYYYMMDD
+    return {
+        "args": {
+            "code": sample,
+            "project_code": project,
+            "experiment_code": experiment,
+            "id": one("SELECT max(id) FROM acquired_file"),
+            "initial": one("SELECT initial FROM instrument LIMIT 1"),
+            "initials": one("SELECT initials FROM user LIMIT 1"),
+            "cellosaurus_id": one("SELECT cellosaurus_id FROM cell_line LIMIT 1"),
+        },
+        # Routes whose args name something other than a sample.
+        "code_for": {
+            "catalogue.project_detail": project, "catalogue.project_edit": project,
+            "catalogue.experiment_detail": experiment, "catalogue.experiment_edit": experiment,
+        },
+        "ids": {
+            "species": one("SELECT id FROM species LIMIT 1"),
+            "virus": one("SELECT id FROM virus LIMIT 1"),
+            "file": one("SELECT max(id) FROM acquired_file"),
+        },
+        "query": {
+            "catalogue.api_tree_children": {"level": "sample", "project": project,
+                                            "experiment": experiment, "sample": sample},
+            "catalogue.api_choices_experiments": {"project": project, "q": "E"},
+            "catalogue.api_choices_samples": {"project": project, "q": "S"},
+            "catalogue.api_choices_cell_lines": {"q": "H"},
+            "catalogue.api_search": {"q": "liver"},
+            "catalogue.search_page": {"q": "liver"},
+            "queue.api_queue": {"date": day},
+            "queue.api_queue_csv": {"instrument": instrument, "date": day},
+        },
+    }
+
+
+def _urls(app, fixtures):
+    from urllib.parse import urlencode
+
+    from flask import url_for
+
+    urls, skipped = [], []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+            if "GET" not in rule.methods or rule.endpoint in SKIP_ENDPOINTS:
+                continue
+            values = {}
+            for arg in rule.arguments:
+                if arg == "id":
+                    prefix = rule.rule.split("/")[1]
+                    value = fixtures["ids"].get({"viruses": "virus", "files": "file"}.get(prefix, prefix))
+                elif arg == "code" and rule.endpoint in fixtures["code_for"]:
+                    value = fixtures["code_for"][rule.endpoint]
+                else:
+                    value = fixtures["args"].get(arg)
+                if value is None:
+                    break
+                values[arg] = value
+            else:
+                url = url_for(rule.endpoint, **values)
+                query = fixtures["query"].get(rule.endpoint)
+                if query:
+                    url += "?" + urlencode(query)
+                urls.append((rule.endpoint, url))
+                continue
+            skipped.append(rule.endpoint)
+    return urls, skipped
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="database to benchmark against")
+    parser.add_argument("--repeat", type=int, default=5, help="requests per route (after one warm-up)")
+    parser.add_argument("--only", help="only endpoints containing this text")
+    parser.add_argument("--json", dest="json_path", help="also write the results here")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.abspath(args.db)
+    os.environ.setdefault("FLASK_DEBUG", "1")
+    import sqlite3
+
+    import app as sample_tracker
+    import query_profiler
+
+    conn = sqlite3.connect(args.db)
+    fixtures = _fixtures(conn)
+    conn.close()
+
+    app = sample_tracker.create_app()
+    urls, skipped = _urls(app, fixtures)
+    if args.only:
+        urls = [(e, u) for e, u in urls if args.only in e]
+    client = app.test_client()
+
+    results = []
+    print(f"{'endpoint':<36} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'stmts':>7}")
+    failed = []
+    for endpoint, url in urls:
+        try:
+            client.get(url)
+        except Exception as exc:
+            failed.append(f"{endpoint} ({type(exc).__name__}: {exc})")
+            continue
+        timings, statements = [], []
+        for _ in range(args.repeat):
+            with query_profiler.collecting() as log:
+                start = time.perf_counter()
+                response = client.get(url)
+                response.get_data()
+                timings.append((time.perf_counter() - start) * 1000)
+            statements.append(log.count)
+        row = {
+            "endpoint": endpoint, "url": url, "status": response.status_code,
+            "p50_ms": statistics.median(timings), "p95_ms": _percentile(timings, 95),
+            "max_ms": max(timings), "statements": max(statements),
+        }
+        results.append(row)
+        print(f"{endpoint:<36} {row['status']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f}"
+              f" {row['max_ms']:>9.1f} {row['statements']:>7}")
+    for failure in failed:
+        print("failed:", failure)
+    if skipped:
+        print("skipped (no fixture for the URL arguments):", ", ".join(skipped))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"db": args.db, "repeat": args.repeat, "routes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
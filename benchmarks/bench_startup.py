@@ -0,0 +1,84 @@
+"""Startup cost: importing the app, building it, its first requests, and a
+CLI command.
+
+    python benchmarks/bench_startup.py bench.db --repeat 7
+
+Every measurement runs in a fresh interpreter, as a gunicorn worker or a
+`flask` command starts, and the median of --repeat runs is reported:
+
+- import: ``import app`` (Flask, SQLAlchemy, models, forms, the eager
+  blueprints);
+- create_app: building the app object;
+- first page / first report: the first request to /projects and to
+  /instrument-stats after create_app, which include compiling their
+  templates, SQLAlchemy's first statement compilation and, for the report,
+  importing the lazily registered reports module;
+- flask migrate-db: the whole command on an up-to-date database, and the
+  same through ``python schema_migration.py``, which needs no web stack.
+
+Each run also checks which view modules were loaded at startup, so a
+regression that imports the reports eagerly shows up.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+application = app.create_app()
+t2 = time.perf_counter()
+loaded = sorted(m for m in sys.modules if m.startswith("views."))
+client = application.test_client()
+assert client.get("/projects").status_code == 200
+t3 = time.perf_counter()
+assert client.get("/instrument-stats").status_code == 200
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first page": t3 - t2,
+                  "first report": t4 - t3, "loaded": loaded}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="database to start against")
+    parser.add_argument("--repeat", type=int, default=7, help="fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.abspath(args.db))
+    env.setdefault("FLASK_DEBUG", "1")
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.splitlines()[-1]))
+    commands = {
+        "flask migrate-db": [sys.executable, "-m", "flask", "--app", "app", "migrate-db"],
+        "schema_migration": [sys.executable, "schema_migration.py", os.path.abspath(args.db)],
+        "(bare python)": [sys.executable, "-c", "pass"],
+    }
+    wall = {name: [] for name in commands}
+    for _ in range(args.repeat):
+        for name, command in commands.items():
+            start = time.perf_counter()
+            subprocess.run(command, cwd=ROOT, env=env, capture_output=True, check=True)
+            wall[name].append(time.perf_counter() - start)
+
+    print(f"{'step':<18} {'median ms':>10}")
+    for step in ("import", "create_app", "first page", "first report"):
+        print(f"{step:<18} {statistics.median(r[step] for r in runs) * 1000:>10.1f}")
+    for name, times in wall.items():
+        print(f"{name:<18} {statistics.median(times) * 1000:>10.1f}")
+    print("view modules loaded at startup:", ", ".join(runs[0]["loaded"]) or "none")
+
+
+if __name__ == "__main__":
+    main()
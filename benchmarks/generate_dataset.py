@@ -0,0 +1,186 @@
+"""Populate a fresh samples.db with a synthetic, lab-scale catalogue.
+
+Volumes default to a few years of a busy facility and are all configurable:
+
+    python benchmarks/generate_dataset.py bench.db \\
+        --projects 200 --samples 20000 --files 500000 --queue-years 5
+
+Every acquired file is the acquisition of a queued run (its filename is the
+run's file_name_root + postfix + ".raw"), so the queue history, the
+acquisitions and the instrument statistics all line up the way they do in
+production. Runs older than a week are marked exported. The same --seed always
+produces the same database.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schema.sql")
+
+TISSUES = ["liver", "kidney", "brain", "heart", "lung", "plasma", "muscle", None]
+DISEASES = ["healthy", "hepatocellular carcinoma", "glioblastoma", "fibrosis", None]
+CROSSLINKERS = ["DSSO", "BS3", "DSBU", "SDA", "PhoX"]
+CELL_LINES = [
+    ("CVCL_0030", "HeLa"), ("CVCL_0045", "HEK293"), ("CVCL_0063", "HepG2"),
+    ("CVCL_0023", "A-549"), ("CVCL_0031", "MCF-7"), ("CVCL_0004", "K-562"),
+    ("CVCL_0065", "Jurkat"), ("CVCL_0291", "U2OS"), ("CVCL_0034", "Caco-2"),
+    ("CVCL_0033", "HCT 116"),
+]
+
+
+def _days(start, end):
+    return [start + timedelta(n) for n in range((end - start).days + 1)]
+
+
+def generate(conn, args):
+    rng = random.Random(args.seed)
+    today = date.today()
+    history = _days(today - timedelta(days=365 * args.queue_years), today)
+
+    users = [f"U{n:02d}" for n in range(args.users)]
+    conn.executemany(
+        "INSERT INTO user (initials, name, active) VALUES (?, ?, 1)",
+        [(u, f"User {u}") for u in users],
+    )
+    instruments = [chr(ord("A") + n) for n in range(args.instruments)]
+    conn.executemany(
+        "INSERT INTO instrument (initial, name, sequence_template) VALUES (?, ?, ?)",
+        [(i, f"Instrument {i}", rng.choice(["xcalibur", "hystar", "sciex"])) for i in instruments],
+    )
+    conn.executemany(
+        "INSERT INTO species (id, species_name, species_taxon) VALUES (?, ?, ?)",
+        [(1, "Homo sapiens", "9606"), (2, "Mus musculus", "10090"), (3, "Escherichia coli", "562")],
+    )
+    conn.executemany(
+        "INSERT INTO cell_line (cellosaurus_id, cell_line_name, species_id) VALUES (?, ?, 1)",
+        CELL_LINES,
+    )
+    conn.execute("INSERT INTO virus (id, name, species_id, variant) VALUES (1, 'SARS-CoV-2', 1, 'B.1.1.7')")
+
+    projects = [f"P{n:03d}" for n in range(1, args.projects + 1)]
+    conn.executemany(
+        "INSERT INTO project (code, name, description, user_initials, active) VALUES (?, ?, ?, ?, ?)",
+        [(p, f"Project {p}", f"Synthetic project {p}", rng.choice(users), int(rng.random() > 0.2))
+         for p in projects],
+    )
+    experiments = [
+        (p, f"E{n:02d}") for p in projects for n in range(1, args.experiments_per_project + 1)
+    ]
+    conn.executemany(
+        "INSERT INTO experiment (project_code, code, name, description, user_initials, active)"
+        " VALUES (?, ?, ?, ?, ?, 1)",
+        [(p, e, f"Experiment {p}/{e}", "Synthetic experiment", rng.choice(users)) for p, e in experiments],
+    )
+
+    per_experiment = defaultdict(int)
+    samples = []
+    for _ in range(args.samples):
+        p, e = rng.choice(experiments)
+        per_experiment[p, e] += 1
+        samples.append((p, e, f"S{per_experiment[p, e]:02d}", rng.choice(users)))
+    conn.executemany(
+        "INSERT INTO mass_spec_sample (project_code, experiment_code, code, name, description,"
+        " user_initials, tissue, disease, crosslinked_sample, crosslinker)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (p, e, s, f"Sample {s} of {p}/{e}", "Synthetic sample", u,
+             rng.choice(TISSUES), rng.choice(DISEASES), xl, rng.choice(CROSSLINKERS) if xl else None)
+            for p, e, s, u in samples
+            for xl in [int(rng.random() < 0.3)]
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO sample_species (project_code, experiment_code, sample_code, species_id)"
+        " VALUES (?, ?, ?, ?)",
+        [(p, e, s, rng.choice((1, 1, 1, 2, 3))) for p, e, s, _ in samples],
+    )
+    conn.executemany(
+        "INSERT INTO sample_cell_line (project_code, experiment_code, sample_code, cellosaurus_id)"
+        " VALUES (?, ?, ?, ?)",
+        [(p, e, s, rng.choice(CELL_LINES)[0]) for p, e, s, _ in samples if rng.random() < 0.6],
+    )
+
+    # One queued run per acquired file, plus a blank before roughly every
+    # tenth, spread over the history in date order.
+    runs = sorted(
+        (rng.choice(history), rng.choice(instruments), rng.choice(samples))
+        for _ in range(args.files)
+    )
+    counters = defaultdict(int)
+    run_numbers = defaultdict(int)
+    queue, files = [], []
+    exported_before = today - timedelta(days=7)
+    for day, inst, (p, e, s, u) in runs:
+        key = inst, day
+        exported = int(day < exported_before)
+        if rng.random() < 0.1:
+            counters[key] += 1
+            queue.append((inst, day, counters[key], None, None, None, None, None, "", exported))
+        counters[key] += 1
+        run_numbers[key] += 1
+        postfix = f"f{rng.randint(1, 3):02d}"
+        queue.append((inst, day, counters[key], run_numbers[key], p, e, s, u, postfix, exported))
+        filename = f"{inst}_{day:%Y%m%d}-{run_numbers[key]:03d}_{p}_{u}_{e}_{s}_{postfix}.raw"
+        acquired = day + timedelta(days=int(rng.random() < 0.15))
+        size = int(rng.lognormvariate(21.2, 0.6))  # median ~1.6 GB
+        files.append((p, e, s, f"/data/{inst}/{acquired:%Y}/{filename}", filename, size, inst, acquired, u))
+    conn.executemany(
+        "INSERT INTO queued_file (instrument_initial, date_queued, daily_counter, run_number,"
+        " project_code, experiment_code, sample_code, user_initials, postfix, exported)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, d.isoformat(), *rest) for i, d, *rest in queue],
+    )
+    conn.executemany(
+        "INSERT INTO acquired_file (project_code, experiment_code, sample_code, location, filename,"
+        " size_bytes, instrument_initial, file_date, user_initials) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(*head, d.isoformat(), u) for *head, d, u in files],
+    )
+    return {
+        "projects": len(projects), "experiments": len(experiments), "samples": len(samples),
+        "queued runs": len(queue), "acquired files": len(files),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="database file to create")
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--experiments-per-project", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--files", type=int, default=500000)
+    parser.add_argument("--queue-years", type=int, default=5)
+    parser.add_argument("--instruments", type=int, default=4)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="replace an existing database file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            sys.exit(f"{args.db} exists; pass --force to replace it")
+        os.remove(args.db)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys=ON")
+    with open(SCHEMA) as f:
+        conn.executescript(f.read())
+    # A throwaway file: skip the journal and fsyncs while loading.
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        counts = generate(conn, args)
+    conn.execute("ANALYZE")
+    conn.close()
+    for what, n in counts.items():
+        print(f"{n:>9} {what}")
+    print(f"wrote {args.db} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
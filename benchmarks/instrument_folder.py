@@ -0,0 +1,145 @@
+"""Fake instrument output folder plus the queue it was acquired from.
+
+Creates a samples.db holding a pending (unexported) queue and a folder of
+sparse raw files named the way the instruments name them — the queued run's
+file_name_root + postfix + ".raw" — with controlled sizes and mtimes, so the
+db_match watcher can be exercised without an instrument PC:
+
+    python benchmarks/instrument_folder.py /tmp/acq --files 100000
+
+Besides the acquisitions of queued runs the folder gets the other things the
+watcher has to skip: blanks and washes below the size threshold, runs still
+being written (mtime within the age threshold), files that were never queued,
+and unrelated clutter. Fractions of each are flags; the sizes on disk are
+sparse, so 100k files of a few GB each cost next to nothing.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schema.sql")
+
+MB = 1024 * 1024
+
+
+def make_queue_db(db_path, runs, instruments=("A", "B", "C", "D"), days=30, seed=1):
+    """Create ``db_path`` with ``runs`` pending sample runs spread over the
+    last ``days`` days; returns [(file_name_root, postfix)] in queue order."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys=ON")
+    with open(SCHEMA) as f:
+        conn.executescript(f.read())
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        conn.execute("INSERT INTO user (initials, name) VALUES ('BM', 'Bench Mark')")
+        conn.execute("INSERT INTO project (code, name, description, user_initials) VALUES ('BENCH', 'Bench', 'd', 'BM')")
+        conn.execute(
+            "INSERT INTO experiment (project_code, code, name, description, user_initials)"
+            " VALUES ('BENCH', 'E01', 'Bench', 'd', 'BM')"
+        )
+        samples = [f"S{n:03d}" for n in range(1, 201)]
+        conn.executemany(
+            "INSERT INTO mass_spec_sample (project_code, experiment_code, code, name, description,"
+            " user_initials) VALUES ('BENCH', 'E01', ?, ?, 'd', 'BM')",
+            [(s, s) for s in samples],
+        )
+        today = date.today()
+        counters = {}
+        rows = []
+        for n in range(runs):
+            inst = instruments[n % len(instruments)]
+            day = today - timedelta(days=rng.randrange(days))
+            counter = counters[inst, day] = counters.get((inst, day), 0) + 1
+            rows.append((inst, day.isoformat(), counter, counter, rng.choice(samples), f"f{rng.randint(1, 3):02d}"))
+        conn.executemany(
+            "INSERT INTO queued_file (instrument_initial, date_queued, daily_counter, run_number,"
+            " project_code, experiment_code, sample_code, user_initials, postfix, exported)"
+            " VALUES (?, ?, ?, ?, 'BENCH', 'E01', ?, 'BM', ?, 0)",
+            rows,
+        )
+        names = conn.execute(
+            "SELECT file_name_root, postfix FROM queued_file"
+            " ORDER BY date_queued, instrument_initial, daily_counter"
+        ).fetchall()
+    conn.close()
+    return names
+
+
+def make_folder(root, queued, files, small=0.1, recent=0.05, unqueued=0.1, clutter=0.05,
+                min_size_mb=250, min_age_minutes=20, subfolders=50, seed=1):
+    """Fill ``root`` with ``files`` sparse files; returns how many of each
+    kind were written."""
+    rng = random.Random(seed)
+    now = time.time()
+    counts = {"acquired": 0, "small": 0, "recent": 0, "unqueued": 0, "clutter": 0}
+    for n in range(files):
+        folder = os.path.join(root, f"batch{n % subfolders:03d}")
+        os.makedirs(folder, exist_ok=True)
+        roll = rng.random()
+        size = int(rng.uniform(min_size_mb * 2, min_size_mb * 16) * MB)
+        mtime = now - rng.uniform(min_age_minutes * 2, 60 * 24 * 30) * 60
+        root_name, postfix = queued[n % len(queued)]
+        name = f"{root_name}{postfix}.raw"
+        if roll < small:
+            kind, size = "small", int(rng.uniform(1, min_size_mb / 2) * MB)
+        elif roll < small + recent:
+            kind, mtime = "recent", now - rng.uniform(0, min_age_minutes / 2) * 60
+        elif roll < small + recent + unqueued:
+            # Same shape as a queued run, but a run number never handed out.
+            kind = "unqueued"
+            name = name.replace("-", f"-9{n % 100:02d}", 1)
+        elif roll < small + recent + unqueued + clutter:
+            kind, name = "clutter", f"method_export_{n}.txt"
+        else:
+            kind = "acquired"
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            # More files than queued runs: re-acquisitions of the same run.
+            path = os.path.join(folder, f"reacquired{n}", name)
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.truncate(size)
+        os.utime(path, (mtime, mtime))
+        counts[kind] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("target", help="directory to create; gets samples.db and input/")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--queued-runs", type=int, help="pending runs in the queue (default: --files)")
+    parser.add_argument("--small", type=float, default=0.1, help="fraction below the size threshold")
+    parser.add_argument("--recent", type=float, default=0.05, help="fraction still being written")
+    parser.add_argument("--unqueued", type=float, default=0.1, help="fraction with no queued run")
+    parser.add_argument("--clutter", type=float, default=0.05, help="fraction of unrelated files")
+    parser.add_argument("--min-file-size-mb", type=float, default=250)
+    parser.add_argument("--min-file-age-minutes", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.target):
+        sys.exit(f"{args.target} exists; choose a new directory")
+    input_dir = os.path.join(args.target, "input")
+    os.makedirs(input_dir)
+    start = time.perf_counter()
+    queued = make_queue_db(os.path.join(args.target, "samples.db"), args.queued_runs or args.files, seed=args.seed)
+    counts = make_folder(
+        input_dir, queued, args.files, small=args.small, recent=args.recent,
+        unqueued=args.unqueued, clutter=args.clutter, min_size_mb=args.min_file_size_mb,
+        min_age_minutes=args.min_file_age_minutes, seed=args.seed,
+    )
+    print(f"{len(queued):>9} queued runs")
+    for kind, n in counts.items():
+        print(f"{n:>9} {kind}")
+    print(f"wrote {args.target} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
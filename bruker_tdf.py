@@ -0,0 +1,66 @@
+"""Bruker timsTOF ``.d`` acquisitions, read without walking the folder.
+
+A timsTOF run is a directory holding ``analysis.tdf`` (an SQLite database of
+frame and run metadata) and ``analysis.tdf_bin`` (the spectra), next to a
+method folder and assorted small files. Walking the whole tree to size it
+costs one stat per internal file; the two analysis files are all but the
+whole of it, so ``folder_size`` stats just those. ``read_tdf`` takes the frame
+count, acquisition time, run duration and instrument from ``analysis.tdf``,
+opened read-only so a run still being written (or on a read-only share) is
+never locked or modified.
+
+Standard library only, so the standalone address-book script can use it.
+"""
+import os
+import sqlite3
+from pathlib import Path
+
+TDF = "analysis.tdf"
+# The files that make up a run's size; anything else in the folder (method,
+# sample info, logs) is a few MB at most.
+DATA_FILES = ("analysis.tdf", "analysis.tdf_bin")
+
+
+def is_tdf_folder(path):
+    return os.path.isfile(os.path.join(path, TDF))
+
+
+def folder_size(path):
+    """Bytes in the run's data files, or None if ``path`` is not a TDF
+    folder (e.g. an older BAF acquisition), for the caller to size otherwise."""
+    total = 0
+    found = False
+    for name in DATA_FILES:
+        try:
+            total += os.stat(os.path.join(path, name)).st_size
+            found = True
+        except FileNotFoundError:
+            pass
+    return total if found else None
+
+
+def _metadata(conn):
+    try:
+        return dict(conn.execute("SELECT Key, Value FROM GlobalMetadata"))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def read_tdf(path):
+    """Run metadata from ``path``/analysis.tdf; raises sqlite3.Error if the
+    file is missing or not a TDF database."""
+    uri = Path(path, TDF).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        frames, first, last = conn.execute("SELECT count(*), min(Time), max(Time) FROM Frames").fetchone()
+        meta = _metadata(conn)
+    finally:
+        conn.close()
+    return {
+        "format": "Bruker TDF",
+        "scan_count": frames,
+        "instrument_model": meta.get("InstrumentName"),
+        "start_time": meta.get("AcquisitionDateTime"),
+        # Frames.Time is seconds from the start of the run.
+        "run_duration_minutes": round((last - first) / 60, 3) if frames else None,
+    }
@@ -0,0 +1,148 @@
+"""Parquet output for file inventories: the address book and acquired_file.
+
+Both are written as typed columns — sizes as int64, modification times as
+timestamps, the instrument and acquisition date parsed from queue-style
+filenames — in record batches as the rows arrive, so a scan or an export of
+millions of rows never holds more than one batch in memory and the result
+loads straight into pandas/Arrow without re-parsing strings.
+
+pyarrow is optional: it is imported when a writer is opened, which raises
+ParquetUnavailable without it.
+"""
+import os
+import re
+from datetime import date, datetime, timezone
+
+# INST_YYYYMMDD-NNN_..., the name every queued run is given.
+_QUEUE_NAME = re.compile(r"^([A-Za-z0-9]+)_(\d{4})(\d{2})(\d{2})[-_]")
+
+BATCH_ROWS = 64 * 1024
+
+
+class ParquetUnavailable(RuntimeError):
+    pass
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ParquetUnavailable("Parquet output needs pyarrow: pip install pyarrow") from exc
+    return pa, pq
+
+
+def parse_name(file_name):
+    """(instrument, acquisition date) from a queue-style filename, else
+    (None, None)."""
+    match = _QUEUE_NAME.match(file_name or "")
+    if not match:
+        return None, None
+    try:
+        return match.group(1), date(int(match.group(2)), int(match.group(3)), int(match.group(4)))
+    except ValueError:
+        return match.group(1), None
+
+
+def extension(file_name):
+    return os.path.splitext(file_name or "")[1].lower().lstrip(".") or None
+
+
+class BatchWriter:
+    """Append rows (dicts keyed by column) to a Parquet file, one record
+    batch at a time. ``columns`` is [(name, pyarrow type factory name, args)]
+    so the module imports without pyarrow."""
+
+    def __init__(self, path, columns, batch_rows=BATCH_ROWS):
+        pa, pq = _pyarrow()
+        self._pa = pa
+        self.schema = pa.schema([(name, getattr(pa, kind)(*args)) for name, kind, args in columns])
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._pending = []
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._writer.write_batch(self._pa.RecordBatch.from_pylist(self._pending, schema=self.schema))
+            self.rows += len(self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+ADDRESS_BOOK_COLUMNS = [
+    ("file_name", "string", ()),
+    ("location", "string", ()),
+    ("size_bytes", "int64", ()),
+    ("mtime", "timestamp", ("ms", "UTC")),
+    ("extension", "string", ()),
+    ("instrument", "string", ()),
+    ("acquired_date", "date32", ()),
+]
+
+
+def address_book_row(file_name, location, size, mtime):
+    instrument, acquired = parse_name(file_name)
+    return {
+        "file_name": file_name,
+        "location": location,
+        "size_bytes": size,
+        "mtime": datetime.fromtimestamp(mtime, timezone.utc) if mtime is not None else None,
+        "extension": extension(file_name),
+        "instrument": instrument,
+        "acquired_date": acquired,
+    }
+
+
+ACQUIRED_FILE_COLUMNS = [
+    ("id", "int64", ()),
+    ("project_code", "string", ()),
+    ("experiment_code", "string", ()),
+    ("sample_code", "string", ()),
+    ("filename", "string", ()),
+    ("location", "string", ()),
+    ("size_bytes", "int64", ()),
+    ("instrument_initial", "string", ()),
+    ("file_date", "date32", ()),
+    ("user_initials", "string", ()),
+    ("scan_count", "int64", ()),
+    ("extension", "string", ()),
+    ("run_name", "string", ()),
+]
+
+
+def write_acquired_files(session, path, batch_rows=BATCH_ROWS):
+    """Export acquired_file to ``path``, streaming the rows; returns the
+    number written."""
+    # Imported here: fileInfoScript.py uses this module on hosts without SQLAlchemy.
+    from sqlalchemy import text
+
+    result = session.execute(
+        text(
+            "SELECT id, project_code, experiment_code, sample_code, filename, location, size_bytes,"
+            " instrument_initial, file_date, user_initials, scan_count, run_name"
+            " FROM acquired_file ORDER BY id"
+        ),
+        execution_options={"yield_per": batch_rows},
+    )
+    with BatchWriter(path, ACQUIRED_FILE_COLUMNS, batch_rows) as writer:
+        for row in result:
+            record = row._asdict()
+            record["file_date"] = date.fromisoformat(row.file_date[:10]) if row.file_date else None
+            record["extension"] = extension(row.filename)
+            writer.write(record)
+    return writer.rows
@@ -0,0 +1,174 @@
+"""Flask CLI commands (``flask --app app <command>``): creating and migrating
+the database, archiving the queue, and the batch jobs over acquired files.
+
+Registered on the app as a blueprint without a CLI group, so the commands
+stay top-level. Each imports the module it drives when it runs, so starting
+one command doesn't load what the others need.
+"""
+import os
+
+import click
+from flask import Blueprint, current_app
+from sqlalchemy import func, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import QueueHighWater, QueuedFile, QueuedFileArchive, db
+
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+@bp.cli.command("init-db")
+def init_db():
+    """Create database tables from schema.sql."""
+    import schema_migration
+
+    db_path = current_app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", "")
+    schema_migration.init(db_path, schema_migration.read_schema())
+    click.echo(f"Initialized database at {db_path}")
+
+
+@bp.cli.command("migrate-db")
+def migrate_db():
+    """Update an existing database to match schema.sql.
+
+    Creates missing tables, rebuilds any table whose columns differ from
+    schema.sql (keeping the data of the columns both share), and recreates
+    indexes, triggers and views that differ. Safe to re-run: an up-to-date
+    database is left alone.
+    """
+    import schema_migration
+
+    db_path = current_app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", "")
+    try:
+        changes = schema_migration.migrate_path(db_path, schema_migration.read_schema())
+    except schema_migration.MigrationError as exc:
+        raise click.ClickException(str(exc))
+    for change in changes:
+        click.echo(change)
+    if changes:
+        click.echo(f"Applied {len(changes)} change(s) to {db_path}.")
+    else:
+        click.echo(f"{db_path} is already up to date.")
+
+
+@bp.cli.command("archive-queue")
+@click.option(
+    "--before", required=True, type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Archive exported runs queued before this date (YYYY-MM-DD).",
+)
+@click.option("--vacuum", is_flag=True, help="VACUUM the database afterwards to reclaim space.")
+def archive_queue(before, vacuum):
+    """Move old exported queue rows into queued_file_archive.
+
+    Keeps queued_file (and every pending-row filter and MAX() over it) small.
+    The per-(instrument, day) numbering maxima of the moved rows are folded into
+    queue_high_water first, so run numbers are never re-issued. All three steps
+    run in one transaction.
+    """
+    cutoff = before.date()
+    archivable = (QueuedFile.exported == true()) & (QueuedFile.date_queued < cutoff)
+    high_water = sqlite_insert(QueueHighWater).from_select(
+        ["instrument_initial", "date_queued", "daily_counter", "run_number"],
+        db.select(
+            QueuedFile.instrument_initial, QueuedFile.date_queued,
+            func.max(QueuedFile.daily_counter), func.coalesce(func.max(QueuedFile.run_number), 0),
+        ).where(archivable).group_by(QueuedFile.instrument_initial, QueuedFile.date_queued),
+    )
+    high_water = high_water.on_conflict_do_update(
+        index_elements=["instrument_initial", "date_queued"],
+        set_={
+            "daily_counter": func.max(QueueHighWater.daily_counter, high_water.excluded.daily_counter),
+            "run_number": func.max(QueueHighWater.run_number, high_water.excluded.run_number),
+        },
+    )
+    columns = [
+        "instrument_initial", "date_queued", "daily_counter", "run_number", "project_code",
+        "experiment_code", "sample_code", "user_initials", "postfix", "file_name_root",
+    ]
+    db.session.execute(high_water)
+    moved = db.session.execute(
+        db.insert(QueuedFileArchive).from_select(
+            columns, db.select(*(getattr(QueuedFile, c) for c in columns)).where(archivable)
+        )
+    ).rowcount
+    db.session.execute(db.delete(QueuedFile).where(archivable))
+    db.session.commit()
+    click.echo(f"Archived {moved} exported queue row(s) queued before {cutoff:%Y-%m-%d}.")
+    if vacuum:
+        db.session.execute(db.text("VACUUM"))
+        click.echo("Vacuumed database.")
+
+
+@bp.cli.command("refresh-instrument-stats")
+@click.option("--full", is_flag=True, help="Recompute every day, not just those changed since the last refresh.")
+def refresh_instrument_stats(full):
+    """Recompute instrument_day_stats for days touched since the last run.
+
+    Meant to run nightly (e.g. from cron); the first run on a database with an
+    empty stats table is always a full rebuild.
+    """
+    import instrument_stats
+
+    days = instrument_stats.refresh(db.session, full=full)
+    click.echo(f"Refreshed instrument statistics for {days} instrument day(s).")
+
+
+@bp.cli.command("extract-raw-metadata")
+@click.option("--workers", type=int, default=None, help="Parallel extraction processes (default: one per CPU).")
+@click.option("--batch-size", type=int, default=500, show_default=True, help="Rows written per commit.")
+@click.option("--limit", type=int, default=None, help="Stop after this many files.")
+@click.option("--force", is_flag=True, help="Re-read files that already have a scan count.")
+def extract_raw_metadata(workers, batch_size, limit, force):
+    """Fill scan_count and meta for acquired mzML/MGF files and timsTOF .d runs.
+
+    Reads spectrum count, instrument model, start time and run duration from
+    each file at its recorded location. Results are cached per (path, size,
+    mtime), so re-runs only parse new or changed files.
+    """
+    import raw_metadata
+
+    cache = raw_metadata.MetadataCache(
+        current_app.config["RAW_METADATA_CACHE"]
+        or os.path.join(current_app.instance_path, "raw_metadata_cache.sqlite")
+    )
+    try:
+        stats = raw_metadata.refresh(
+            db.session, cache, workers=workers, batch_size=batch_size, force=force, limit=limit,
+            progress=lambda message: click.echo(message, err=True),
+        )
+    finally:
+        cache.close()
+    click.echo(
+        f"Extracted {stats['extracted']}, from cache {stats['cached']}, "
+        f"missing on disk {stats['missing']}, failed {stats['failed']}."
+    )
+
+
+@bp.cli.command("export-acquired-files")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+def export_acquired_files(path):
+    """Write acquired_file to a Parquet file at PATH (needs pyarrow).
+
+    Typed columns (int64 sizes, dates), streamed in record batches, for
+    storage analysis in pandas/Arrow.
+    """
+    import columnar
+
+    try:
+        rows = columnar.write_acquired_files(db.session, path)
+    except columnar.ParquetUnavailable as exc:
+        raise click.ClickException(str(exc))
+    click.echo(f"Exported {rows} acquired file(s) to {path}.")
+
+
+@bp.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    """Repopulate the full-text search index from the catalogue tables.
+
+    Triggers keep the index current on their own; this is for databases that
+    predate it, or after editing tables with the triggers bypassed.
+    """
+    import search
+
+    count = search.rebuild(db.session)
+    click.echo(f"Indexed {count} record(s).")
@@ -22,3 +22,26 @@ class Config:
         "DATABASE_URL", "sqlite:///" + os.path.join(basedir, "samples.db")
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Generated instrument sequence files, keyed on the queue version. Defaults
+    # to <instance>/sequence_cache.
+    SEQUENCE_CACHE_DIR = os.environ.get("SEQUENCE_CACHE_DIR")
+    SEQUENCE_CACHE_MAX_FILES = int(os.environ.get("SEQUENCE_CACHE_MAX_FILES", 500))
+    # Per-request SQL profiling (Server-Timing header and /debug/queries).
+    # Development only: the report shows recent request paths and SQL.
+    QUERY_PROFILING = os.environ.get("QUERY_PROFILING", "").lower() in ("1", "true", "on")
+    QUERY_PROFILE_HISTORY = int(os.environ.get("QUERY_PROFILE_HISTORY", 200))
+    # Statements one request may issue before it is logged (raised under
+    # TESTING) as a likely N+1; unset for no budget.
+    QUERY_STATEMENT_BUDGET = int(os.environ.get("QUERY_STATEMENT_BUDGET") or 0) or None
+    # Cache of metadata extracted from mzML/MGF files, keyed on (path, size,
+    # mtime). Defaults to <instance>/raw_metadata_cache.sqlite.
+    RAW_METADATA_CACHE = os.environ.get("RAW_METADATA_CACHE")
+    # Rows shown per list (missing runs, orphan files) on /reconciliation.
+    RECONCILIATION_LIMIT = int(os.environ.get("RECONCILIATION_LIMIT") or 500)
+    # Text responses at least this large are sent gzip/brotli-compressed
+    # (streamed pages always are); COMPRESS_LEVEL is the gzip level.
+    COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES") or 1024)
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL") or 6)
+    # Cache lifetime of static files requested with their current content
+    # hash (url_for adds it), in seconds.
+    STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE") or 365 * 24 * 3600)
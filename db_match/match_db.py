@@ -1,5 +1,6 @@
 from __future__ import annotations
 import argparse
+import os
 import json
 import sqlite3
 import sys
@@ -12,6 +13,10 @@ from pathlib import Path
 from dataclasses import asdict, dataclass
 from pathlib import Path
 
+# scan_policy.py sits at the repository root, shared with fileInfoScript.py.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scan_policy import ScanPolicy
+
 
 # Need to be added: move directory and windows new start automataion: 
 #python match_db.py   --db_path samples.db   --input-dir ./   --min-file-size-mb 250   --min-file-age-minutes 20 --log-tsv move_log.tsv --watch --poll-seconds 60
@@ -25,6 +30,9 @@ class Config:
     log_tsv_path: Path
     watch: bool
     poll_seconds: int
+    exclude: tuple[str, ...] = ()
+    extensions: tuple[str, ...] | None = None
+    max_depth: int | None = None
 
     @classmethod
     def from_args(cls) -> Config:
@@ -82,6 +90,28 @@ class Config:
             help="Seconds to wait between scans in watch mode.",
         )
 
+        parser.add_argument(
+            "--exclude",
+            action="append",
+            default=[],
+            metavar="PATTERN",
+            help="Folder/file glob (or re:regex) never to scan, e.g. 'Backup*'. Repeatable.",
+        )
+        parser.add_argument(
+            "--extension",
+            dest="extensions",
+            action="append",
+            metavar="EXT",
+            help="Only consider files with this extension, e.g. .raw. Repeatable; default: all.",
+        )
+        parser.add_argument(
+            "--max-depth",
+            dest="max_depth",
+            type=int,
+            default=None,
+            help="Levels of subfolders below the input directory to scan.",
+        )
+
         args = parser.parse_args()
 
         if args.min_file_size_mb < 0:
@@ -98,6 +128,9 @@ class Config:
             log_tsv_path=args.log_tsv_path,
             watch=args.watch,
             poll_seconds=args.poll_seconds,
+            exclude=tuple(args.exclude),
+            extensions=tuple(args.extensions) if args.extensions else None,
+            max_depth=args.max_depth,
         )
 
 @dataclass(frozen=True, slots=True)
@@ -172,10 +205,12 @@ class AcquisitionDirectoryScanner:
         input_dir: Path,
         min_file_size_mb: float,
         min_file_age_minutes: float,
+        policy: ScanPolicy | None = None,
     ) -> None:
         self.input_dir = input_dir
         self.min_file_size_mb = min_file_size_mb
         self.min_file_age_minutes = min_file_age_minutes
+        self.policy = policy or ScanPolicy()
 
     def scan(self) -> list[AcquisitionFile]:
         if not self.input_dir.is_dir():
@@ -183,11 +218,8 @@ class AcquisitionDirectoryScanner:
 
         acquisition_files: list[AcquisitionFile] = []
 
-        for path in self.input_dir.rglob("*"):
-            if not path.is_file():
-                continue
-
-            acquisition_file = self._path_to_acquisition_file(path)
+        for entry in self.policy.walk(self.input_dir, on_error=self._report_scan_error):
+            acquisition_file = self._entry_to_acquisition_file(entry)
 
             if acquisition_file is None:
                 continue
@@ -196,8 +228,22 @@ class AcquisitionDirectoryScanner:
 
         return acquisition_files
 
-    def _path_to_acquisition_file(self, path: Path) -> AcquisitionFile | None:
-        stat = path.stat()
+    @staticmethod
+    def _report_scan_error(path: str, exc: OSError) -> None:
+        print(f"Could not scan {path}: {exc}", file=sys.stderr)
+
+    def _entry_to_acquisition_file(self, entry: os.DirEntry) -> AcquisitionFile | None:
+        path = Path(entry.path)
+        file_name_root = path.stem
+        # Names are checked before the stat, so clutter costs no I/O.
+        struct = self._parse_file_name_root(file_name_root)
+
+        if struct is None: return None
+
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            return None
 
         size_mb = stat.st_size / 1024 / 1024
         last_modified_time = datetime.fromtimestamp(stat.st_mtime).astimezone()
@@ -208,11 +254,6 @@ class AcquisitionDirectoryScanner:
         if size_mb < self.min_file_size_mb: return None
         if age_minutes < self.min_file_age_minutes: return None
 
-        file_name_root = path.stem
-        struct = self._parse_file_name_root(file_name_root)
-
-        if struct is None: return None
-
         return AcquisitionFile(
             path=path,
             file_name_root=file_name_root,
@@ -226,6 +267,12 @@ class AcquisitionDirectoryScanner:
     def _parse_file_name_root(file_name_root: str) -> FileNameStruct | None:
         pieces = file_name_root.split("_")
 
+        # Queue file names join date and run number with "-"
+        # (INST_YYYYMMDD-NNN_PROJECT_USER_EXP_SAMPLE_postfix).
+        if len(pieces) > 1 and "-" in pieces[1]:
+            date, run_number = pieces[1].split("-", 1)
+            pieces[1:2] = [date, run_number]
+
         if len(pieces) < 7:
             return None
 
@@ -357,6 +404,11 @@ class Run:
             input_dir=config.input_dir,
             min_file_size_mb=config.min_file_size_mb,
             min_file_age_minutes=config.min_file_age_minutes,
+            policy=ScanPolicy(
+                exclude=config.exclude,
+                extensions=config.extensions,
+                max_depth=config.max_depth,
+            ),
         )
         self.logger = MoveAuditLogger(config.log_tsv_path)
 
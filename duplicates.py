@@ -0,0 +1,171 @@
+"""Find copies of the same acquisition across storage roots.
+
+Works over an address book written by fileInfoScript.py (one row per raw
+file or .d folder, appended to by every root it has been run on) and narrows
+the candidates in three passes, so only files that really might be copies
+are ever read in full:
+
+1. group by size — files of different sizes can't be copies;
+2. hash three sampled blocks (head, middle, tail) of each file in a group
+   that is still ambiguous;
+3. hash the whole file, streamed, for whatever still collides.
+
+Reads go through ``mmap`` and are hashed in a thread pool (hashlib releases
+the GIL on large buffers, so threads keep several disks busy). A timsTOF .d
+folder is fingerprinted by its analysis files, in a fixed order; any other
+folder (an older BAF acquisition) by every file in it, in path order. The report
+is one CSV row per copy, grouped, plus the bytes deleting all but one copy of
+each group would free.
+
+    python duplicates.py address_book.csv --out duplicates.csv --workers 16
+"""
+import argparse
+import csv
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import bruker_tdf
+
+SAMPLE_BYTES = 1024 * 1024
+CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def _parts(location):
+    """(name, path) of the files whose content makes up an entry; for a
+    folder, names are relative to it. Same split as fileInfoScript's sizing:
+    a TDF folder's data files, or else everything under the folder."""
+    if not os.path.isdir(location):
+        return [(None, location)]
+    parts = [(name, os.path.join(location, name)) for name in bruker_tdf.DATA_FILES
+             if os.path.isfile(os.path.join(location, name))]
+    if parts:
+        return parts
+    for dirpath, _, filenames in os.walk(location):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            parts.append((os.path.relpath(path, location).replace(os.sep, "/"), path))
+    return sorted(parts)
+
+
+def _hash_file(digest, path, sampled):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if sampled:
+                middle = max(0, size // 2 - SAMPLE_BYTES // 2)
+                for offset in sorted({0, middle, max(0, size - SAMPLE_BYTES)}):
+                    digest.update(mm[offset:offset + SAMPLE_BYTES])
+                return
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            for offset in range(0, size, CHUNK_BYTES):
+                digest.update(mm[offset:offset + CHUNK_BYTES])
+
+
+def fingerprint(location, sampled=False):
+    """Hex digest of an entry's content (``sampled``: of its head, middle
+    and tail blocks only). Raises OSError if it can't be read."""
+    digest = hashlib.blake2b(digest_size=20)
+    for name, path in _parts(location):
+        if name is not None:
+            # Keep a folder's files apart in the digest: the same bytes under
+            # different names (or split differently) are not the same run.
+            digest.update(name.encode() + b"\0")
+        _hash_file(digest, path, sampled)
+    return digest.hexdigest()
+
+
+def _refine(groups, pool, sampled, errors):
+    """Split each group of locations by fingerprint; keep groups of 2+."""
+    locations = [loc for group in groups for loc in group]
+
+    def fp(location):
+        try:
+            return location, fingerprint(location, sampled)
+        except OSError as exc:
+            errors.append((location, str(exc)))
+            return location, None
+
+    by_key = defaultdict(list)
+    keys = dict(pool.map(fp, locations))
+    for key_group, group in enumerate(groups):
+        for location in group:
+            if keys[location] is not None:
+                by_key[key_group, keys[location]].append(location)
+    return {key: group for key, group in by_key.items() if len(group) > 1}
+
+
+def find(entries, workers=8, full=True):
+    """Duplicate groups among ``entries`` (iterable of (location, size)).
+
+    Returns (groups, errors): groups is a list of (size, digest, [location])
+    with the largest reclaimable space first; errors lists (location,
+    message) for entries that could not be read. ``full=False`` stops after
+    the sampled pass — much faster, but a match is then only probable.
+    """
+    by_size = defaultdict(set)
+    for location, size in entries:
+        if size:
+            by_size[size].add(location)
+    candidates = [sorted(group) for group in by_size.values() if len(group) > 1]
+    sizes = {loc: size for size, group in by_size.items() for loc in group}
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        refined = _refine(candidates, pool, sampled=True, errors=errors)
+        if full:
+            refined = _refine(list(refined.values()), pool, sampled=False, errors=errors)
+    groups = [(sizes[group[0]], digest, group) for (_, digest), group in refined.items()]
+    groups.sort(key=lambda g: g[0] * (len(g[2]) - 1), reverse=True)
+    return groups, errors
+
+
+def reclaimable(groups):
+    return sum(size * (len(locations) - 1) for size, _, locations in groups)
+
+
+def read_address_book(path):
+    """(location, size) per row of a fileInfoScript address book, once each;
+    a re-scanned location's last row wins. Its size_GB column holds bytes
+    (the GB conversion is commented out)."""
+    seen = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                seen[row["location"]] = int(float(row["size_GB"]))
+            except (KeyError, ValueError):
+                continue
+    return seen.items()
+
+
+def write_report(groups, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["group", "size_bytes", "digest", "location"])
+        for n, (size, digest, locations) in enumerate(groups, 1):
+            for location in locations:
+                w.writerow([n, size, digest, location])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("address_book", help="CSV written by fileInfoScript.py")
+    parser.add_argument("--out", default="duplicates.csv")
+    parser.add_argument("--workers", type=int, default=8, help="parallel reads")
+    parser.add_argument("--sampled-only", action="store_true",
+                        help="skip the full-content pass (fast; matches are probable, not certain)")
+    args = parser.parse_args()
+    groups, errors = find(read_address_book(args.address_book), args.workers, full=not args.sampled_only)
+    write_report(groups, args.out)
+    for location, message in errors:
+        print(f"unreadable: {location} ({message})")
+    print(f"{len(groups)} duplicate group(s), {reclaimable(groups) / 1024 ** 3:.1f} GB reclaimable;"
+          f" report: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
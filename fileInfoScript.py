@@ -1,17 +1,37 @@
 import os
 import csv
+import contextlib
+import json
+import queue
+import threading
+import time
 from pathlib import Path
 import argparse
 import logging
 import sys
 
+import bruker_tdf
+import columnar
+import duplicates
+from scan_policy import ScanPolicy
+
+# Folders never worth entering: crosslink search output and the migration share.
+DEFAULT_EXCLUDE = ('xi_data', 'new_storage')
+
 
 class SpectraAddressBook:
-    def __init__(self, search_root, outfile=None, logfile=None):
+    def __init__(self, search_root, outfile=None, logfile=None, exclude=DEFAULT_EXCLUDE, max_depth=None,
+                 workers=1):
         self.search_root = Path(search_root).resolve()
+        self.workers = workers
+        # Per-scan counts, appended to from the walk's worker threads.
+        self.errors = []
+        self.pruned = []
         self.outfile = Path.cwd() / 'address_book.csv' if outfile is None else Path(outfile)
         self.logfile = Path.cwd() / 'output.log' if logfile is None else Path(logfile)
         self.extensions = {'.raw', '.mgf', '.mzml'}
+        self.policy = ScanPolicy(exclude=exclude, extensions=self.extensions, dir_extensions=('.d',),
+                                 max_depth=max_depth)
         self.logger = logging.getLogger('SpectraAddressBook')
         self.logger.setLevel(logging.INFO)
         if not self.logger.handlers:
@@ -37,57 +57,200 @@ class SpectraAddressBook:
                     pass
         return total
 
+    def on_scan_error(self, path, e):
+        self.errors.append(path)
+        if isinstance(e, PermissionError):
+            self.logger.warning(f'Cannot access folder due to permission issues: {path}')
+        else:
+            self.logger.warning(f'Cannot access folder: {path} ({e})')
+
+    def on_prune(self, path):
+        self.pruned.append(path)
+        self.logger.warning(f"Skipping the folder: {path}")
+
+    def record(self, entry):
+        """(name, resolved location, size in bytes, mtime) for one entry, or
+        None if it can't be read."""
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                # timsTOF: a couple of stats instead of walking the folder.
+                size = bruker_tdf.folder_size(entry.path)
+                if size is None:
+                    size = self.get_dir_size(entry.path)
+                return entry.name, str(Path(entry.path).resolve()), size, entry.stat().st_mtime
+            st = entry.stat()
+            return entry.name, str(Path(entry.path).resolve()), st.st_size, st.st_mtime
+        except PermissionError:
+            self.logger.warning(f'Cannot access fold due to permission issues: {entry.path}')
+        except OSError as e:
+            self.logger.warning(f'Cannot access path: {entry.path} ({e})')
+        self.errors.append(entry.path)
+        return None
+
     def collect(self):
-        stack = [self.search_root]
-        while stack:
-            current = stack.pop()
-            if "xi_data" in str(current) or os.path.islink(str(current)) or "new_storage" in str(current):
-                self.logger.warning(f"Skipping the folder: {current}")
-                continue
-            try:
-                with os.scandir(current) as it:
-                    for entry in it:
-                        try:
-                            if entry.is_dir(follow_symlinks=False):
-                                if entry.name.lower().endswith('.d'):
-                                    yield entry.name, str(Path(entry.path).resolve()), self.get_dir_size(
-                                        entry.path)  # / (1024**3)
-                                else:
-                                    stack.append(entry.path)
-                            else:
-                                if Path(entry.name).suffix.lower() in self.extensions:
-                                    yield entry.name, str(
-                                        Path(entry.path).resolve()), entry.stat().st_size  # / (1024**3)
-                        except PermissionError:
-                            self.logger.warning(f'Cannot access fold due to permission issues: {entry.path}')
-                        except OSError as e:
-                            self.logger.warning(f'Cannot access path: {entry.path} ({e})')
-            except PermissionError:
-                self.logger.warning(f'Cannot access folder due to permission issues: {current}')
-            except OSError as e:
-                self.logger.warning(f'Cannot access folder: {current} ({e})')
-
-    def write(self):
+        return self.policy.walk(self.search_root, on_error=self.on_scan_error, on_prune=self.on_prune,
+                                visit=self.record, workers=self.workers)
+
+    def write(self, parquet=None):
+        """Append the scan to the CSV (skipping locations already in it) and,
+        with ``parquet``, also write it to a new typed Parquet file."""
+        Inventory([self], self.outfile, self.logger).write(parquet)
+
+    def find_duplicates(self, report, workers=8):
+        self.logger.info(f'Fingerprinting same-size entries in {self.outfile}')
+        groups, errors = duplicates.find(duplicates.read_address_book(self.outfile), workers)
+        for location, message in errors:
+            self.logger.warning(f'Cannot read for fingerprinting: {location} ({message})')
+        duplicates.write_report(groups, report)
+        self.logger.info(f'{len(groups)} duplicate groups, '
+                         f'{duplicates.reclaimable(groups) / 1024 ** 3:.1f} GB reclaimable. Report: {report}')
+
+    def run(self, parquet=None):
+        self.logger.info(f'Searching the parent folder: {self.search_root}')
+        self.write(parquet)
+        self.logger.info(f'Finished. Output CSV: {self.outfile}')
+
+
+class Inventory:
+    """Several roots scanned at once into one address book.
+
+    Each root is walked on its own thread with its own pool of ``workers``
+    (SpectraAddressBook.workers), so a slow mount only slows its own scan.
+    One writer merges the results, keyed on resolved location: an entry
+    reached from two overlapping roots is written once, and one already in
+    the CSV from an earlier run only if its size has changed since (a file
+    recorded mid-acquisition or mid-copy). Readers of the CSV take the last
+    row for a location.
+    """
+
+    def __init__(self, books, outfile, logger):
+        self.books = books
+        self.outfile = Path(outfile)
+        self.logger = logger
+
+    def _known_sizes(self):
+        """Location -> size last recorded for it in the CSV."""
+        known = {}
+        if not self.outfile.exists():
+            return known
+        with open(self.outfile, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    known[row['location']] = float(row['size_GB'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return known
+
+    def _scan(self, book, results, stats):
+        start = time.perf_counter()
+        try:
+            for record in book.collect():
+                results.put((book, record))
+        except Exception as e:
+            book.errors.append(str(book.search_root))
+            self.logger.error(f'Scan of {book.search_root} failed: {e}')
+        finally:
+            stats['seconds'] = time.perf_counter() - start
+            results.put((book, None))
+
+    def write(self, parquet=None):
+        known = self._known_sizes()
+        seen = set()
+        # Bounded, so a fast root can't run far ahead of the writer.
+        results = queue.Queue(maxsize=10000)
+        stats = {book: {'entries': 0, 'updated': 0, 'bytes': 0, 'duplicates': 0, 'seconds': 0.0}
+                 for book in self.books}
         try:
             exists = self.outfile.exists()
             mode = 'a' if exists else 'w'
-            with open(self.outfile, mode, newline='', encoding='utf-8') as f:
+            with open(self.outfile, mode, newline='', encoding='utf-8') as f, \
+                    (columnar.BatchWriter(parquet, columnar.ADDRESS_BOOK_COLUMNS) if parquet
+                     else contextlib.nullcontext()) as table:
                 w = csv.writer(f)
                 if (not exists) or self.outfile.stat().st_size == 0:
                     w.writerow(['file_name', 'location', 'size_GB'])
-                for name, loc, size in self.collect():
+                for book in self.books:
+                    threading.Thread(target=self._scan, args=(book, results, stats[book]), daemon=True).start()
+                running = len(self.books)
+                while running:
+                    book, record = results.get()
+                    if record is None:
+                        running -= 1
+                        continue
+                    name, loc, size, mtime = record
+                    if loc in seen or known.get(loc) == size:
+                        stats[book]['duplicates'] += 1
+                        continue
+                    seen.add(loc)
+                    stats[book]['updated' if loc in known else 'entries'] += 1
+                    stats[book]['bytes'] += size
                     w.writerow([name, loc, f"{size:.3f}"])
+                    if table is not None:
+                        table.write(columnar.address_book_row(name, loc, size, mtime))
+            if table is not None:
+                self.logger.info(f'Wrote {table.rows} entries to {parquet}')
+        except columnar.ParquetUnavailable as e:
+            self.logger.error(str(e))
         except Exception as e:
             self.logger.error(f'Failed writing CSV: {self.outfile} ({e})')
+        for book in self.books:
+            st = stats[book]
+            self.logger.info(
+                f'{book.search_root}: {st["entries"]} new, {st["updated"]} resized, '
+                f'{st["duplicates"]} already listed, '
+                f'{st["bytes"] / 1024 ** 3:.1f} GB, {len(book.errors)} errors, {len(book.pruned)} skipped, '
+                f'{st["seconds"]:.1f} s ({book.workers} workers)'
+            )
+        return stats
 
-    def run(self):
-        self.logger.info(f'Searching the parent folder: {self.search_root}')
-        self.write()
+    def run(self, parquet=None):
+        self.logger.info(f'Searching {len(self.books)} root(s): {", ".join(str(b.search_root) for b in self.books)}')
+        self.write(parquet)
         self.logger.info(f'Finished. Output CSV: {self.outfile}')
 
 
+def load_roots(path):
+    """Roots from a JSON config:
+
+        {"defaults": {"workers": 4, "exclude": ["xi_data"], "max_depth": null},
+         "roots": ["/mnt/instrumentA", {"path": "/mnt/nas", "workers": 16}]}
+
+    Returns a list of dicts with path, workers, exclude and max_depth.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    defaults = {'workers': 4, 'exclude': list(DEFAULT_EXCLUDE), 'max_depth': None}
+    defaults.update(config.get('defaults', {}))
+    roots = []
+    for root in config['roots']:
+        root = {'path': root} if isinstance(root, str) else root
+        roots.append({**defaults, **root})
+    return roots
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(add_help=True)
-    parser.add_argument('path', type=str)
+    parser.add_argument('path', type=str, nargs='*', help='one or more roots to scan')
+    parser.add_argument('--roots', metavar='CONFIG_JSON', help='roots (and per-root options) from a JSON file')
+    parser.add_argument('--root-workers', type=int, default=4, help='parallel directory scans per root')
+    parser.add_argument('--duplicates', metavar='REPORT_CSV',
+                        help='afterwards, find copies across everything in the address book')
+    parser.add_argument('--workers', type=int, default=8, help='parallel reads when fingerprinting')
+    parser.add_argument('--parquet', metavar='PATH',
+                        help='also write this scan to a typed Parquet file (needs pyarrow)')
+    parser.add_argument('--exclude', action='append', metavar='PATTERN',
+                        help='folder/file glob (or re:regex) to skip; repeatable '
+                             f'(default: {", ".join(DEFAULT_EXCLUDE)})')
+    parser.add_argument('--max-depth', type=int, default=None, help='levels below each root to descend')
     args = parser.parse_args()
-    SpectraAddressBook(args.path).run()
\ No newline at end of file
+    roots = [{'path': p, 'workers': args.root_workers, 'exclude': args.exclude or DEFAULT_EXCLUDE,
+              'max_depth': args.max_depth} for p in args.path]
+    if args.roots:
+        roots += load_roots(args.roots)
+    if not roots:
+        parser.error('give at least one path, or --roots')
+    books = [SpectraAddressBook(r['path'], exclude=r['exclude'], max_depth=r['max_depth'], workers=r['workers'])
+             for r in roots]
+    Inventory(books, books[0].outfile, books[0].logger).run(args.parquet)
+    if args.duplicates:
+        books[0].find_duplicates(args.duplicates, args.workers)
\ No newline at end of file
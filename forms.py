@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileField, FileRequired
 from wtforms import (
     BooleanField,
     FloatField,
@@ -11,6 +12,8 @@ from wtforms import (
 )
 from wtforms.validators import DataRequired, Optional, ValidationError
 
+from sequence_export import template_choices
+
 
 def valid_code(form, field):
     if not field.data:
@@ -74,6 +77,17 @@ class UserForm(FlaskForm):
     active = BooleanField("Active", default=True)
 
 
+class InstrumentForm(FlaskForm):
+    initial = StringField("Initial", validators=[DataRequired()])
+    name = StringField("Name", validators=[DataRequired()])
+    sequence_template = SelectField(
+        "Sequence Template", choices=template_choices(), default="xcalibur"
+    )
+    data_path = StringField("Data Path", validators=[Optional()])
+    instrument_method = StringField("Instrument Method", validators=[Optional()])
+    active = BooleanField("Active", default=True)
+
+
 class MassSpecSampleForm(FlaskForm):
     experiment_code = SelectField("Experiment", coerce=str, validators=[DataRequired()])
     code = StringField(
@@ -189,6 +203,13 @@ class MassSpecSampleForm(FlaskForm):
             raise ValidationError('Required for crosslinked samples — enter a real unit.')
 
 
+class SampleUploadForm(FlaskForm):
+    table = FileField(
+        "Plate layout",
+        validators=[FileRequired(), FileAllowed(["csv", "tsv", "txt"], "Upload a CSV or TSV file.")],
+    )
+
+
 class AcquiredFileForm(FlaskForm):
     location = StringField("Location", validators=[Optional()])
     filename = StringField("Filename", validators=[Optional()])
@@ -213,8 +234,8 @@ def _optional_str(value):
 
 
 class AcquiredFileEditForm(FlaskForm):
-    # validate_choice=False: the experiment/sample option lists are populated
-    # client-side from an embedded tree, so any code present in the DB is valid.
+    # validate_choice=False: the experiment/sample option lists are fetched
+    # client-side from /api/choices, so any code present in the DB is valid.
     project_code = SelectField(
         "Project", coerce=_optional_str, validators=[Optional()], validate_choice=False
     )
@@ -0,0 +1,207 @@
+"""Response compression and HTTP caching.
+
+- Text responses (HTML, JSON, CSS, JS, CSV) of at least
+  ``COMPRESS_MIN_BYTES`` are sent brotli- or gzip-compressed, whichever the
+  client prefers; streamed pages are compressed as they stream, flushed
+  chunk by chunk so the browser can still render the head early. Brotli is
+  used only if the ``brotli`` package is installed.
+- ``url_for('static', ...)`` appends a hash of the file's content
+  (``?v=...``), and a static file requested with its current hash is sent
+  with a long ``max-age`` and ``immutable``: browsers stop revalidating
+  CSS/JS, and an edited file gets a new URL. Compressed static files are kept
+  in memory, keyed on their mtime.
+- ``not_modified`` / ``validate`` give JSON endpoints ETag and Last-Modified
+  validators derived from a database change version, so a repeat request
+  for unchanged data is answered with a 304 before any query runs.
+"""
+import gzip
+import hashlib
+import os
+import zlib
+from datetime import timezone
+
+from flask import Response, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+# Dynamic responses are compressed on every request, so favour speed; static
+# files are compressed once per change, so use the best ratio.
+BROTLI_QUALITY = 5
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_stream(chunks, encoding, level):
+    """Compress an iterable of str/bytes chunks, flushing after each one so
+    nothing is held back waiting for more input."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _http_datetime(value):
+    """A naive UTC datetime (as SQLite's CURRENT_TIMESTAMP stores) made aware."""
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def not_modified(etag, last_modified=None):
+    """A 304 response if the request's validators still match ``etag`` (or,
+    without If-None-Match, ``last_modified``); otherwise None. Call it before
+    doing the work the response needs."""
+    last_modified = _http_datetime(last_modified)
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        matched = (
+            since is not None and last_modified is not None
+            and last_modified.replace(microsecond=0) <= since
+        )
+    if not matched:
+        return None
+    return validate(Response(status=304), etag, last_modified)
+
+
+def validate(response, etag, last_modified=None):
+    """Attach validators to ``response`` and make clients revalidate it on
+    every use. The ETag is weak: the body may be sent compressed."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _http_datetime(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+class HttpCache:
+    """Flask hooks for compression and content-hashed static URLs."""
+
+    def __init__(self, app=None):
+        self._static_hashes = {}  # filename -> (mtime_ns, size, hash)
+        self._static_compressed = {}  # (path, encoding) -> (mtime_ns, bytes)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["http_cache"] = self
+        app.url_defaults(self._static_url_defaults)
+        app.after_request(self._after_request)
+
+    # -- static files -------------------------------------------------------
+    def static_hash(self, filename):
+        """Short content hash of a static file, recomputed when it changes;
+        None if it doesn't exist."""
+        path = safe_join(self.app.static_folder, filename)
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        cached = self._static_hashes.get(filename)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(path, "rb") as f:
+            digest = hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+        self._static_hashes[filename] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def _static_url_defaults(self, endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            digest = self.static_hash(values["filename"])
+            if digest is not None:
+                values["v"] = digest
+
+    def _static_body(self, filename, encoding):
+        path = safe_join(self.app.static_folder, filename)
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._static_compressed.get((path, encoding))
+        if cached is None or cached[0] != mtime:
+            with open(path, "rb") as f:
+                level = STATIC_BROTLI_QUALITY if encoding == "br" else STATIC_GZIP_LEVEL
+                cached = (mtime, _compress(f.read(), encoding, level))
+            self._static_compressed[(path, encoding)] = cached
+        return cached[1]
+
+    # -- every response -----------------------------------------------------
+    def _after_request(self, response):
+        static = request.endpoint == "static"
+        if static and response.status_code in (200, 304):
+            filename = (request.view_args or {}).get("filename")
+            version = request.args.get("v")
+            if version and version == self.static_hash(filename):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = self.app.config["STATIC_MAX_AGE"]
+                response.cache_control.immutable = True
+        if (
+            response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        streamed = response.is_streamed and not static
+        if not streamed and (response.content_length or 0) < self.app.config["COMPRESS_MIN_BYTES"]:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(_encodings())
+        if encoding is None:
+            return response
+        if static:
+            body = self._static_body(request.view_args["filename"], encoding)
+            response.close()
+            response.direct_passthrough = False
+            response.set_data(body)
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+        elif streamed:
+            level = BROTLI_QUALITY if encoding == "br" else self.app.config["COMPRESS_LEVEL"]
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop("Content-Length", None)
+        else:
+            level = BROTLI_QUALITY if encoding == "br" else self.app.config["COMPRESS_LEVEL"]
+            response.set_data(_compress(response.get_data(), encoding, level))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,104 @@
+"""Incremental refresh of the materialised instrument_day_stats table.
+
+Triggers on queued_file and acquired_file record every (instrument, day) they
+touch in instrument_day_dirty; a refresh recomputes exactly those days and
+clears the set, so the nightly job costs in proportion to what changed rather
+than to the size of the history. Queue rows are read through the
+queued_file_all view, so archiving a day does not change its statistics.
+Each day also counts its orphan acquisitions (see reconciliation.py); queue
+triggers dirty the acquisition days whose files a queue change could match.
+"""
+from sqlalchemy import text
+
+import reconciliation
+
+# An acquired file can belong to a queue day other than its own file_date (runs
+# acquired after midnight, re-acquisitions), so a dirty acquisition day also
+# dirties the queue days of the runs its files match. Files renamed or deleted
+# since no longer carry the old run_name; their triggers dirty those days.
+_EXPAND_DIRTY = text("""
+    INSERT OR IGNORE INTO instrument_day_dirty (instrument_initial, day)
+    SELECT DISTINCT q.instrument_initial, q.date_queued
+    FROM instrument_day_dirty d
+    JOIN acquired_file af
+      ON af.file_date = d.day AND af.instrument_initial = d.instrument_initial
+    JOIN queued_file_all q ON q.run_name = af.run_name
+""")
+
+_MARK_ALL_DIRTY = text("""
+    INSERT OR IGNORE INTO instrument_day_dirty (instrument_initial, day)
+    SELECT instrument_initial, date_queued FROM queued_file_all
+    UNION
+    SELECT instrument_initial, file_date FROM acquired_file
+    WHERE instrument_initial IS NOT NULL AND file_date IS NOT NULL
+""")
+
+_DELETE_DIRTY_STATS = text("""
+    DELETE FROM instrument_day_stats
+    WHERE (instrument_initial, day) IN (SELECT instrument_initial, day FROM instrument_day_dirty)
+""")
+
+_INSERT_STATS = text("""
+    INSERT INTO instrument_day_stats (
+        instrument_initial, day, queued_runs, blank_runs, acquired_files,
+        acquired_bytes, matched_runs, lag_days_total, orphan_files
+    )
+    WITH runs AS (
+        SELECT q.instrument_initial, q.date_queued AS day, q.sample_code,
+               (SELECT min(af.file_date) FROM acquired_file af
+                WHERE af.run_name = q.run_name) AS acquired_on
+        FROM queued_file_all q
+        JOIN instrument_day_dirty d
+          ON d.instrument_initial = q.instrument_initial AND d.day = q.date_queued
+    ), queue AS (
+        SELECT instrument_initial, day,
+               sum(sample_code IS NOT NULL) AS queued_runs,
+               sum(sample_code IS NULL) AS blank_runs,
+               sum(sample_code IS NOT NULL AND acquired_on IS NOT NULL) AS matched_runs,
+               total(CASE WHEN sample_code IS NOT NULL
+                          THEN julianday(acquired_on) - julianday(day) END) AS lag_days_total
+        FROM runs GROUP BY instrument_initial, day
+    ), acquired AS (
+        SELECT af.instrument_initial, af.file_date AS day,
+               count(*) AS acquired_files, total(af.size_bytes) AS acquired_bytes,
+               sum(CASE WHEN {orphan} THEN 1 ELSE 0 END) AS orphan_files
+        FROM acquired_file af
+        JOIN instrument_day_dirty d
+          ON d.instrument_initial = af.instrument_initial AND d.day = af.file_date
+        GROUP BY af.instrument_initial, af.file_date
+    )
+    SELECT d.instrument_initial, d.day,
+           coalesce(queue.queued_runs, 0), coalesce(queue.blank_runs, 0),
+           coalesce(acquired.acquired_files, 0), CAST(coalesce(acquired.acquired_bytes, 0) AS INTEGER),
+           coalesce(queue.matched_runs, 0), coalesce(queue.lag_days_total, 0),
+           coalesce(acquired.orphan_files, 0)
+    FROM instrument_day_dirty d
+    LEFT JOIN queue ON queue.instrument_initial = d.instrument_initial AND queue.day = d.day
+    LEFT JOIN acquired ON acquired.instrument_initial = d.instrument_initial AND acquired.day = d.day
+    WHERE queue.day IS NOT NULL OR acquired.day IS NOT NULL
+""".format(orphan=reconciliation.orphan_condition("af")))
+
+
+def refresh(session, full=False):
+    """Recompute the dirty (or, with ``full``, all) instrument days.
+
+    Runs as one write transaction so a change committed mid-refresh can't be
+    cleared from the dirty set without having been counted. An empty stats
+    table is always rebuilt in full (first run on an existing database).
+    Returns the number of days recomputed.
+    """
+    if not full:
+        full = session.execute(text("SELECT NOT EXISTS (SELECT 1 FROM instrument_day_stats)")).scalar()
+    if full:
+        session.execute(_MARK_ALL_DIRTY)
+    session.execute(_EXPAND_DIRTY)
+    days = session.execute(text("SELECT count(*) FROM instrument_day_dirty")).scalar()
+    session.execute(_DELETE_DIRTY_STATS)
+    session.execute(_INSERT_STATS)
+    session.execute(text("DELETE FROM instrument_day_dirty"))
+    session.commit()
+    return days
+
+
+def pending_days(session):
+    return session.execute(text("SELECT count(*) FROM instrument_day_dirty")).scalar()
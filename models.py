@@ -98,11 +98,14 @@ class CellLine(db.Model):
 class MassSpecSample(db.Model):
     __tablename__ = "mass_spec_sample"
 
+    # The crosslink, identification and description columns are deferred in
+    # groups: listings never pay for them, and views that show a whole sample
+    # undefer the groups in their query.
     project_code = db.Column(db.Text, primary_key=True, nullable=False)
     experiment_code = db.Column(db.Text, primary_key=True, nullable=False)
     code = db.Column(db.Text, primary_key=True, nullable=False)
     name = db.Column(db.Text, nullable=False)
-    description = db.Column(db.Text, nullable=False)
+    description = db.deferred(db.Column(db.Text, nullable=False), group="description")
     user_initials = db.Column(db.Text, nullable=False)
     disease = db.Column(db.Text)
     phenotype = db.Column(db.Text)
@@ -123,23 +126,23 @@ class MassSpecSample(db.Model):
     quantitation_method = db.Column(db.Text)
 
     # CrosslinkSample columns (crosslinked_sample = 1)
-    crosslinker = db.Column(db.Text)
-    crosslinking_type = db.Column(db.Text)
-    protein_or_cell_concentration = db.Column(db.Float)
-    protein_or_cell_concentration_unit = db.Column(db.Text)
-    crosslinker_or_compound_concentration = db.Column(db.Float)
-    crosslinker_or_compound_concentration_unit = db.Column(db.Text)
-    organic_solvent_concentration = db.Column(db.Float)
-    organic_solvent_concentration_unit = db.Column(db.Text)
-    reaction_temperature_in_celsius = db.Column(db.Float)
-    reaction_time_in_minutes = db.Column(db.Float)
-    quenching_reagent = db.Column(db.Text)
-    uv_source = db.Column(db.Text)
-    uv_time_in_seconds = db.Column(db.Float)
-    uv_wavelength_in_nanometers = db.Column(db.Float)
+    crosslinker = db.deferred(db.Column(db.Text), group="crosslink")
+    crosslinking_type = db.deferred(db.Column(db.Text), group="crosslink")
+    protein_or_cell_concentration = db.deferred(db.Column(db.Float), group="crosslink")
+    protein_or_cell_concentration_unit = db.deferred(db.Column(db.Text), group="crosslink")
+    crosslinker_or_compound_concentration = db.deferred(db.Column(db.Float), group="crosslink")
+    crosslinker_or_compound_concentration_unit = db.deferred(db.Column(db.Text), group="crosslink")
+    organic_solvent_concentration = db.deferred(db.Column(db.Float), group="crosslink")
+    organic_solvent_concentration_unit = db.deferred(db.Column(db.Text), group="crosslink")
+    reaction_temperature_in_celsius = db.deferred(db.Column(db.Float), group="crosslink")
+    reaction_time_in_minutes = db.deferred(db.Column(db.Float), group="crosslink")
+    quenching_reagent = db.deferred(db.Column(db.Text), group="crosslink")
+    uv_source = db.deferred(db.Column(db.Text), group="crosslink")
+    uv_time_in_seconds = db.deferred(db.Column(db.Float), group="crosslink")
+    uv_wavelength_in_nanometers = db.deferred(db.Column(db.Float), group="crosslink")
 
     # IdentificationSample columns (crosslinked_sample = 0)
-    peptide_level_fraction = db.Column(db.Text)
+    peptide_level_fraction = db.deferred(db.Column(db.Text), group="identification")
 
     __table_args__ = (
         db.ForeignKeyConstraint(
@@ -179,6 +182,22 @@ class User(db.Model):
     active = db.Column(db.Boolean, nullable=False, default=True)
 
 
+class Instrument(db.Model):
+    __tablename__ = "instrument"
+
+    # Same initials as queued_file/acquired_file.instrument_initial. Queue rows
+    # don't reference this table, so an unregistered instrument still queues and
+    # exports (with the Xcalibur defaults).
+    initial = db.Column(db.Text, primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    # Key into sequence_export.SEQUENCE_TEMPLATES.
+    sequence_template = db.Column(db.Text, nullable=False, default="xcalibur")
+    # strftime pattern overriding the template's default data path.
+    data_path = db.Column(db.Text)
+    instrument_method = db.Column(db.Text)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+
+
 class AcquiredFile(db.Model):
     __tablename__ = "acquired_file"
 
@@ -194,6 +213,17 @@ class AcquiredFile(db.Model):
     user_initials = db.Column(db.Text)
     scan_count = db.Column(db.Integer)
     meta = db.Column(db.Text)
+    # DB-generated: filename without its extension, i.e. the queued run name for
+    # queue-conforming files. Read-only — kept in sync with schema.sql.
+    run_name = db.Column(
+        db.Text,
+        db.Computed(
+            "CASE WHEN instr(filename, '.') > 0"
+            " THEN substr(filename, 1, instr(filename, '.') - 1)"
+            " ELSE filename END",
+            persisted=False,
+        ),
+    )
 
     __table_args__ = (
         db.ForeignKeyConstraint(
@@ -240,7 +270,20 @@ class QueuedFile(db.Model):
             " || '_' || concat_ws('_', nullif(project_code, ''), nullif(user_initials, ''),"
             " nullif(experiment_code, ''), nullif(sample_code, '')) || '_'"
             " ELSE '_' END",
-            persisted=False,
+            persisted=True,
+        ),
+    )
+    # DB-generated: the full run filename without extension (same as
+    # queued_filename()); unique-indexed for sample runs.
+    run_name = db.Column(
+        db.Text,
+        db.Computed(
+            "CASE WHEN nullif(sample_code, '') IS NULL"
+            " THEN file_name_root || coalesce(nullif(postfix, ''), 'BLANK-AND-CLEANING')"
+            " WHEN nullif(postfix, '') IS NULL"
+            " THEN substr(file_name_root, 1, length(file_name_root) - 1)"
+            " ELSE file_name_root || postfix END",
+            persisted=True,
         ),
     )
 
@@ -255,3 +298,86 @@ class QueuedFile(db.Model):
         "MassSpecSample",
         backref=db.backref("queued_files", order_by="desc(QueuedFile.date_queued)"),
     )
+
+
+class QueueVersion(db.Model):
+    __tablename__ = "queue_version"
+
+    # Change counter for one instrument's day queue, bumped by triggers in
+    # schema.sql on any insert/update/delete of its queued_file rows (and on a
+    # rename of a queued sample). Read-only from the app. ``token`` is random
+    # per row, so a recreated database never reuses a (token, version) pair.
+    instrument_initial = db.Column(db.Text, primary_key=True)
+    date_queued = db.Column(db.Date, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    token = db.Column(db.Text, nullable=False)
+
+
+class DataVersion(db.Model):
+    __tablename__ = "data_version"
+
+    # Change counter per API scope ("tree", "queue"), bumped by triggers in
+    # schema.sql; the JSON endpoints build their ETag/Last-Modified from it.
+    # Read-only from the app. changed_at is UTC.
+    scope = db.Column(db.Text, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+
+class QueuedFileArchive(db.Model):
+    __tablename__ = "queued_file_archive"
+
+    # Exported queue rows moved out of queued_file by `flask archive-queue`.
+    # file_name_root is frozen as plain text at archive time. No FK to the
+    # sample: the archive is history and outlives sample deletion.
+    instrument_initial = db.Column(db.Text, primary_key=True, nullable=False)
+    date_queued = db.Column(db.Date, primary_key=True, nullable=False)
+    daily_counter = db.Column(db.Integer, primary_key=True, nullable=False)
+    run_number = db.Column(db.Integer, nullable=True)
+    project_code = db.Column(db.Text, nullable=True)
+    experiment_code = db.Column(db.Text, nullable=True)
+    sample_code = db.Column(db.Text, nullable=True)
+    user_initials = db.Column(db.Text)
+    postfix = db.Column(db.Text)
+    file_name_root = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+    # DB-generated: the same run filename expression as QueuedFile.run_name.
+    run_name = db.Column(
+        db.Text,
+        db.Computed(
+            "CASE WHEN nullif(sample_code, '') IS NULL"
+            " THEN file_name_root || coalesce(nullif(postfix, ''), 'BLANK-AND-CLEANING')"
+            " WHEN nullif(postfix, '') IS NULL"
+            " THEN substr(file_name_root, 1, length(file_name_root) - 1)"
+            " ELSE file_name_root || postfix END",
+            persisted=True,
+        ),
+    )
+
+
+class QueueHighWater(db.Model):
+    __tablename__ = "queue_high_water"
+
+    # Highest daily_counter/run_number ever archived for an instrument's day, so
+    # numbering resumes above them once the rows have left queued_file.
+    instrument_initial = db.Column(db.Text, primary_key=True)
+    date_queued = db.Column(db.Date, primary_key=True)
+    daily_counter = db.Column(db.Integer, nullable=False, default=0)
+    run_number = db.Column(db.Integer, nullable=False, default=0)
+
+
+class InstrumentDayStats(db.Model):
+    __tablename__ = "instrument_day_stats"
+
+    # Materialised by instrument_stats.refresh(); see schema.sql for the column
+    # semantics. Read-only from the views.
+    instrument_initial = db.Column(db.Text, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    queued_runs = db.Column(db.Integer, nullable=False, default=0)
+    blank_runs = db.Column(db.Integer, nullable=False, default=0)
+    acquired_files = db.Column(db.Integer, nullable=False, default=0)
+    acquired_bytes = db.Column(db.Integer, nullable=False, default=0)
+    matched_runs = db.Column(db.Integer, nullable=False, default=0)
+    lag_days_total = db.Column(db.Float, nullable=False, default=0)
+    orphan_files = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
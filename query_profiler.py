@@ -0,0 +1,223 @@
+"""Per-request SQL statement profiling and N+1 detection.
+
+Cursor hooks on every SQLAlchemy engine record each statement's fingerprint
+(its SQL with literals and parameter lists collapsed) and duration into the
+collectors active on the current thread: one per request while profiling is
+enabled, plus any opened by ``statement_budget``. A fingerprint executed many
+times in one request is the signature of an N+1 loop — a lazy load per row.
+
+With ``QUERY_PROFILING`` on, each response gets a ``Server-Timing`` header
+(shown in the browser dev tools' network timing tab) and the most recent
+requests are kept for the ``/debug/queries`` report. ``QUERY_STATEMENT_BUDGET``
+flags any request issuing more statements than that: a warning in the log, or
+an exception under ``TESTING`` so a test of the route fails.
+
+A streamed response runs more statements after its headers are sent, while
+the body is generated. Those are collected too: the report entry and the
+budget check wait for the body to finish, but ``Server-Timing`` can only
+count what ran before streaming started.
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Fingerprints repeated at least this often in one request are reported as
+# likely N+1 patterns.
+REPEAT_THRESHOLD = 5
+
+_active = threading.local()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class StatementBudgetExceeded(AssertionError):
+    """More statements ran than a budget allows."""
+
+
+def fingerprint(statement):
+    """The statement with literals and ``IN (?, ?, …)`` lists collapsed, so
+    the same query issued with different parameters groups together."""
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAM_LIST.sub("(?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryLog:
+    """Statements recorded while a collector was active."""
+
+    def __init__(self):
+        self.statements = []  # (fingerprint, seconds)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for _, seconds in self.statements)
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """(fingerprint, times, total seconds) for every statement issued at
+        least ``threshold`` times, most frequent first."""
+        counts = Counter(fp for fp, _ in self.statements)
+        seconds = Counter()
+        for fp, s in self.statements:
+            seconds[fp] += s
+        return [(fp, n, seconds[fp]) for fp, n in counts.most_common() if n >= threshold]
+
+    def summary(self):
+        lines = [f"{self.count} statements, {self.total_seconds * 1000:.1f} ms"]
+        for fp, n, _ in self.repeated(threshold=2):
+            lines.append(f"  {n:>5} × {fp}")
+        return "\n".join(lines)
+
+
+def _collectors():
+    if not hasattr(_active, "logs"):
+        _active.logs = []
+    return _active.logs
+
+
+@contextmanager
+def collecting():
+    """Record every statement run on this thread inside the block."""
+    log = QueryLog()
+    logs = _collectors()
+    logs.append(log)
+    try:
+        yield log
+    finally:
+        logs.remove(log)
+
+
+@contextmanager
+def statement_budget(max_statements):
+    """Fail with ``StatementBudgetExceeded`` if the block runs more than
+    ``max_statements`` statements, e.g. around a test client request::
+
+        with statement_budget(10):
+            client.get("/projects/P1")
+    """
+    with collecting() as log:
+        yield log
+    if log.count > max_statements:
+        raise StatementBudgetExceeded(f"budget of {max_statements} exceeded: {log.summary()}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _collectors()
+    starts = conn.info.get("query_start")
+    if not logs or not starts:
+        return
+    entry = (fingerprint(statement), time.perf_counter() - starts.pop())
+    for log in logs:
+        log.statements.append(entry)
+
+
+class QueryProfiler:
+    """Flask request hooks that profile every request while enabled."""
+
+    def __init__(self, app=None):
+        self.recent = deque()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.recent = deque(maxlen=app.config["QUERY_PROFILE_HISTORY"])
+        app.extensions["query_profiler"] = self
+        if app.config["QUERY_PROFILING"]:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+            app.teardown_request(self._stop)
+
+    @property
+    def enabled(self):
+        return bool(self.app.config["QUERY_PROFILING"])
+
+    def _start(self):
+        g.query_log = QueryLog()
+        g.query_log_started = time.perf_counter()
+        _collectors().append(g.query_log)
+
+    def _finish(self, response):
+        log = g.get("query_log")
+        if log is None:
+            return response
+        started = g.query_log_started
+        elapsed = time.perf_counter() - started
+        streamed = response.is_streamed
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={log.total_seconds * 1000:.1f};desc="{log.count} statements'
+            f'{" before streaming" if streamed else ""}"',
+        )
+        response.headers.add("Server-Timing", f"app;dur={elapsed * 1000:.1f}")
+        entry = {
+            "at": datetime.now(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "streamed": streamed,
+        }
+        if streamed:
+            response.response = self._profile_body(response.response, log, entry, started)
+        else:
+            self._record(log, entry, started)
+        return response
+
+    def _profile_body(self, chunks, log, entry, started):
+        """Pass a streamed body through, collecting the statements it runs
+        into the request's log, and record the request once it has been sent
+        (or abandoned)."""
+        logs = _collectors()
+        logs.append(log)
+        try:
+            yield from chunks
+        finally:
+            if log in logs:
+                logs.remove(log)
+            if hasattr(chunks, "close"):
+                chunks.close()
+            self._record(log, entry, started)
+
+    def _record(self, log, entry, started):
+        entry.update(
+            statements=log.count,
+            db_ms=log.total_seconds * 1000,
+            total_ms=(time.perf_counter() - started) * 1000,
+            repeated=log.repeated(),
+        )
+        self.recent.appendleft(entry)
+        budget = self.app.config["QUERY_STATEMENT_BUDGET"]
+        if budget and log.count > budget and entry["endpoint"] != "reports.debug_queries":
+            message = (
+                f"{entry['method']} {entry['path']} exceeded the statement budget of {budget}: {log.summary()}"
+            )
+            if self.app.testing:
+                raise StatementBudgetExceeded(message)
+            self.app.logger.warning(message)
+
+    def _stop(self, exc):
+        log = g.pop("query_log", None)
+        if log in _collectors():
+            _collectors().remove(log)
@@ -0,0 +1,278 @@
+"""Spectrum counts and run metadata read from acquisition files.
+
+``refresh`` finds acquired files whose location is an mzML or MGF file or a
+Bruker timsTOF ``.d`` folder and
+whose scan_count is still empty, extracts from each the number of spectra,
+the instrument model, the acquisition start time and the run duration, and
+writes scan_count and meta in batches. Extraction fans out over a process
+pool; every result is also kept in a small cache keyed on (path, size,
+mtime), so a file is only ever parsed again if it changes on disk.
+
+Both readers stream: mzML through ``iterparse``, clearing each spectrum once
+it has been read, and MGF by scanning a memory map of the file — neither
+holds more than one spectrum in memory however large the run. ``.d`` folders
+are read from their analysis.tdf database (see bruker_tdf.py) and counted in
+frames. Thermo .raw files are not readable here and are left alone.
+"""
+import json
+import mmap
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import text
+
+import bruker_tdf
+
+# PSI-MS accessions: scan start time, and instrument-configuration params that
+# are not the instrument model itself.
+_SCAN_START_TIME = "MS:1000016"
+_NOT_MODEL = {"MS:1000529", "MS:1000031", "MS:1000032"}  # serial no., model, customization
+_SECONDS_UNITS = {"UO:0000010", "second"}
+
+_MGF_BEGIN = re.compile(rb"^BEGIN IONS", re.M)
+_MGF_RT = re.compile(rb"^RTINSECONDS=([-+0-9.eE]+)", re.M)
+_MGF_INSTRUMENT = re.compile(rb"^(?:INSTRUMENT|#\s*instrument)\s*[=:]\s*(.+?)\s*$", re.M | re.I)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _minutes(param):
+    value = float(param.get("value"))
+    unit = param.get("unitAccession") or param.get("unitName")
+    return value / 60 if unit in _SECONDS_UNITS else value
+
+
+def read_mzml(path):
+    spectra = 0
+    first_rt = last_rt = None
+    start_time = None
+    groups = {}          # referenceableParamGroup id -> [cvParam]
+    model = None
+    spectrum_list = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = _local(elem.tag)
+        if event == "start":
+            if tag == "run":
+                start_time = elem.get("startTimeStamp")
+            elif tag == "spectrumList":
+                spectrum_list = elem
+            continue
+        if tag == "referenceableParamGroup":
+            groups[elem.get("id")] = [p for p in elem if _local(p.tag) == "cvParam"]
+        elif tag == "instrumentConfiguration" and model is None:
+            params = []
+            for child in elem:
+                if _local(child.tag) == "cvParam":
+                    params.append(child)
+                elif _local(child.tag) == "referenceableParamGroupRef":
+                    params.extend(groups.get(child.get("ref"), []))
+            for p in params:
+                if not p.get("value") and p.get("accession") not in _NOT_MODEL:
+                    model = p.get("name")
+                    break
+        elif tag == "spectrum":
+            spectra += 1
+            for p in elem.iter():
+                if _local(p.tag) == "cvParam" and p.get("accession") == _SCAN_START_TIME:
+                    rt = _minutes(p)
+                    first_rt = rt if first_rt is None else min(first_rt, rt)
+                    last_rt = rt if last_rt is None else max(last_rt, rt)
+                    break
+            # Drop the parsed spectrum so memory stays flat over the run.
+            elem.clear()
+            if spectrum_list is not None:
+                spectrum_list.remove(elem)
+        elif tag == "spectrumList":
+            # Everything after the spectra is chromatograms and the offset index.
+            break
+    return {
+        "format": "mzML",
+        "scan_count": spectra,
+        "instrument_model": model,
+        "start_time": start_time,
+        "run_duration_minutes": round(last_rt - first_rt, 3) if first_rt is not None else None,
+    }
+
+
+def read_mgf(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return {"format": "MGF", "scan_count": 0}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = memoryview(mm)
+            try:
+                spectra = sum(1 for _ in _MGF_BEGIN.finditer(data))
+                times = [float(m.group(1)) for m in _MGF_RT.finditer(data)]
+                match = _MGF_INSTRUMENT.search(data)
+                model = match.group(1).decode(errors="replace") if match else None
+                del match
+            finally:
+                # The map can't close while a view of it is still exported.
+                data.release()
+    return {
+        "format": "MGF",
+        "scan_count": spectra,
+        "instrument_model": model,
+        "start_time": None,
+        "run_duration_minutes": round((max(times) - min(times)) / 60, 3) if times else None,
+    }
+
+
+def extract(path):
+    """Metadata for one file, by extension; raises on unreadable input."""
+    if path.lower().endswith(".mzml"):
+        return read_mzml(path)
+    if path.lower().endswith(".mgf"):
+        return read_mgf(path)
+    if path.lower().endswith(".d"):
+        return bruker_tdf.read_tdf(path)
+    raise ValueError(f"unsupported file type: {path}")
+
+
+def _extract_or_error(path):
+    try:
+        return path, extract(path), None
+    except (OSError, ValueError, ET.ParseError, sqlite3.Error) as exc:
+        return path, None, str(exc)
+
+
+class MetadataCache:
+    """Extraction results keyed on (path, size, mtime), in a SQLite file
+    separate from the catalogue."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS extracted ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, result TEXT NOT NULL)"
+        )
+
+    def get(self, path, size, mtime_ns):
+        row = self.conn.execute(
+            "SELECT result FROM extracted WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, entries):
+        """entries: iterable of (path, size, mtime_ns, result)."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO extracted (path, size, mtime_ns, result) VALUES (?, ?, ?, ?)",
+                [(p, s, m, json.dumps(r)) for p, s, m, r in entries],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+_CANDIDATES = """
+    SELECT id, location, meta FROM acquired_file
+    WHERE ({pending})
+      AND (lower(location) LIKE '%.mzml' OR lower(location) LIKE '%.mgf' OR lower(location) LIKE '%.d')
+    ORDER BY id
+"""
+
+_UPDATE = text("UPDATE acquired_file SET scan_count = :scan_count, meta = :meta WHERE id = :id")
+
+
+def _merged_meta(existing, result):
+    """Extracted fields layered over whatever meta JSON was entered by hand."""
+    try:
+        meta = json.loads(existing) if existing else {}
+    except ValueError:
+        meta = existing
+    if not isinstance(meta, dict):
+        meta = {"previous": meta}
+    meta.update({k: v for k, v in result.items() if k != "scan_count" and v is not None})
+    return json.dumps(meta, sort_keys=True)
+
+
+def _stat(location):
+    """The stat the cache is keyed on: a .d folder's own mtime doesn't change
+    when its analysis.tdf is rewritten, so key those on the database file."""
+    if bruker_tdf.is_tdf_folder(location):
+        return os.stat(os.path.join(location, bruker_tdf.TDF))
+    return os.stat(location)
+
+
+def refresh(session, cache, workers=None, batch_size=500, force=False, limit=None, progress=None):
+    """Extract metadata for pending mzML/MGF/.d acquired files and store it.
+
+    Returns counts of files extracted, served from the cache, missing on
+    disk and failed. ``force`` re-reads files that already have a
+    scan_count (still through the cache).
+    """
+    sql = _CANDIDATES.format(pending="1 = 1" if force else "scan_count IS NULL")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    rows = session.execute(text(sql)).all()
+
+    stats = {"extracted": 0, "cached": 0, "missing": 0, "failed": 0}
+    pending = []   # (row, path, size, mtime_ns) needing a parse
+    updates = []
+
+    def flush():
+        if updates:
+            session.execute(_UPDATE, updates)
+            session.commit()
+            updates.clear()
+
+    def record(row, result):
+        updates.append({"id": row.id, "scan_count": result["scan_count"], "meta": _merged_meta(row.meta, result)})
+        if len(updates) >= batch_size:
+            flush()
+
+    for row in rows:
+        try:
+            st = _stat(row.location)
+        except OSError:
+            stats["missing"] += 1
+            continue
+        cached = cache.get(row.location, st.st_size, st.st_mtime_ns)
+        if cached is not None:
+            stats["cached"] += 1
+            record(row, cached)
+        else:
+            pending.append((row, row.location, st.st_size, st.st_mtime_ns))
+
+    by_path = {}
+    for entry in pending:
+        by_path.setdefault(entry[1], []).append(entry)
+    paths = list(by_path)
+    if workers == 1 or len(paths) < 2:
+        results = map(_extract_or_error, paths)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_extract_or_error, paths, chunksize=max(1, min(16, len(paths) // 64)))
+    try:
+        fresh = []
+        for path, result, error in results:
+            entries = by_path[path]
+            if error is not None:
+                stats["failed"] += len(entries)
+                if progress:
+                    progress(f"{path}: {error}")
+                continue
+            stats["extracted"] += len(entries)
+            _, _, size, mtime_ns = entries[0]
+            fresh.append((path, size, mtime_ns, result))
+            for row, *_ in entries:
+                record(row, result)
+            if len(fresh) >= batch_size:
+                cache.put_many(fresh)
+                fresh.clear()
+        cache.put_many(fresh)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    flush()
+    return stats
@@ -0,0 +1,95 @@
+"""Queue-vs-acquisition reconciliation.
+
+A queued run and the raw file it produces share one name: queued_file.run_name
+(file_name_root + postfix, STORED) and acquired_file.run_name (the filename
+without its extension). Both sides are indexed on it, so each of the two
+checks below is an index probe per row rather than a join over the history:
+
+- a *missing* run is a queued sample run with no acquired file of its name;
+- an *orphan* file is an acquired file whose name matches no queued run,
+  live or archived, sample or blank.
+
+The per-day counts are materialised with the rest of the instrument
+statistics (`flask refresh-instrument-stats`, incremental through
+instrument_day_dirty): missing = queued_runs - matched_runs, and
+orphan_files. The lists themselves are read for a date window on demand.
+"""
+from sqlalchemy import text
+
+# Files without a name can't be matched and are not counted. The rest take
+# three probes, one per index: the sample-run and blank-run indexes on
+# queued_file are both partial, so each needs its own run_number predicate.
+_ORPHAN = """
+    {af}.run_name IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM queued_file q
+                    WHERE q.run_name = {af}.run_name AND q.run_number IS NOT NULL)
+    AND NOT EXISTS (SELECT 1 FROM queued_file q
+                    WHERE q.run_name = {af}.run_name AND q.run_number IS NULL)
+    AND NOT EXISTS (SELECT 1 FROM queued_file_archive qa WHERE qa.run_name = {af}.run_name)
+"""
+
+
+def orphan_condition(alias="af"):
+    """SQL condition true for an acquired_file row (aliased ``alias``) that
+    matches no queued run."""
+    return _ORPHAN.format(af=alias)
+
+
+# Candidate days are those whose stats show an unmatched run, plus any changed
+# since the last refresh, so the list is current without scanning the queue's
+# whole history: each day's runs are then read by primary key. The two tables
+# are queried separately (not through queued_file_all) so both arms keep that
+# access path; archived runs are all exported.
+_MISSING_RUNS = """
+    WITH days AS (
+        SELECT instrument_initial, day FROM instrument_day_stats
+        WHERE day BETWEEN :start AND :end AND queued_runs > matched_runs {instrument}
+        UNION
+        SELECT instrument_initial, day FROM instrument_day_dirty
+        WHERE day BETWEEN :start AND :end {instrument}
+    )
+    SELECT q.instrument_initial, q.date_queued, q.daily_counter, q.project_code,
+           q.experiment_code, q.sample_code, q.run_name, q.exported
+    FROM days d
+    JOIN queued_file q ON q.instrument_initial = d.instrument_initial AND q.date_queued = d.day
+    WHERE q.sample_code IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM acquired_file af WHERE af.run_name = q.run_name)
+    UNION ALL
+    SELECT q.instrument_initial, q.date_queued, q.daily_counter, q.project_code,
+           q.experiment_code, q.sample_code, q.run_name, 1
+    FROM days d
+    JOIN queued_file_archive q ON q.instrument_initial = d.instrument_initial AND q.date_queued = d.day
+    WHERE q.sample_code IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM acquired_file af WHERE af.run_name = q.run_name)
+    ORDER BY 2 DESC, 1, 3
+    LIMIT :limit
+"""
+
+_ORPHAN_FILES = """
+    SELECT af.id, af.filename, af.instrument_initial, af.file_date, af.size_bytes,
+           af.project_code, af.experiment_code, af.sample_code
+    FROM acquired_file af
+    WHERE af.file_date BETWEEN :start AND :end
+      {instrument}
+      AND {orphan}
+    ORDER BY af.file_date DESC, af.instrument_initial, af.filename
+    LIMIT :limit
+"""
+
+
+def missing_runs(session, start, end, instrument=None, limit=500):
+    """Queued sample runs in [start, end] that no acquired file matches.
+    ``exported`` is 0 for runs whose sequence has not been sent yet."""
+    sql = _MISSING_RUNS.format(instrument="AND instrument_initial = :instrument" if instrument else "")
+    params = {"start": start.isoformat(), "end": end.isoformat(), "instrument": instrument, "limit": limit}
+    return session.execute(text(sql), params).all()
+
+
+def orphan_files(session, start, end, instrument=None, limit=500):
+    """Acquired files dated in [start, end] that match no queued run."""
+    sql = _ORPHAN_FILES.format(
+        instrument="AND af.instrument_initial = :instrument" if instrument else "",
+        orphan=orphan_condition("af"),
+    )
+    params = {"start": start.isoformat(), "end": end.isoformat(), "instrument": instrument, "limit": limit}
+    return session.execute(text(sql), params).all()
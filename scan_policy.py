@@ -0,0 +1,142 @@
+"""What a directory scan enters and reports, shared by fileInfoScript.py and
+the db_match watcher.
+
+Rules are compiled once, when the policy is built, into one regex per kind,
+so checking an entry costs one match however many rules there are:
+
+- ``exclude`` patterns prune: a matching directory is never entered, a
+  matching file never reported;
+- ``include`` patterns, if any, are what a file must match to be reported;
+- ``extensions`` are checked on the name alone, before anything is stat'ed;
+- ``dir_extensions`` name directories reported as one entry and not
+  entered (e.g. ``.d`` acquisitions);
+- ``max_depth`` stops descending that many levels below the root (0 = the
+  root's own entries only).
+
+A pattern is a glob unless prefixed ``re:``. Globs without a ``/`` match any
+single path component (``xi_data`` skips every folder of that name, ``*.bak``
+every such file); globs with one match whole components at the end of the
+path relative to the root, with ``/`` separators (``backup/old`` skips
+``backup/old`` and ``x/backup/old``, not ``mybackup/old``). Regexes are
+searched for anywhere in that path. Symlinked directories are never entered.
+"""
+import fnmatch
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def _compile(patterns):
+    """(component regex, relative-path regex) for ``patterns``; either may be
+    None if no pattern of that kind was given."""
+    names, paths = [], []
+    for pattern in patterns:
+        if pattern.startswith("re:"):
+            paths.append(pattern[3:])
+        elif "/" in pattern:
+            # Anchored at a component boundary: search() would otherwise let
+            # the glob start part-way through a folder name.
+            paths.append("(?:^|/)" + fnmatch.translate(pattern.strip("/")))
+        else:
+            names.append(fnmatch.translate(pattern))
+    return (
+        re.compile("|".join(f"(?:{p})" for p in names), re.I) if names else None,
+        re.compile("|".join(f"(?:{p})" for p in paths), re.I) if paths else None,
+    )
+
+
+def _matches(compiled, name, rel_path):
+    by_name, by_path = compiled
+    return bool(
+        (by_name is not None and by_name.match(name))
+        or (by_path is not None and by_path.search(rel_path))
+    )
+
+
+class ScanPolicy:
+    def __init__(self, include=(), exclude=(), extensions=None, dir_extensions=(), max_depth=None):
+        self.include = _compile(include) if include else None
+        self.exclude = _compile(exclude)
+        self.extensions = {e.lower() for e in extensions} if extensions is not None else None
+        self.dir_extensions = tuple(e.lower() for e in dir_extensions)
+        self.max_depth = max_depth
+
+    def enter_dir(self, name, rel_path, depth):
+        """Whether to descend into a directory found at ``depth``."""
+        if self.max_depth is not None and depth >= self.max_depth:
+            return False
+        return not _matches(self.exclude, name, rel_path)
+
+    def is_acquisition_dir(self, name):
+        return bool(self.dir_extensions) and name.lower().endswith(self.dir_extensions)
+
+    def _wanted(self, name, rel_path):
+        if _matches(self.exclude, name, rel_path):
+            return False
+        return self.include is None or _matches(self.include, name, rel_path)
+
+    def accept_file(self, name, rel_path):
+        if self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        return self._wanted(name, rel_path)
+
+    def scan_dir(self, path, rel="", depth=0, on_error=None, on_prune=None):
+        """One directory, not recursive: (accepted entries, [(path, rel,
+        depth)] of the subdirectories to scan next). Nothing is stat'ed here
+        beyond what ``scandir`` reports; ``on_error(path, exc)`` is called
+        for unreadable directories and ``on_prune(path)`` for excluded ones."""
+        accepted, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError as exc:
+            if on_error:
+                on_error(path, exc)
+            return accepted, subdirs
+        for entry in entries:
+            rel_path = f"{rel}/{entry.name}" if rel else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError as exc:
+                if on_error:
+                    on_error(entry.path, exc)
+                continue
+            if is_dir:
+                if self.is_acquisition_dir(entry.name):
+                    if self._wanted(entry.name, rel_path):
+                        accepted.append(entry)
+                elif self.enter_dir(entry.name, rel_path, depth):
+                    subdirs.append((entry.path, rel_path, depth + 1))
+                elif on_prune:
+                    on_prune(entry.path)
+            elif self.accept_file(entry.name, rel_path):
+                accepted.append(entry)
+        return accepted, subdirs
+
+    def walk(self, root, on_error=None, on_prune=None, visit=None, workers=1):
+        """Yield each accepted file and acquisition directory under ``root``
+        — the ``os.DirEntry``, or ``visit(entry)`` if given (None results are
+        dropped). With ``workers`` > 1, directories are listed and visited on
+        that many threads, so slow stats on a network mount overlap; the
+        order of results is then unspecified."""
+        def task(path, rel, depth):
+            entries, subdirs = self.scan_dir(path, rel, depth, on_error, on_prune)
+            if visit is not None:
+                entries = [r for r in map(visit, entries) if r is not None]
+            return entries, subdirs
+
+        if workers <= 1:
+            stack = [(os.fspath(root), "", 0)]
+            while stack:
+                results, subdirs = task(*stack.pop())
+                stack.extend(subdirs)
+                yield from results
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(task, os.fspath(root), "", 0)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results, subdirs = future.result()
+                    pending.update(pool.submit(task, *subdir) for subdir in subdirs)
+                    yield from results
@@ -21,6 +21,11 @@ CREATE TABLE experiment (
     PRIMARY KEY (project_code, code)
 );
 
+-- Typeahead (/api/choices/*): case-insensitive prefix ranges over code and
+-- name within a project. The same pattern is used for samples and cell lines.
+CREATE INDEX ix_experiment_code_nocase ON experiment (project_code, code COLLATE NOCASE);
+CREATE INDEX ix_experiment_name_nocase ON experiment (project_code, name COLLATE NOCASE);
+
 CREATE TABLE species (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     species_name TEXT NOT NULL,
@@ -33,6 +38,9 @@ CREATE TABLE cell_line (
     species_id INTEGER NOT NULL REFERENCES species(id)
 );
 
+CREATE INDEX ix_cell_line_id_nocase ON cell_line (cellosaurus_id COLLATE NOCASE);
+CREATE INDEX ix_cell_line_name_nocase ON cell_line (cell_line_name COLLATE NOCASE);
+
 CREATE TABLE mass_spec_sample (
     project_code TEXT NOT NULL,
     experiment_code TEXT NOT NULL,
@@ -82,6 +90,12 @@ CREATE TABLE mass_spec_sample (
         REFERENCES experiment(project_code, code)
 );
 
+CREATE INDEX ix_mass_spec_sample_code_nocase ON mass_spec_sample (project_code, code COLLATE NOCASE);
+CREATE INDEX ix_mass_spec_sample_name_nocase ON mass_spec_sample (project_code, name COLLATE NOCASE);
+-- The sample list's order: keyset paging reads it in short range scans.
+CREATE INDEX ix_mass_spec_sample_listing
+    ON mass_spec_sample (name, project_code, experiment_code, code);
+
 CREATE TABLE virus (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
@@ -134,10 +148,37 @@ CREATE TABLE acquired_file (
     user_initials TEXT,
     scan_count INTEGER,
     meta TEXT,
+    -- Filename without its extension: for a queue-conforming file this is the
+    -- queued run's name, which is how acquisitions are matched back to the queue.
+    run_name TEXT GENERATED ALWAYS AS (
+        CASE WHEN instr(filename, '.') > 0
+             THEN substr(filename, 1, instr(filename, '.') - 1)
+             ELSE filename END
+    ) VIRTUAL,
     FOREIGN KEY (project_code, experiment_code, sample_code)
         REFERENCES mass_spec_sample(project_code, experiment_code, code)
 );
 
+CREATE INDEX ix_acquired_file_run_name ON acquired_file (run_name, file_date);
+
+-- Sample/experiment lookups: the "has acquired files?" EXISTS check before a
+-- delete, the foreign-key check SQLite runs when a sample row is removed, and
+-- (with size_bytes) the per-node file counts/sizes of the index tree, read
+-- from the index alone.
+CREATE INDEX ix_acquired_file_sample
+    ON acquired_file (project_code, experiment_code, sample_code, size_bytes);
+
+-- Covers the instrument-usage timeseries: a date-range scan that never has to
+-- visit the table rows.
+CREATE INDEX ix_acquired_file_usage
+    ON acquired_file (file_date, instrument_initial, project_code, size_bytes);
+
+-- /files order (newest first, then by name; id is the rowid, implicitly last),
+-- with NULLs as '' so keyset paging can compare them. The expressions must
+-- match FILE_LISTING_KEYS in views/files.py for the planner to use it.
+CREATE INDEX ix_acquired_file_listing
+    ON acquired_file (ifnull(file_date, '') DESC, ifnull(filename, ''));
+
 CREATE TABLE queued_file (
     instrument_initial TEXT NOT NULL,
     date_queued DATE NOT NULL,
@@ -151,6 +192,9 @@ CREATE TABLE queued_file (
     user_initials TEXT,
     postfix TEXT,
     exported BOOLEAN NOT NULL DEFAULT 0,
+    -- STORED rather than VIRTUAL so filename lookups read a value instead of
+    -- re-running printf/concat_ws on every row (`flask migrate-db` converts
+    -- older databases).
     file_name_root TEXT GENERATED ALWAYS AS (
         instrument_initial || '_' || replace(date_queued, '-', '')
         || CASE WHEN nullif(sample_code, '') IS NOT NULL
@@ -159,8 +203,449 @@ CREATE TABLE queued_file (
                                                nullif(experiment_code, ''), nullif(sample_code, ''))
                      || '_'
                 ELSE '_' END
-    ) VIRTUAL,
+    ) STORED,
+    -- The full run filename without extension (what queued_filename() builds,
+    -- and what acquired_file.run_name holds for the file the run produced).
+    run_name TEXT GENERATED ALWAYS AS (
+        CASE WHEN nullif(sample_code, '') IS NULL
+                 THEN file_name_root || coalesce(nullif(postfix, ''), 'BLANK-AND-CLEANING')
+             WHEN nullif(postfix, '') IS NULL
+                 THEN substr(file_name_root, 1, length(file_name_root) - 1)
+             ELSE file_name_root || postfix END
+    ) STORED,
     PRIMARY KEY (instrument_initial, date_queued, daily_counter),
     FOREIGN KEY (project_code, experiment_code, sample_code)
         REFERENCES mass_spec_sample(project_code, experiment_code, code)
 );
+
+-- The queue panel only ever reads pending rows (its instrument tabs and one
+-- day's runs); keep both lookups off the exported history.
+CREATE INDEX ix_queued_file_pending
+    ON queued_file (date_queued, instrument_initial, daily_counter) WHERE exported = 0;
+CREATE INDEX ix_queued_file_pending_instrument
+    ON queued_file (instrument_initial) WHERE exported = 0;
+-- Bulk sample/experiment deletes, and the foreign-key check on sample removal.
+CREATE INDEX ix_queued_file_sample
+    ON queued_file (project_code, experiment_code, sample_code);
+
+-- Raw-file name -> queued sample run in one probe (/api/queue/lookup, db_match).
+-- Sample run numbers are never reused for an instrument's day, so a sample
+-- run's name is unique; blanks all share one name per day and are left out.
+CREATE UNIQUE INDEX ix_queued_file_run_name
+    ON queued_file (run_name) WHERE run_number IS NOT NULL;
+-- ...and the blanks, so "is this acquired file queued at all?" (the orphan
+-- check of the reconciliation report) is an index probe on either side.
+CREATE INDEX ix_queued_file_blank_run_name
+    ON queued_file (run_name) WHERE run_number IS NULL;
+
+-- Exported rows moved out of queued_file by `flask archive-queue`.
+-- file_name_root is frozen as plain text at archive time.
+CREATE TABLE queued_file_archive (
+    instrument_initial TEXT NOT NULL,
+    date_queued DATE NOT NULL,
+    daily_counter INTEGER NOT NULL,
+    run_number INTEGER,
+    project_code TEXT,
+    experiment_code TEXT,
+    sample_code TEXT,
+    user_initials TEXT,
+    postfix TEXT,
+    file_name_root TEXT,
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Same expression as queued_file.run_name, over the frozen root.
+    run_name TEXT GENERATED ALWAYS AS (
+        CASE WHEN nullif(sample_code, '') IS NULL
+                 THEN file_name_root || coalesce(nullif(postfix, ''), 'BLANK-AND-CLEANING')
+             WHEN nullif(postfix, '') IS NULL
+                 THEN substr(file_name_root, 1, length(file_name_root) - 1)
+             ELSE file_name_root || postfix END
+    ) STORED,
+    PRIMARY KEY (instrument_initial, date_queued, daily_counter)
+);
+
+CREATE INDEX ix_queued_file_archive_run_name ON queued_file_archive (run_name);
+
+-- Highest daily_counter / run_number archived per instrument day, so numbering
+-- never re-issues a number already burned into an exported sequence.
+CREATE TABLE queue_high_water (
+    instrument_initial TEXT NOT NULL,
+    date_queued DATE NOT NULL,
+    daily_counter INTEGER NOT NULL DEFAULT 0,
+    run_number INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (instrument_initial, date_queued)
+);
+
+CREATE TABLE instrument (
+    initial TEXT NOT NULL PRIMARY KEY,
+    name TEXT NOT NULL,
+    sequence_template TEXT NOT NULL DEFAULT 'xcalibur',
+    data_path TEXT,
+    instrument_method TEXT,
+    active INTEGER NOT NULL DEFAULT 1
+);
+
+-- Change counter per instrument day queue. The sequence-export cache is keyed
+-- on it, so a repeated download is served from cache until the queue changes.
+-- Counters restart at 1 in a new database while the cache directory keeps its
+-- files, so each row also carries a random token, fixed when the row is
+-- created, that goes into the key alongside the version.
+CREATE TABLE queue_version (
+    instrument_initial TEXT NOT NULL,
+    date_queued DATE NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    token TEXT NOT NULL DEFAULT (lower(hex(randomblob(8)))),
+    PRIMARY KEY (instrument_initial, date_queued)
+);
+
+CREATE TRIGGER queued_file_version_ai AFTER INSERT ON queued_file BEGIN
+    INSERT INTO queue_version (instrument_initial, date_queued, version)
+    VALUES (new.instrument_initial, new.date_queued, 1)
+    ON CONFLICT (instrument_initial, date_queued) DO UPDATE SET version = version + 1;
+END;
+
+-- A run moved to another instrument or day changes both queues.
+CREATE TRIGGER queued_file_version_au AFTER UPDATE ON queued_file BEGIN
+    INSERT INTO queue_version (instrument_initial, date_queued, version)
+    VALUES (old.instrument_initial, old.date_queued, 1)
+    ON CONFLICT (instrument_initial, date_queued) DO UPDATE SET version = version + 1;
+    INSERT INTO queue_version (instrument_initial, date_queued, version)
+    SELECT new.instrument_initial, new.date_queued, 1
+    WHERE new.instrument_initial IS NOT old.instrument_initial OR new.date_queued IS NOT old.date_queued
+    ON CONFLICT (instrument_initial, date_queued) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER queued_file_version_ad AFTER DELETE ON queued_file BEGIN
+    INSERT INTO queue_version (instrument_initial, date_queued, version)
+    VALUES (old.instrument_initial, old.date_queued, 1)
+    ON CONFLICT (instrument_initial, date_queued) DO UPDATE SET version = version + 1;
+END;
+
+-- The sample name is written into each run's comment, so a rename invalidates
+-- every day queue that holds one of the sample's runs.
+CREATE TRIGGER mass_spec_sample_version_au AFTER UPDATE OF name ON mass_spec_sample BEGIN
+    UPDATE queue_version SET version = version + 1
+    WHERE (instrument_initial, date_queued) IN (
+        SELECT instrument_initial, date_queued FROM queued_file
+        WHERE project_code = new.project_code
+          AND experiment_code = new.experiment_code
+          AND sample_code = new.code
+    );
+END;
+
+-- Change counters for the JSON APIs: a scope's version is bumped (and
+-- changed_at set) by triggers on every change to the tables its responses are
+-- built from, and the API derives its ETag and Last-Modified from it, so an
+-- unchanged response is answered with a 304 without being rebuilt.
+--   tree:  /api/tree and /api/tree/children (projects, experiments, samples,
+--          and the acquired files' place and size in that tree);
+--   queue: /api/queue (every queued_file row: the instrument tabs list all
+--          pending queues, not only the requested day's).
+CREATE TABLE data_version (
+    scope TEXT NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER project_data_version_ai AFTER INSERT ON project BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER project_data_version_au AFTER UPDATE ON project BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER project_data_version_ad AFTER DELETE ON project BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER experiment_data_version_ai AFTER INSERT ON experiment BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER experiment_data_version_au AFTER UPDATE ON experiment BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER experiment_data_version_ad AFTER DELETE ON experiment BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER mass_spec_sample_data_version_ai AFTER INSERT ON mass_spec_sample BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER mass_spec_sample_data_version_au AFTER UPDATE ON mass_spec_sample BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER mass_spec_sample_data_version_ad AFTER DELETE ON mass_spec_sample BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER acquired_file_data_version_ai AFTER INSERT ON acquired_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+-- Only the columns the tree shows: metadata edits (scan_count, meta) leave it valid.
+CREATE TRIGGER acquired_file_data_version_au
+AFTER UPDATE OF project_code, experiment_code, sample_code, location, filename, size_bytes ON acquired_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER acquired_file_data_version_ad AFTER DELETE ON acquired_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('tree', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER queued_file_data_version_ai AFTER INSERT ON queued_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('queue', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER queued_file_data_version_au AFTER UPDATE ON queued_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('queue', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER queued_file_data_version_ad AFTER DELETE ON queued_file BEGIN
+    INSERT INTO data_version (scope, version) VALUES ('queue', 1)
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+END;
+
+-- Every queued run, live or archived, with its full run filename (the same
+-- name queued_filename() builds: file_name_root + postfix).
+CREATE VIEW queued_file_all AS
+SELECT instrument_initial, date_queued, daily_counter, run_number, project_code,
+       experiment_code, sample_code, user_initials, postfix, file_name_root, run_name
+FROM queued_file
+UNION ALL
+SELECT instrument_initial, date_queued, daily_counter, run_number, project_code,
+       experiment_code, sample_code, user_initials, postfix, file_name_root, run_name
+FROM queued_file_archive;
+
+-- Materialised per-(instrument, day) utilisation, refreshed incrementally by
+-- `flask refresh-instrument-stats`. Queue counts are by date_queued, acquisition
+-- counts by file_date; matched_runs / lag_days_total describe the day's queued
+-- sample runs that have an acquired file (lag = file_date - date_queued);
+-- orphan_files counts the day's acquired files whose name matches no queued
+-- run, live or archived.
+CREATE TABLE instrument_day_stats (
+    instrument_initial TEXT NOT NULL,
+    day DATE NOT NULL,
+    queued_runs INTEGER NOT NULL DEFAULT 0,
+    blank_runs INTEGER NOT NULL DEFAULT 0,
+    acquired_files INTEGER NOT NULL DEFAULT 0,
+    acquired_bytes INTEGER NOT NULL DEFAULT 0,
+    matched_runs INTEGER NOT NULL DEFAULT 0,
+    lag_days_total REAL NOT NULL DEFAULT 0,
+    orphan_files INTEGER NOT NULL DEFAULT 0,
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instrument_initial, day)
+);
+
+-- (instrument, day) pairs touched since the last refresh.
+CREATE TABLE instrument_day_dirty (
+    instrument_initial TEXT NOT NULL,
+    day DATE NOT NULL,
+    PRIMARY KEY (instrument_initial, day)
+) WITHOUT ROWID;
+
+CREATE TRIGGER queued_file_stats_ai AFTER INSERT ON queued_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty VALUES (new.instrument_initial, new.date_queued);
+END;
+
+CREATE TRIGGER queued_file_stats_au AFTER UPDATE ON queued_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty VALUES (old.instrument_initial, old.date_queued);
+    INSERT OR IGNORE INTO instrument_day_dirty VALUES (new.instrument_initial, new.date_queued);
+END;
+
+CREATE TRIGGER queued_file_stats_ad AFTER DELETE ON queued_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty VALUES (old.instrument_initial, old.date_queued);
+END;
+
+-- A run queued, renamed or removed can turn acquired files into (or out of)
+-- orphans: dirty the acquisition days of the files carrying its old or new
+-- name. Archiving deletes from queued_file too, which re-counts those days
+-- for nothing but keeps the rule simple.
+CREATE TRIGGER queued_file_reconcile_ai AFTER INSERT ON queued_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, file_date FROM acquired_file
+    WHERE run_name = new.run_name AND instrument_initial IS NOT NULL AND file_date IS NOT NULL;
+END;
+
+CREATE TRIGGER queued_file_reconcile_au
+AFTER UPDATE OF instrument_initial, date_queued, run_number, project_code, experiment_code,
+                sample_code, user_initials, postfix ON queued_file
+WHEN old.run_name IS NOT new.run_name BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, file_date FROM acquired_file
+    WHERE run_name IN (old.run_name, new.run_name)
+      AND instrument_initial IS NOT NULL AND file_date IS NOT NULL;
+END;
+
+CREATE TRIGGER queued_file_reconcile_ad AFTER DELETE ON queued_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, file_date FROM acquired_file
+    WHERE run_name = old.run_name AND instrument_initial IS NOT NULL AND file_date IS NOT NULL;
+END;
+
+CREATE TRIGGER acquired_file_stats_ai AFTER INSERT ON acquired_file
+WHEN new.instrument_initial IS NOT NULL AND new.file_date IS NOT NULL BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty VALUES (new.instrument_initial, new.file_date);
+END;
+
+-- Only columns the statistics read, and only when one of them changed:
+-- metadata edits (scan_count, meta) must not dirty whole instrument days. A
+-- renamed or deleted file no longer carries its old run_name, so the refresh
+-- can't find the queue days of the run it matched from the file's own day:
+-- dirty them here. The queue tables are probed separately (not through
+-- queued_file_all) so each lookup uses its run_name index.
+CREATE TRIGGER acquired_file_stats_au
+AFTER UPDATE OF instrument_initial, file_date, filename, size_bytes ON acquired_file
+WHEN old.instrument_initial IS NOT new.instrument_initial OR old.file_date IS NOT new.file_date
+  OR old.filename IS NOT new.filename OR old.size_bytes IS NOT new.size_bytes BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT old.instrument_initial, old.file_date
+    WHERE old.instrument_initial IS NOT NULL AND old.file_date IS NOT NULL;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT new.instrument_initial, new.file_date
+    WHERE new.instrument_initial IS NOT NULL AND new.file_date IS NOT NULL;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file
+    WHERE run_name = old.run_name AND run_number IS NOT NULL AND old.run_name IS NOT new.run_name;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file
+    WHERE run_name = old.run_name AND run_number IS NULL AND old.run_name IS NOT new.run_name;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file_archive
+    WHERE run_name = old.run_name AND old.run_name IS NOT new.run_name;
+END;
+
+CREATE TRIGGER acquired_file_stats_ad AFTER DELETE ON acquired_file BEGIN
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT old.instrument_initial, old.file_date
+    WHERE old.instrument_initial IS NOT NULL AND old.file_date IS NOT NULL;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file
+    WHERE run_name = old.run_name AND run_number IS NOT NULL;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file
+    WHERE run_name = old.run_name AND run_number IS NULL;
+    INSERT OR IGNORE INTO instrument_day_dirty
+    SELECT instrument_initial, date_queued FROM queued_file_archive WHERE run_name = old.run_name;
+END;
+
+-- Full-text search over projects, experiments, samples and acquired files.
+-- search_doc maps each indexed record (kind + its \x1f-joined primary key) to
+-- the rowid of its search_fts row; the triggers below keep both in sync.
+CREATE TABLE search_doc (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    UNIQUE (kind, ref)
+);
+
+CREATE VIRTUAL TABLE search_fts USING fts5(
+    code, name, body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER project_search_ai AFTER INSERT ON project BEGIN
+    INSERT INTO search_doc (kind, ref) VALUES ('project', new.code);
+    INSERT INTO search_fts (rowid, code, name, body)
+    VALUES (last_insert_rowid(), new.code, new.name, new.description);
+END;
+
+CREATE TRIGGER project_search_au AFTER UPDATE OF name, description ON project BEGIN
+    UPDATE search_fts SET name = new.name, body = new.description
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'project' AND ref = old.code);
+END;
+
+CREATE TRIGGER project_search_ad AFTER DELETE ON project BEGIN
+    DELETE FROM search_fts
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'project' AND ref = old.code);
+    DELETE FROM search_doc WHERE kind = 'project' AND ref = old.code;
+END;
+
+CREATE TRIGGER experiment_search_ai AFTER INSERT ON experiment BEGIN
+    INSERT INTO search_doc (kind, ref)
+    VALUES ('experiment', new.project_code || char(31) || new.code);
+    INSERT INTO search_fts (rowid, code, name, body)
+    VALUES (last_insert_rowid(), concat_ws(' ', new.project_code, new.code),
+            new.name, new.description);
+END;
+
+CREATE TRIGGER experiment_search_au AFTER UPDATE OF name, description ON experiment BEGIN
+    UPDATE search_fts SET name = new.name, body = new.description
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'experiment'
+                   AND ref = old.project_code || char(31) || old.code);
+END;
+
+CREATE TRIGGER experiment_search_ad AFTER DELETE ON experiment BEGIN
+    DELETE FROM search_fts
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'experiment'
+                   AND ref = old.project_code || char(31) || old.code);
+    DELETE FROM search_doc
+    WHERE kind = 'experiment' AND ref = old.project_code || char(31) || old.code;
+END;
+
+CREATE TRIGGER mass_spec_sample_search_ai AFTER INSERT ON mass_spec_sample BEGIN
+    INSERT INTO search_doc (kind, ref)
+    VALUES ('sample', new.project_code || char(31) || new.experiment_code || char(31) || new.code);
+    INSERT INTO search_fts (rowid, code, name, body)
+    VALUES (last_insert_rowid(),
+            concat_ws(' ', new.project_code, new.experiment_code, new.code), new.name,
+            concat_ws(' ', new.description, new.tissue, new.disease, new.phenotype, new.crosslinker));
+END;
+
+CREATE TRIGGER mass_spec_sample_search_au
+AFTER UPDATE OF name, description, tissue, disease, phenotype, crosslinker ON mass_spec_sample BEGIN
+    UPDATE search_fts SET
+        name = new.name,
+        body = concat_ws(' ', new.description, new.tissue, new.disease, new.phenotype, new.crosslinker)
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'sample'
+                   AND ref = old.project_code || char(31) || old.experiment_code || char(31) || old.code);
+END;
+
+CREATE TRIGGER mass_spec_sample_search_ad AFTER DELETE ON mass_spec_sample BEGIN
+    DELETE FROM search_fts
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'sample'
+                   AND ref = old.project_code || char(31) || old.experiment_code || char(31) || old.code);
+    DELETE FROM search_doc
+    WHERE kind = 'sample'
+      AND ref = old.project_code || char(31) || old.experiment_code || char(31) || old.code;
+END;
+
+CREATE TRIGGER acquired_file_search_ai AFTER INSERT ON acquired_file BEGIN
+    INSERT INTO search_doc (kind, ref) VALUES ('file', CAST(new.id AS TEXT));
+    INSERT INTO search_fts (rowid, code, name, body)
+    VALUES (last_insert_rowid(),
+            concat_ws(' ', new.project_code, new.experiment_code, new.sample_code),
+            new.filename, new.location);
+END;
+
+CREATE TRIGGER acquired_file_search_au
+AFTER UPDATE OF project_code, experiment_code, sample_code, filename, location ON acquired_file BEGIN
+    UPDATE search_fts SET
+        code = concat_ws(' ', new.project_code, new.experiment_code, new.sample_code),
+        name = new.filename, body = new.location
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'file' AND ref = CAST(old.id AS TEXT));
+END;
+
+CREATE TRIGGER acquired_file_search_ad AFTER DELETE ON acquired_file BEGIN
+    DELETE FROM search_fts
+    WHERE rowid = (SELECT id FROM search_doc WHERE kind = 'file' AND ref = CAST(old.id AS TEXT));
+    DELETE FROM search_doc WHERE kind = 'file' AND ref = CAST(old.id AS TEXT);
+END;
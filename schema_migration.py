@@ -0,0 +1,186 @@
+"""Bring an existing database up to date with schema.sql.
+
+``init-db`` only creates a fresh database. ``migrate`` compares a live one
+against schema.sql and applies what is missing or different, in this order:
+
+1. tables in schema.sql that don't exist yet are created;
+2. tables whose columns differ from schema.sql (added, or a generated
+   column changed between VIRTUAL and STORED — neither of which SQLite can
+   ALTER in place) are rebuilt, copying the columns old and new share;
+3. every index, trigger and view whose definition differs from schema.sql
+   is dropped and recreated, and missing ones are created.
+
+It all runs in one transaction, so a failure (e.g. a unique index that the
+existing rows violate) leaves the database as it was.
+
+Standard library only, so a database can be created or migrated on a host
+without the web app's dependencies (``flask init-db`` / ``migrate-db`` do the
+same through the app)::
+
+    python schema_migration.py samples.db [--init]
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+_CREATE = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?(?:VIRTUAL\s+)?(TABLE|INDEX|TRIGGER|VIEW)\s+(\w+)", re.I
+)
+_COMMENT = re.compile(r"^\s*--.*$", re.M)
+
+
+class MigrationError(Exception):
+    pass
+
+
+def schema_objects(schema_sql):
+    """(type, name, sql) for each CREATE statement in schema.sql, in order."""
+    objects, pending = [], ""
+    for line in schema_sql.splitlines(keepends=True):
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statement = _COMMENT.sub("", pending).strip()
+            pending = ""
+            match = _CREATE.match(statement)
+            if match:
+                objects.append((match.group(1).lower(), match.group(2), statement.rstrip(";").strip()))
+    return objects
+
+
+def _normalise(sql):
+    return " ".join(re.sub(r"--[^\n]*", "", sql or "").split()).lower()
+
+
+def _columns(conn, table):
+    """(name, hidden) per column; hidden is 2 for VIRTUAL and 3 for STORED
+    generated columns."""
+    return [(row[1], row[6]) for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+
+
+def _expected_columns(objects):
+    reference = sqlite3.connect(":memory:")
+    try:
+        expected = {}
+        for kind, name, sql in objects:
+            if kind == "table" and not re.match(r"CREATE\s+VIRTUAL", sql, re.I):
+                reference.execute(sql)
+                expected[name] = (sql, _columns(reference, name))
+        return expected
+    finally:
+        reference.close()
+
+
+def _rebuild_table(conn, name, create_sql):
+    """Recreate ``name`` from ``create_sql``, copying every ordinary column the
+    old and new definitions share. Its indexes and triggers go with the old
+    table and are recreated by the sync step."""
+    old_columns = [row[1] for row in conn.execute(f"PRAGMA table_xinfo({name})") if row[6] == 0]
+    conn.execute(re.sub(rf"\b{name}\b", f"{name}__new", create_sql, count=1))
+    new_columns = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({name}__new)") if row[6] == 0}
+    shared = ", ".join(c for c in old_columns if c in new_columns)
+    conn.execute(f"INSERT INTO {name}__new ({shared}) SELECT {shared} FROM {name}")
+    conn.execute(f"DROP TABLE {name}")
+    conn.execute(f"ALTER TABLE {name}__new RENAME TO {name}")
+
+
+def migrate(conn, schema_sql):
+    """Apply schema.sql to the database on ``conn`` (a sqlite3 connection);
+    returns a description of each change made."""
+    objects = schema_objects(schema_sql)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    changes = []
+    conn.isolation_level = None
+    conn.execute("PRAGMA foreign_keys=OFF")
+    # Tables are dropped/renamed while views still name them; check those
+    # references once, at the end, instead of on every ALTER.
+    conn.execute("PRAGMA legacy_alter_table=ON")
+    conn.execute("BEGIN")
+    try:
+        for kind, name, sql in objects:
+            if kind == "table" and name not in existing:
+                conn.execute(sql)
+                changes.append(f"created table {name}")
+
+        for name, (sql, columns) in _expected_columns(objects).items():
+            if _columns(conn, name) != columns:
+                _rebuild_table(conn, name, sql)
+                changes.append(f"rebuilt table {name}")
+
+        current = {
+            (row[0], row[1]): row[2]
+            for row in conn.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL")
+        }
+        for kind, name, sql in objects:
+            if kind == "table":
+                continue
+            old = current.get((kind, name))
+            if old is not None and _normalise(old) == _normalise(sql):
+                continue
+            if old is not None:
+                conn.execute(f"DROP {kind.upper()} {name}")
+            try:
+                conn.execute(sql)
+            except sqlite3.IntegrityError as exc:
+                raise MigrationError(f"cannot create {kind} {name}: {exc}") from exc
+            changes.append(f"{'recreated' if old is not None else 'created'} {kind} {name}")
+
+        problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if problems:
+            raise MigrationError(f"foreign key violations after migrating: {problems[:5]}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA legacy_alter_table=OFF")
+        conn.execute("PRAGMA foreign_keys=ON")
+    return changes
+
+
+def read_schema(path=SCHEMA_PATH):
+    with open(path) as f:
+        return f.read()
+
+
+def init(db_path, schema_sql):
+    """Create a fresh database at ``db_path`` from schema.sql."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(schema_sql)
+    finally:
+        conn.close()
+
+
+def migrate_path(db_path, schema_sql):
+    """``migrate`` on the database file at ``db_path``."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrate(conn, schema_sql)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or migrate a database from schema.sql.")
+    parser.add_argument("db", help="SQLite database file")
+    parser.add_argument("--init", action="store_true", help="create a fresh database instead of migrating")
+    args = parser.parse_args()
+    if args.init:
+        init(args.db, read_schema())
+        print(f"Initialized database at {args.db}")
+        return
+    try:
+        changes = migrate_path(args.db, read_schema())
+    except MigrationError as exc:
+        raise SystemExit(str(exc))
+    for change in changes:
+        print(change)
+    print(f"Applied {len(changes)} change(s) to {args.db}." if changes else f"{args.db} is already up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Full-text search over the catalogue, backed by the search_fts FTS5 table.
+
+Triggers in schema.sql keep search_fts/search_doc in step with every insert,
+update and delete of projects, experiments, samples and acquired files;
+``rebuild`` repopulates both from scratch (for databases created before the
+index existed, or after bulk edits made with triggers disabled).
+"""
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+KINDS = ("project", "experiment", "sample", "file")
+
+# Column weights for bm25(): a hit in a code or name outranks one in the body.
+_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Highlight markers — control characters that never occur in catalogue text,
+# swapped for <mark> only after the surrounding text has been HTML-escaped.
+_OPEN, _CLOSE = "\x01", "\x03"
+
+_REBUILD = [
+    "DELETE FROM search_fts",
+    "DELETE FROM search_doc",
+    "INSERT INTO search_doc (kind, ref) SELECT 'project', code FROM project",
+    """INSERT INTO search_doc (kind, ref)
+       SELECT 'experiment', project_code || char(31) || code FROM experiment""",
+    """INSERT INTO search_doc (kind, ref)
+       SELECT 'sample', project_code || char(31) || experiment_code || char(31) || code
+       FROM mass_spec_sample""",
+    "INSERT INTO search_doc (kind, ref) SELECT 'file', CAST(id AS TEXT) FROM acquired_file",
+    """INSERT INTO search_fts (rowid, code, name, body)
+       SELECT d.id, p.code, p.name, p.description
+       FROM project p JOIN search_doc d ON d.kind = 'project' AND d.ref = p.code""",
+    """INSERT INTO search_fts (rowid, code, name, body)
+       SELECT d.id, concat_ws(' ', e.project_code, e.code), e.name, e.description
+       FROM experiment e
+       JOIN search_doc d ON d.kind = 'experiment'
+        AND d.ref = e.project_code || char(31) || e.code""",
+    """INSERT INTO search_fts (rowid, code, name, body)
+       SELECT d.id, concat_ws(' ', s.project_code, s.experiment_code, s.code), s.name,
+              concat_ws(' ', s.description, s.tissue, s.disease, s.phenotype, s.crosslinker)
+       FROM mass_spec_sample s
+       JOIN search_doc d ON d.kind = 'sample'
+        AND d.ref = s.project_code || char(31) || s.experiment_code || char(31) || s.code""",
+    """INSERT INTO search_fts (rowid, code, name, body)
+       SELECT d.id, concat_ws(' ', f.project_code, f.experiment_code, f.sample_code),
+              f.filename, f.location
+       FROM acquired_file f JOIN search_doc d ON d.kind = 'file' AND d.ref = CAST(f.id AS TEXT)""",
+    "INSERT INTO search_fts (search_fts) VALUES ('optimize')",
+]
+
+
+def rebuild(session):
+    """Repopulate the search index from the catalogue tables; returns the
+    number of indexed records."""
+    for statement in _REBUILD:
+        session.execute(text(statement))
+    session.commit()
+    return session.execute(text("SELECT count(*) FROM search_doc")).scalar()
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every word must match, each as a
+    prefix. Quoting each token keeps user input from being parsed as FTS5
+    syntax (AND/OR/NEAR, column filters, unbalanced quotes). Returns None when
+    there is nothing searchable in ``query``."""
+    tokens = re.findall(r"\w+", query or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _marked(value):
+    if not value:
+        return Markup("")
+    return Markup(
+        str(escape(value)).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+    )
+
+
+def search(session, query, kind=None, limit=50):
+    """Ranked matches for ``query`` as dicts of kind, ref parts and
+    HTML-safe highlighted code/name/snippet."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    sql = f"""
+        SELECT d.kind, d.ref,
+               highlight(search_fts, 0, :open, :close) AS code,
+               highlight(search_fts, 1, :open, :close) AS name,
+               snippet(search_fts, 2, :open, :close, '…', 16) AS snippet
+        FROM search_fts
+        JOIN search_doc d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH :expression
+        {"AND d.kind = :kind" if kind else ""}
+        ORDER BY bm25(search_fts, {", ".join(str(w) for w in _WEIGHTS)})
+        LIMIT :limit
+    """
+    rows = session.execute(text(sql), {
+        "open": _OPEN, "close": _CLOSE, "expression": expression,
+        "kind": kind, "limit": limit,
+    })
+    return [
+        {
+            "kind": row.kind,
+            "ref": row.ref.split("\x1f"),
+            "code": _marked(row.code),
+            "name": _marked(row.name),
+            "snippet": _marked(row.snippet),
+        }
+        for row in rows
+    ]
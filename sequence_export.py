@@ -0,0 +1,191 @@
+"""Vendor sequence-file templates and the on-disk cache of generated exports.
+
+Every acquisition package imports a day's run list in its own layout: Thermo
+Xcalibur, Bruker HyStar and SCIEX OS each want different columns, a different
+data path and a different notion of a blank. A template turns the ordered
+queue for one instrument/day into the bytes of that file; which template an
+instrument uses is configured on its ``Instrument`` row. New vendors are added
+by registering another ``SequenceTemplate`` subclass here — the export route
+never needs to change.
+"""
+import abc
+import csv
+import hashlib
+import io
+import os
+import tempfile
+from collections import namedtuple
+
+# One queued run as the templates see it. ``label`` is the
+# project_experiment_sample code chain (None for blanks).
+SequenceRun = namedtuple("SequenceRun", "filename label sample_name is_blank")
+
+SEQUENCE_TEMPLATES = {}
+
+
+def sequence_template(key):
+    """Class decorator registering a template under ``key`` (the value stored
+    in ``instrument.sequence_template``)."""
+    def register(cls):
+        cls.key = key
+        SEQUENCE_TEMPLATES[key] = cls()
+        return cls
+    return register
+
+
+def template_choices():
+    return [(key, t.label) for key, t in sorted(SEQUENCE_TEMPLATES.items())]
+
+
+class SequenceTemplate(abc.ABC):
+    key = None
+    label = ""
+    extension = "csv"
+    mimetype = "text/csv"
+    # Instrument PCs are Windows boxes: write cp1252 so ASCII passes through
+    # untouched and the occasional µ/° in a sample name survives. Anything it
+    # can't represent is replaced rather than crashing the export.
+    encoding = "cp1252"
+    # strftime pattern expanded with the queue day; an instrument's data_path
+    # overrides it.
+    default_data_path = ""
+    # Bump when the layout changes so cached exports of the old layout are
+    # never served again.
+    revision = 1
+
+    def data_path(self, day, instrument=None):
+        pattern = (instrument.data_path if instrument is not None else None) or self.default_data_path
+        return day.strftime(pattern)
+
+    def method(self, instrument=None):
+        return (instrument.instrument_method if instrument is not None else None) or ""
+
+    @staticmethod
+    def comment(run):
+        if run.is_blank:
+            return "BLANK-AND-CLEANING"
+        return f"{run.label} - {run.sample_name or ''}"
+
+    @abc.abstractmethod
+    def header(self):
+        """Rows written before the runs."""
+
+    @abc.abstractmethod
+    def row(self, position, run, path, method):
+        """The row for one run."""
+
+    def render(self, runs, day, instrument=None):
+        """Build the sequence file for one instrument's ordered day queue."""
+        path = self.data_path(day, instrument)
+        method = self.method(instrument)
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerows(self.header())
+        for position, run in enumerate(runs, start=1):
+            writer.writerow(self.row(position, run, path, method))
+        return buf.getvalue().encode(self.encoding, errors="replace")
+
+
+@sequence_template("xcalibur")
+class XcaliburTemplate(SequenceTemplate):
+    """Thermo Xcalibur sequence CSV (plain Windows-ANSI text, not UTF-7)."""
+    label = "Thermo Xcalibur"
+    default_data_path = "D:\\Data\\%Y\\%y%m\\%y%m%d"
+
+    def header(self):
+        return [
+            ["Bracket Type=4", "", "", "", "", ""],
+            ["File Name", "Path", "Instrument Method", "Position", "Inj Vol", "Comment"],
+        ]
+
+    def row(self, position, run, path, method):
+        return [run.filename, path, method, "", "", self.comment(run)]
+
+
+@sequence_template("hystar")
+class HyStarTemplate(SequenceTemplate):
+    """Bruker HyStar sample-table import (timsTOF)."""
+    label = "Bruker HyStar"
+    default_data_path = "D:\\Data\\%Y%m%d"
+
+    def header(self):
+        return [["Vial", "Sample ID", "Data Path", "Method Set", "Injection Volume", "Comment"]]
+
+    def row(self, position, run, path, method):
+        return ["", run.filename, path, method, "", self.comment(run)]
+
+
+@sequence_template("sciex")
+class SciexTemplate(SequenceTemplate):
+    """SCIEX OS batch import; blanks are typed as such rather than Unknown."""
+    label = "SCIEX OS"
+    default_data_path = "D:\\SCIEX OS Data\\%Y%m%d"
+
+    def header(self):
+        return [[
+            "Sample Name", "Sample ID", "Sample Type", "Acquisition Method",
+            "Vial Position", "Injection Volume", "Data File", "Comment",
+        ]]
+
+    def row(self, position, run, path, method):
+        return [
+            run.filename, run.label or "", "Blank" if run.is_blank else "Unknown", method,
+            "", "", f"{path}\\{run.filename}", self.comment(run),
+        ]
+
+
+class SequenceCache:
+    """Content-addressed store of generated sequence files.
+
+    Entries are named by a SHA-256 over everything that determines the file's
+    bytes (instrument settings, template revision, queue day and the queue's
+    version counter and token), so a hit is always byte-identical to a fresh
+    render and nothing ever needs invalidating — a changed queue simply hashes
+    to a new name. Oldest entries are pruned once ``max_files`` is exceeded.
+    """
+
+    def __init__(self, directory, max_files=500):
+        self.directory = directory
+        self.max_files = max_files
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write-then-rename so a concurrent reader never sees a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return
+        self._prune()
+
+    def _prune(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if not e.name.startswith(".")]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_files]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,61 @@
+// Option lists fetched on demand from the /api/choices/* endpoints, so forms
+// no longer embed the whole catalogue. No external dependencies.
+// Exposes window.Choices:
+//   load(url, params)                  -> Promise<{results: [{value, label}], more}>
+//   fillSelect(sel, results, selected) -> replace a <select>'s options, keeping
+//                                         the blank first option and `selected`
+//   onFilter(input, callback)          -> debounced callback(q) as the user types
+
+(function () {
+  function load(url, params) {
+    var qs = new URLSearchParams();
+    Object.keys(params || {}).forEach(function (k) {
+      if (params[k]) qs.set(k, params[k]);
+    });
+    return fetch(url + "?" + qs.toString()).then(function (r) {
+      if (!r.ok) throw new Error(r.status + " " + r.statusText);
+      return r.json();
+    });
+  }
+
+  function option(value, label, selected) {
+    var o = document.createElement("option");
+    o.value = value;
+    o.textContent = label;
+    o.selected = !!selected;
+    return o;
+  }
+
+  function fillSelect(sel, results, selected, more) {
+    var current = selected != null ? String(selected) : "";
+    var keep = null;
+    // The selected option may not be among this page of matches; keep it.
+    Array.prototype.forEach.call(sel.options, function (o) {
+      if (o.value && o.value === current) keep = o.textContent;
+    });
+    sel.innerHTML = "";
+    sel.appendChild(option("", "—", !current));
+    var found = false;
+    results.forEach(function (r) {
+      var isSelected = String(r.value) === current;
+      found = found || isSelected;
+      sel.appendChild(option(r.value, r.label, isSelected));
+    });
+    if (current && !found && keep !== null) sel.appendChild(option(current, keep, true));
+    if (more) {
+      var hint = option("", "… type to narrow the list", false);
+      hint.disabled = true;
+      sel.appendChild(hint);
+    }
+  }
+
+  function onFilter(input, callback) {
+    var timer = null;
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () { callback(input.value.trim()); }, 200);
+    });
+  }
+
+  window.Choices = { load: load, fillSelect: fillSelect, onFilter: onFilter };
+})();
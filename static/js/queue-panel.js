@@ -1,6 +1,7 @@
 // Bottom "Queued Files" panel — present on every page (see base.html).
 // Browses queued_file by instrument tab + date, edits postfix, inserts
-// BLANK-AND-CLEANING runs, and exports the day's Xcalibur sequence CSV.
+// BLANK-AND-CLEANING runs, and exports the day's instrument sequence file
+// (Xcalibur, HyStar or SCIEX layout, per the instrument registry).
 (function () {
   const panel = document.getElementById('queue-panel');
   if (!panel) return;
@@ -1,15 +1,33 @@
 // Collapsible tree widget — no external dependencies.
 // Exposes window.TreeWidget.render(container, rootData, options).
 //
-// rootData: { name, level, total_bytes, url?, children? }
+// rootData: { name, level, total_bytes, url?, counts?, children?,
+//             child_total?, children_url? }
+//   counts        precomputed descendant counts ({experiments, samples, files})
+//                 shown in the labels
+//   children      the children loaded so far — may be just a first page
+//   child_total   how many children exist in all (defaults to children.length)
+//   children_url  where the rest come from: GET <children_url>&offset=N returns
+//                 { total, offset, children: [node, ...] }, each child shaped
+//                 like rootData
 // container: CSS selector string or DOM element
 // options:
-//   label(node)     -> string  (receives plain data object, not d3 node)
+//   label(node)     -> string  (receives plain data object)
 //   onClick(node)   -> called after collapse/expand toggle
 //   levelNames      -> array of column header strings indexed by depth
 //   hideRoot        -> omit depth-0 root node (default false)
+//   height          -> viewport height in px (default 600)
+//   rowHeight       -> px per row (default 28)
+//
+// The tree is drawn as a flat list of the currently visible rows, and only the
+// rows inside the scroll viewport (plus a little overscan) exist in the DOM, so
+// expanding a sample with thousands of files costs the same as expanding one
+// with ten. Children not yet loaded are fetched when their parent is expanded,
+// and further pages when the "more" row at the end of a list scrolls into view.
 
 (function () {
+  var OVERSCAN = 10;
+
   function resolveContainer(c) {
     return typeof c === "string" ? document.querySelector(c) : c;
   }
@@ -20,9 +38,11 @@
   }
 
   function childCount(node) {
+    if (node.child_total != null) return node.child_total;
     return node.children ? node.children.length : 0;
   }
 
+  // Fallback for static trees passed without precomputed counts.
   function countDescendants(data, targetLevel) {
     if (!data.children || !data.children.length) return 0;
     var count = 0;
@@ -33,6 +53,11 @@
     return count;
   }
 
+  function descendants(node, level) {
+    if (node.counts && node.counts[level] != null) return node.counts[level];
+    return countDescendants(node, level);
+  }
+
   function defaultLabel(node) {
     var name = node.name;
     var level = node.level;
@@ -40,13 +65,13 @@
     var size = fmtGB(bytes);
     if (level === "project") {
       var exps = childCount(node);
-      var samples = countDescendants(node, "sample");
-      var files = countDescendants(node, "file");
+      var samples = descendants(node, "samples");
+      var files = descendants(node, "files");
       return name + " (" + exps + " experiments · " + samples + " samples · " + files + " files, " + size + ")";
     }
     if (level === "experiment") {
       var samples = childCount(node);
-      var files = countDescendants(node, "file");
+      var files = descendants(node, "files");
       return name + " (" + samples + " samples · " + files + " files, " + size + ")";
     }
     if (level === "sample") {
@@ -60,19 +85,55 @@
     return name;
   }
 
-  // Recursively build the tree. Each node carries:
-  //   .data       — original data object
-  //   .children   — null (collapsed) or array of child nodes
-  //   ._children  — full child array when collapsed
+  // Each tree node carries:
+  //   .data      — original data object
+  //   .children  — child nodes loaded so far
+  //   .total     — number of children in all (loaded or not)
+  //   .expanded, .loading
   //   .depth
-  function buildTree(data, depth) {
-    var node = { data: data, depth: depth, children: null, _children: null };
-    if (data.children && data.children.length) {
-      node._children = data.children.map(function (c) { return buildTree(c, depth + 1); });
-    }
+  function buildNode(data, depth) {
+    var node = {
+      data: data,
+      depth: depth,
+      children: [],
+      total: childCount(data),
+      expanded: false,
+      loading: false,
+    };
+    (data.children || []).forEach(function (c) {
+      node.children.push(buildNode(c, depth + 1));
+    });
     return node;
   }
 
+  function injectStyle() {
+    if (document.getElementById("stw-style")) return;
+    var style = document.createElement("style");
+    style.id = "stw-style";
+    style.textContent = [
+      /* force light scheme regardless of OS dark mode */
+      "#tree-container { background: #fff; color: #222; }",
+      ".stw-tree { font: 15px/1.6 sans-serif; color: #222; padding: 8px 0;",
+      "            position: relative; overflow-y: auto; }",
+      ".stw-spacer { position: relative; }",
+      ".stw-row { position: absolute; left: 0; right: 0; box-sizing: border-box;",
+      "           display: flex; align-items: center; gap: 6px; padding: 0 6px;",
+      "           border-radius: 3px; cursor: default; background: #fff; }",
+      ".stw-row:hover { background: #eef3fb; }",
+      ".stw-toggle { width: 18px; height: 18px; display: flex; align-items: center;",
+      "              justify-content: center; flex-shrink: 0; cursor: pointer;",
+      "              color: #3b6ea5; font-size: 12px; user-select: none; }",
+      ".stw-toggle:hover { color: #1a4a88; }",
+      ".stw-dot { width: 7px; height: 7px; border-radius: 50%; background: #ccc;",
+      "           border: 1px solid #aaa; flex-shrink: 0; margin-left: 5px; }",
+      ".stw-label { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; color: #222; }",
+      ".stw-label.linkable { color: #1a4a9e; cursor: pointer; text-decoration: none; }",
+      ".stw-label.linkable:hover { text-decoration: underline; }",
+      ".stw-more { color: #666; font-style: italic; font-size: 13px; }",
+    ].join("\n");
+    document.head.appendChild(style);
+  }
+
   function render(container, rootData, options) {
     options = options || {};
     var el = resolveContainer(container);
@@ -80,128 +141,116 @@
 
     var labelFn = options.label || defaultLabel;
     var onClickFn = options.onClick || null;
-    var levelNames = options.levelNames || [];
     var hideRoot = options.hideRoot || false;
+    var rowHeight = options.rowHeight || 28;
+    var height = options.height || 600;
 
+    injectStyle();
     el.innerHTML = "";
 
-    var root = buildTree(rootData, 0);
-
+    var root = buildNode(rootData, hideRoot ? -1 : 0);
     // Expand first level by default (mirrors original behaviour)
-    if (root._children) {
-      root.children = root._children;
+    root.expanded = true;
+
+    var viewport = document.createElement("div");
+    viewport.className = "stw-tree";
+    viewport.style.height = height + "px";
+    var spacer = document.createElement("div");
+    spacer.className = "stw-spacer";
+    viewport.appendChild(spacer);
+    el.appendChild(viewport);
+
+    // Visible rows in display order: { node } for a tree node, or
+    // { more: parent, depth } for the placeholder after a partly loaded list.
+    var rows = [];
+
+    function flatten(node, out) {
+      out.push({ node: node });
+      if (node.expanded) flattenChildren(node, out);
     }
 
-    // --- styles (injected once per page) ---
-    if (!document.getElementById("stw-style")) {
-      var style = document.createElement("style");
-      style.id = "stw-style";
-      style.textContent = [
-        /* force light scheme regardless of OS dark mode */
-        "#tree-container { background: #fff; color: #222; }",
-        ".stw-tree { font: 15px/1.6 sans-serif; color: #222; padding: 8px 0; }",
-        ".stw-tree ul { list-style: none; margin: 0; padding: 0 0 0 22px; }",
-        ".stw-tree > ul { padding-left: 0; }",
-        ".stw-tree li { margin: 2px 0; }",
-        ".stw-row { display: flex; align-items: center; gap: 6px; padding: 3px 6px;",
-        "           border-radius: 3px; cursor: default; background: #fff; }",
-        ".stw-row:hover { background: #eef3fb; }",
-        ".stw-toggle { width: 18px; height: 18px; display: flex; align-items: center;",
-        "              justify-content: center; flex-shrink: 0; cursor: pointer;",
-        "              color: #3b6ea5; font-size: 12px; user-select: none; }",
-        ".stw-toggle:hover { color: #1a4a88; }",
-        ".stw-dot { width: 7px; height: 7px; border-radius: 50%; background: #ccc;",
-        "           border: 1px solid #aaa; flex-shrink: 0; margin-left: 5px; }",
-        ".stw-label { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; color: #222; }",
-        ".stw-label.linkable { color: #1a4a9e; cursor: pointer; text-decoration: none; }",
-        ".stw-label.linkable:hover { text-decoration: underline; }",
-        ".stw-children { overflow: hidden; transition: max-height 0.2s ease; }",
-        ".stw-header { display: flex; gap: 0; margin-bottom: 6px;",
-        "              border-bottom: 1px solid #dde; padding-bottom: 5px; background: #fff; }",
-        ".stw-header-cell { font-size: 12px; color: #666; font-weight: 600;",
-        "                   letter-spacing: 0.04em; text-transform: uppercase; }",
-      ].join("\n");
-      document.head.appendChild(style);
+    function flattenChildren(node, out) {
+      node.children.forEach(function (child) { flatten(child, out); });
+      if (node.children.length < node.total) {
+        out.push({ more: node, depth: node.depth + 1 });
+      }
     }
 
-    // --- level name header ---
-    // var names = levelNames.filter(function (n) { return n; });
-    // if (names.length) {
-    //   var header = document.createElement("div");
-    //   header.className = "stw-header";
-    //   names.forEach(function (name) {
-    //     var cell = document.createElement("span");
-    //     cell.className = "stw-header-cell";
-    //     cell.style.marginRight = "12px";
-    //     cell.textContent = name;
-    //     header.appendChild(cell);
-    //   });
-    //   el.appendChild(header);
-    // }
-
-    // --- tree wrapper ---
-    var wrapper = document.createElement("div");
-    wrapper.className = "stw-tree";
-    var rootList = document.createElement("ul");
-    wrapper.appendChild(rootList);
-    el.appendChild(wrapper);
-
-    function makeRow(node) {
-      var li = document.createElement("li");
+    function rebuild() {
+      rows = [];
+      if (hideRoot) flattenChildren(root, rows);
+      else flatten(root, rows);
+      spacer.style.height = rows.length * rowHeight + "px";
+      draw();
+    }
 
+    function loadMore(node) {
+      if (node.loading || !node.data.children_url) return;
+      node.loading = true;
+      var url = node.data.children_url;
+      url += (url.indexOf("?") >= 0 ? "&" : "?") + "offset=" + node.children.length;
+      fetch(url)
+        .then(function (r) {
+          if (!r.ok) throw new Error(r.status + " " + r.statusText);
+          return r.json();
+        })
+        .then(function (page) {
+          node.total = page.total;
+          page.children.forEach(function (c) {
+            node.children.push(buildNode(c, node.depth + 1));
+          });
+        })
+        .catch(function (err) {
+          // Stop retrying from every redraw; the row reports the failure.
+          node.total = node.children.length;
+          node.error = String(err);
+        })
+        .then(function () {
+          node.loading = false;
+          rebuild();
+        });
+    }
+
+    function toggle(node) {
+      node.expanded = !node.expanded;
+      if (node.expanded && !node.children.length && node.total) loadMore(node);
+      rebuild();
+      if (onClickFn) onClickFn(node);
+    }
+
+    function makeRow(entry) {
       var row = document.createElement("div");
       row.className = "stw-row";
+      row.style.height = rowHeight + "px";
 
-      // expand/collapse toggle or leaf dot
-      if (node._children && node._children.length) {
-        var toggle = document.createElement("span");
-        toggle.className = "stw-toggle";
-        toggle.setAttribute("aria-label", "toggle");
-
-        var childrenDiv = document.createElement("div");
-        childrenDiv.className = "stw-children";
+      if (entry.more) {
+        row.style.paddingLeft = 6 + (entry.depth + 1) * 22 + "px";
+        var more = document.createElement("span");
+        more.className = "stw-more";
+        more.textContent = "Loading " + (entry.more.total - entry.more.children.length) + " more…";
+        row.appendChild(more);
+        loadMore(entry.more);
+        return row;
+      }
 
-        function setToggleIcon() {
-          toggle.textContent = node.children ? "▾" : "▸";
-        }
-        setToggleIcon();
+      var node = entry.node;
+      row.style.paddingLeft = 6 + Math.max(node.depth, 0) * 22 + "px";
 
-        toggle.addEventListener("click", function (e) {
+      // expand/collapse toggle or leaf dot
+      if (node.total) {
+        var handle = document.createElement("span");
+        handle.className = "stw-toggle";
+        handle.setAttribute("aria-label", "toggle");
+        handle.textContent = node.expanded ? "▾" : "▸";
+        handle.addEventListener("click", function (e) {
           e.stopPropagation();
-          if (node.children) {
-            childrenDiv.style.maxHeight = "0";
-            node.children = null;
-          } else {
-            node.children = node._children;
-            renderChildren(childrenDiv, node);
-            // Set max-height after children rendered so transition works
-            childrenDiv.style.maxHeight = childrenDiv.scrollHeight + "px";
-            // Allow growth after transition ends
-            childrenDiv.addEventListener("transitionend", function once() {
-              if (node.children) childrenDiv.style.maxHeight = "none";
-              childrenDiv.removeEventListener("transitionend", once);
-            });
-          }
-          setToggleIcon();
-          if (onClickFn) onClickFn(node);
+          toggle(node);
         });
-
-        row.appendChild(toggle);
-        li.appendChild(row);
-        li.appendChild(childrenDiv);
-
-        // Render initially expanded children
-        if (node.children) {
-          renderChildren(childrenDiv, node);
-          childrenDiv.style.maxHeight = "none";
-        } else {
-          childrenDiv.style.maxHeight = "0";
-        }
+        row.appendChild(handle);
       } else {
         var dot = document.createElement("span");
         dot.className = "stw-dot";
         row.appendChild(dot);
-        li.appendChild(row);
       }
 
       // label — real <a> when there's a URL so right-click "open in new tab" works
@@ -214,28 +263,36 @@
         label = document.createElement("span");
       }
       label.className = (label.className ? label.className + " " : "") + "stw-label";
-      label.textContent = labelFn(node.data);
+      label.textContent = labelFn(node.data) + (node.error ? "  — could not load: " + node.error : "");
       if (node.data.level && node.data.level !== "root") {
         label.title = node.data.level.charAt(0).toUpperCase() + node.data.level.slice(1);
       }
       row.appendChild(label);
-
-      return li;
+      return row;
     }
 
-    function renderChildren(container, node) {
-      container.innerHTML = "";
-      var ul = document.createElement("ul");
-      (node.children || []).forEach(function (child) {
-        ul.appendChild(makeRow(child));
-      });
-      container.appendChild(ul);
+    function draw() {
+      var first = Math.max(0, Math.floor(viewport.scrollTop / rowHeight) - OVERSCAN);
+      var last = Math.min(rows.length, Math.ceil((viewport.scrollTop + height) / rowHeight) + OVERSCAN);
+      spacer.innerHTML = "";
+      for (var i = first; i < last; i++) {
+        var row = makeRow(rows[i]);
+        row.style.top = i * rowHeight + "px";
+        spacer.appendChild(row);
+      }
     }
 
-    var startNodes = (hideRoot && root._children) ? root._children : [root];
-    startNodes.forEach(function (node) {
-      rootList.appendChild(makeRow(node));
+    var pending = false;
+    viewport.addEventListener("scroll", function () {
+      if (pending) return;
+      pending = true;
+      window.requestAnimationFrame(function () {
+        pending = false;
+        draw();
+      });
     });
+
+    rebuild();
   }
 
   window.TreeWidget = { render: render };
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+# config.Config refuses to load without a secret outside debug mode.
+os.environ.setdefault("SECRET_KEY", "test")
+
+import schema_migration  # noqa: E402
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    db_path = tmp_path / "samples.db"
+    schema_migration.init(str(db_path), schema_migration.read_schema())
+
+    class TestConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        SEQUENCE_CACHE_DIR = str(tmp_path / "sequence_cache")
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,72 @@
+"""The sample listings read only the mass_spec_sample columns they render."""
+import re
+
+import pytest
+
+from models import MassSpecSample, db
+from query_profiler import collecting
+from views.common import SAMPLE_CHOICE_COLUMNS, SAMPLE_TABLE_COLUMNS
+
+_SAMPLE_COLUMN = re.compile(r"\bmass_spec_sample\.(\w+)")
+# Always loaded alongside a load_only() set: the identity and the
+# crosslinked_sample discriminator of the polymorphic mapping.
+_ALWAYS = {"project_code", "experiment_code", "code", "crosslinked_sample"}
+
+
+@pytest.fixture
+def samples(app):
+    with app.app_context():
+        for sql in (
+            "INSERT INTO user (initials, name) VALUES ('AB', 'A B')",
+            "INSERT INTO project VALUES ('P1', 'Project', 'd', 'AB', 1)",
+            "INSERT INTO experiment VALUES ('P1', 'E1', 'Experiment', 'd', 'AB', 1)",
+            "INSERT INTO mass_spec_sample (project_code, experiment_code, code, name, description,"
+            " user_initials, crosslinked_sample, disease, tissue)"
+            " VALUES ('P1', 'E1', 'S01', 'Sample', 'd', 'AB', 1, 'x', 'y')",
+        ):
+            db.session.execute(db.text(sql))
+        db.session.commit()
+
+
+def _selected_sample_columns(client, url):
+    """mass_spec_sample columns named in the SELECT list of each statement
+    that reads the table while ``url`` is fetched (body included: some
+    listings stream)."""
+    with collecting() as log:
+        response = client.get(url)
+        response.get_data()
+    assert response.status_code == 200
+    selects = []
+    for statement, _ in log.statements:
+        head, _, rest = statement.partition(" FROM ")
+        if head.startswith("SELECT") and re.search(r"\bmass_spec_sample\b", rest):
+            selects.append(set(_SAMPLE_COLUMN.findall(head)))
+    return [columns for columns in selects if columns]
+
+
+def _keys(columns):
+    return {c.key for c in columns} | _ALWAYS
+
+
+def test_column_sets_leave_out_wide_columns():
+    all_columns = {c.key for c in MassSpecSample.__table__.columns}
+    assert len(_keys(SAMPLE_TABLE_COLUMNS)) < len(all_columns) / 3
+    assert _keys(SAMPLE_CHOICE_COLUMNS) <= _keys(SAMPLE_TABLE_COLUMNS)
+
+
+def _assert_selects(selects, columns):
+    """The sample rows are loaded with exactly ``columns``, and no other
+    statement (counts, aggregates) reads a column outside them."""
+    expected = _keys(columns)
+    assert expected in selects
+    assert all(selected <= expected for selected in selects)
+
+
+@pytest.mark.parametrize("url", ["/samples", "/projects/P1", "/projects/P1/experiments/E1"])
+def test_sample_tables_select_table_columns(client, samples, url):
+    _assert_selects(_selected_sample_columns(client, url), SAMPLE_TABLE_COLUMNS)
+
+
+def test_sample_choices_select_choice_columns(client, samples):
+    selects = _selected_sample_columns(client, "/projects/P1/experiments/E1/edit")
+    _assert_selects(selects, SAMPLE_CHOICE_COLUMNS)
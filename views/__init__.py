@@ -0,0 +1,55 @@
+"""The web UI and JSON API, one blueprint per subsystem:
+
+- ``catalogue``: projects, experiments, samples and reference lists, the
+  landing tree, search and typeahead choices;
+- ``queue``: instrument day queues and sequence export;
+- ``files``: acquired-file records;
+- ``reports``: usage, statistics, reconciliation and disk usage pages.
+
+The reports are rarely visited, so their module is not imported at startup:
+their URL rules are registered here with lazy views that import it on first
+use. The SQL query report is only registered while profiling is enabled.
+"""
+from flask import Blueprint
+from werkzeug.utils import cached_property, import_string
+
+# (rule, view function in views.reports)
+REPORT_ROUTES = (
+    ("/api/instrument-usage", "api_instrument_usage"),
+    ("/instrument-usage", "instrument_usage"),
+    ("/instrument-stats", "instrument_stats_view"),
+    ("/reconciliation", "reconciliation_view"),
+    ("/disk-usage", "disk_usage"),
+)
+
+
+class LazyView:
+    """A view function that is imported on its first request."""
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit(".", 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def _reports_blueprint(profiling):
+    bp = Blueprint("reports", __name__)
+    routes = REPORT_ROUTES + ((("/debug/queries", "debug_queries"),) if profiling else ())
+    for rule, name in routes:
+        bp.add_url_rule(rule, name, LazyView(f"views.reports.{name}"))
+    return bp
+
+
+def register_blueprints(app):
+    from . import catalogue, files, queue
+
+    app.register_blueprint(catalogue.bp)
+    app.register_blueprint(queue.bp)
+    app.register_blueprint(files.bp)
+    app.register_blueprint(_reports_blueprint(app.config["QUERY_PROFILING"]))
@@ -0,0 +1,1374 @@
+"""Projects, experiments, samples and the reference lists they draw on
+(species, cell lines, viruses, users, instruments), plus the landing tree,
+search and the typeahead choices."""
+import csv
+import io
+import re
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import and_, func, or_, true
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
+from werkzeug.datastructures import MultiDict
+
+import http_cache
+import search
+from forms import (
+    CellLineForm,
+    ExperimentForm,
+    InstrumentForm,
+    MassSpecSampleForm,
+    ProjectForm,
+    SampleUploadForm,
+    SpeciesForm,
+    UserForm,
+    VirusForm,
+)
+from models import (
+    AcquiredFile,
+    CellLine,
+    CrosslinkSample,
+    Experiment,
+    IdentificationSample,
+    Instrument,
+    MassSpecSample,
+    Project,
+    QueuedFile,
+    Species,
+    User,
+    Virus,
+    db,
+    sample_cell_line,
+    sample_species,
+)
+from sequence_export import SEQUENCE_TEMPLATES
+
+from .common import (
+    FAV_PROJECT_CODE,
+    FILES_PER_PAGE,
+    SAMPLE_CHOICE_COLUMNS,
+    SAMPLE_DETAIL_OPTIONS,
+    SAMPLE_LISTING_KEYS,
+    SAMPLE_TABLE_COLUMNS,
+    _api_validators,
+    _commit_unique,
+    _exp_token,
+    _experiment_file_counts,
+    _experiment_sample_counts,
+    _file_page,
+    _keyset_rows,
+    _next_experiment_code,
+    _next_sample_code,
+    _page_arg,
+    _sample_file_counts,
+    _sample_token,
+    _split_token,
+    _stream_page,
+)
+
+
+bp = Blueprint("catalogue", __name__)
+
+
+@bp.route("/")
+def index():
+    return redirect(url_for("catalogue.project_list"))
+
+
+TREE_PAGE_SIZE = 200
+
+TREE_LEVELS = ("root", "project", "experiment", "sample")
+
+
+def _file_totals(*group_by):
+    """Acquired-file count and bytes grouped by the given AcquiredFile key
+    columns, as a subquery with columns ``files`` and ``bytes``."""
+    return (
+        db.session.query(
+            *group_by,
+            func.count().label("files"),
+            func.coalesce(func.sum(AcquiredFile.size_bytes), 0).label("bytes"),
+        )
+        .filter(AcquiredFile.sample_code.isnot(None))
+        .group_by(*group_by)
+        .subquery()
+    )
+
+
+def _row_counts(*group_by):
+    return db.session.query(*group_by, func.count().label("n")).group_by(*group_by).subquery()
+
+
+def _tree_node(level, name, url, total_bytes, counts, children_url=None, child_total=0):
+    return {
+        "name": name, "level": level, "url": url, "total_bytes": int(total_bytes or 0),
+        "counts": counts, "children_url": children_url, "child_total": child_total,
+    }
+
+
+def _tree_children_query(level, project_code=None, experiment_code=None, sample_code=None):
+    """(query, to_node) for the children of one tree node, largest first.
+
+    Every count and size comes from grouped subqueries, so a page of children
+    costs one query however many files sit beneath them.
+    """
+    if level == "root":
+        files = _file_totals(AcquiredFile.project_code)
+        experiments = _row_counts(Experiment.project_code)
+        samples = _row_counts(MassSpecSample.project_code)
+        q = (
+            db.session.query(
+                Project.code, Project.name,
+                func.coalesce(experiments.c.n, 0).label("experiments"),
+                func.coalesce(samples.c.n, 0).label("samples"),
+                func.coalesce(files.c.files, 0).label("files"),
+                func.coalesce(files.c.bytes, 0).label("bytes"),
+            )
+            .outerjoin(experiments, experiments.c.project_code == Project.code)
+            .outerjoin(samples, samples.c.project_code == Project.code)
+            .outerjoin(files, files.c.project_code == Project.code)
+            .filter(Project.active == true())
+            .order_by(func.coalesce(files.c.bytes, 0).desc(), Project.code)
+        )
+
+        def to_node(r):
+            return _tree_node(
+                "project", r.name or r.code, url_for("catalogue.project_detail", code=r.code), r.bytes,
+                {"experiments": r.experiments, "samples": r.samples, "files": r.files},
+                url_for("catalogue.api_tree_children", level="project", project=r.code), r.experiments,
+            )
+    elif level == "project":
+        files = _file_totals(AcquiredFile.project_code, AcquiredFile.experiment_code)
+        samples = _row_counts(MassSpecSample.project_code, MassSpecSample.experiment_code)
+        q = (
+            db.session.query(
+                Experiment.project_code, Experiment.code, Experiment.name,
+                func.coalesce(samples.c.n, 0).label("samples"),
+                func.coalesce(files.c.files, 0).label("files"),
+                func.coalesce(files.c.bytes, 0).label("bytes"),
+            )
+            .outerjoin(samples, (samples.c.project_code == Experiment.project_code)
+                       & (samples.c.experiment_code == Experiment.code))
+            .outerjoin(files, (files.c.project_code == Experiment.project_code)
+                       & (files.c.experiment_code == Experiment.code))
+            .filter(Experiment.project_code == project_code)
+            .order_by(func.coalesce(files.c.bytes, 0).desc(), Experiment.code)
+        )
+
+        def to_node(r):
+            return _tree_node(
+                "experiment", r.name, url_for("catalogue.experiment_detail", project_code=r.project_code, code=r.code),
+                r.bytes, {"samples": r.samples, "files": r.files},
+                url_for("catalogue.api_tree_children", level="experiment", project=r.project_code, experiment=r.code),
+                r.samples,
+            )
+    elif level == "experiment":
+        files = _file_totals(AcquiredFile.project_code, AcquiredFile.experiment_code, AcquiredFile.sample_code)
+        q = (
+            db.session.query(
+                MassSpecSample.project_code, MassSpecSample.experiment_code,
+                MassSpecSample.code, MassSpecSample.name,
+                func.coalesce(files.c.files, 0).label("files"),
+                func.coalesce(files.c.bytes, 0).label("bytes"),
+            )
+            .outerjoin(files, (files.c.project_code == MassSpecSample.project_code)
+                       & (files.c.experiment_code == MassSpecSample.experiment_code)
+                       & (files.c.sample_code == MassSpecSample.code))
+            .filter(MassSpecSample.project_code == project_code,
+                    MassSpecSample.experiment_code == experiment_code)
+            .order_by(func.coalesce(files.c.bytes, 0).desc(), MassSpecSample.code)
+        )
+
+        def to_node(r):
+            return _tree_node(
+                "sample", r.name,
+                url_for("catalogue.sample_detail", project_code=r.project_code,
+                        experiment_code=r.experiment_code, code=r.code),
+                r.bytes, {"files": r.files},
+                url_for("catalogue.api_tree_children", level="sample", project=r.project_code,
+                        experiment=r.experiment_code, sample=r.code),
+                r.files,
+            )
+    else:
+        q = (
+            db.session.query(AcquiredFile.id, AcquiredFile.filename, AcquiredFile.location,
+                             AcquiredFile.size_bytes)
+            .filter(AcquiredFile.project_code == project_code,
+                    AcquiredFile.experiment_code == experiment_code,
+                    AcquiredFile.sample_code == sample_code)
+            .order_by(func.coalesce(AcquiredFile.size_bytes, 0).desc(), AcquiredFile.id)
+        )
+
+        def to_node(r):
+            return _tree_node(
+                "file", r.filename or r.location or str(r.id), url_for("files.file_detail", id=r.id),
+                r.size_bytes, {},
+            )
+    return q, to_node
+
+
+@bp.route("/api/tree")
+def api_tree():
+    """The tree root with its totals and the first page of projects; deeper
+    levels are fetched on expand from /api/tree/children."""
+    etag, changed_at = _api_validators("tree")
+    cached = http_cache.not_modified(etag, changed_at)
+    if cached is not None:
+        return cached
+    q, to_node = _tree_children_query("root")
+    projects = [to_node(r) for r in q]
+    root = _tree_node(
+        "root", "Mass Spec Acquisition Tracker", None,
+        sum(p["total_bytes"] for p in projects),
+        {key: sum(p["counts"][key] for p in projects) for key in ("experiments", "samples", "files")},
+        url_for("catalogue.api_tree_children", level="root"), len(projects),
+    )
+    root["children"] = projects[:TREE_PAGE_SIZE]
+    return http_cache.validate(jsonify(root), etag, changed_at)
+
+
+@bp.route("/api/tree/children")
+def api_tree_children():
+    """One page of a node's children: ``level`` is the parent's level and
+    project/experiment/sample its key; ``offset``/``limit`` page through."""
+    level = request.args.get("level", "root")
+    if level not in TREE_LEVELS:
+        abort(400, f"level must be one of {', '.join(TREE_LEVELS)}")
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = min(max(int(request.args.get("limit", TREE_PAGE_SIZE)), 1), 1000)
+    except ValueError:
+        abort(400, "offset and limit must be integers")
+    etag, changed_at = _api_validators("tree")
+    cached = http_cache.not_modified(etag, changed_at)
+    if cached is not None:
+        return cached
+    q, to_node = _tree_children_query(
+        level,
+        request.args.get("project"), request.args.get("experiment"), request.args.get("sample"),
+    )
+    return http_cache.validate(jsonify({
+        "total": q.order_by(None).count(),
+        "offset": offset,
+        "children": [to_node(r) for r in q.limit(limit).offset(offset)],
+    }), etag, changed_at)
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+SEARCH_KIND_LABELS = {"project": "Project", "experiment": "Experiment", "sample": "Sample", "file": "File"}
+
+
+def _search_results():
+    query = (request.args.get("q") or "").strip()
+    kind = request.args.get("kind") or None
+    if kind is not None and kind not in search.KINDS:
+        abort(400, f"kind must be one of {', '.join(search.KINDS)}")
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 200)
+    except ValueError:
+        abort(400, "limit must be an integer")
+    results = search.search(db.session, query, kind=kind, limit=limit)
+    for r in results:
+        r["url"] = _search_result_url(r["kind"], r["ref"])
+    return query, kind, results
+
+
+def _search_result_url(kind, ref):
+    if kind == "project":
+        return url_for("catalogue.project_detail", code=ref[0])
+    if kind == "experiment":
+        return url_for("catalogue.experiment_detail", project_code=ref[0], code=ref[1])
+    if kind == "sample":
+        return url_for("catalogue.sample_detail", project_code=ref[0], experiment_code=ref[1], code=ref[2])
+    return url_for("files.file_detail", id=int(ref[0]))
+
+
+@bp.route("/search")
+def search_page():
+    query, kind, results = _search_results()
+    return render_template(
+        "search.html", query=query, kind=kind, results=results, kinds=SEARCH_KIND_LABELS
+    )
+
+
+@bp.route("/api/search")
+def api_search():
+    """Ranked matches with HTML snippets (text escaped, hits wrapped in <mark>)."""
+    query, kind, results = _search_results()
+    return jsonify({
+        "query": query,
+        "results": [
+            {"kind": r["kind"], "url": r["url"], "code": str(r["code"]),
+             "name": str(r["name"]), "snippet": str(r["snippet"])}
+            for r in results
+        ],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Choices (typeahead option lists)
+# ---------------------------------------------------------------------------
+CHOICES_LIMIT = 50
+
+
+def _prefix_match(column, q):
+    """Case-insensitive prefix test written as a NOCASE range, so it can use
+    the ``COLLATE NOCASE`` indexes (a plain LIKE would not)."""
+    folded = column.collate("NOCASE")
+    return and_(folded >= q, folded < q + "\uffff")
+
+
+def _choices_response(q, to_choice):
+    """Run a choices query (already filtered and ordered) for one page of at
+    most ``limit`` options, plus whether more matches exist."""
+    try:
+        limit = min(max(int(request.args.get("limit", CHOICES_LIMIT)), 1), 200)
+    except ValueError:
+        abort(400, "limit must be an integer")
+    rows = q.limit(limit + 1).all()
+    return jsonify({
+        "results": [to_choice(r) for r in rows[:limit]],
+        "more": len(rows) > limit,
+    })
+
+
+@bp.route("/api/choices/experiments")
+def api_choices_experiments():
+    project_code = request.args.get("project") or abort(400, "project is required")
+    text = (request.args.get("q") or "").strip()
+    q = db.session.query(Experiment.project_code, Experiment.code, Experiment.name).filter(
+        Experiment.project_code == project_code
+    )
+    if text:
+        q = q.filter(or_(_prefix_match(Experiment.code, text), _prefix_match(Experiment.name, text)))
+    return _choices_response(
+        q.order_by(Experiment.code),
+        lambda r: {"value": _exp_token(r.project_code, r.code), "label": f"{r.code} — {r.name}"},
+    )
+
+
+@bp.route("/api/choices/samples")
+def api_choices_samples():
+    """Samples of a project (optionally one experiment) matching ``q`` by code
+    or name prefix; with ``active=1``, none unless the project is active.
+    Labels carry the experiment code unless it was fixed."""
+    project_code = request.args.get("project") or abort(400, "project is required")
+    experiment_code = request.args.get("experiment")
+    text = (request.args.get("q") or "").strip()
+    q = db.session.query(
+        MassSpecSample.project_code, MassSpecSample.experiment_code,
+        MassSpecSample.code, MassSpecSample.name,
+    ).filter(MassSpecSample.project_code == project_code)
+    if request.args.get("active") == "1":
+        q = q.join(Project, Project.code == MassSpecSample.project_code).filter(Project.active == True)  # noqa: E712
+    if experiment_code:
+        q = q.filter(MassSpecSample.experiment_code == experiment_code)
+    if text:
+        q = q.filter(or_(_prefix_match(MassSpecSample.code, text), _prefix_match(MassSpecSample.name, text)))
+
+    def to_choice(r):
+        label = f"{r.code} — {r.name}" if experiment_code else f"{r.experiment_code} / {r.code} — {r.name}"
+        return {"value": _sample_token(r.project_code, r.experiment_code, r.code), "label": label}
+
+    return _choices_response(q.order_by(MassSpecSample.experiment_code, MassSpecSample.code), to_choice)
+
+
+@bp.route("/api/choices/cell-lines")
+def api_choices_cell_lines():
+    text = (request.args.get("q") or "").strip()
+    q = db.session.query(CellLine.cellosaurus_id, CellLine.cell_line_name)
+    if text:
+        q = q.filter(or_(_prefix_match(CellLine.cell_line_name, text),
+                         _prefix_match(CellLine.cellosaurus_id, text)))
+    return _choices_response(
+        q.order_by(CellLine.cell_line_name.collate("NOCASE")),
+        lambda r: {"value": r.cellosaurus_id, "label": r.cell_line_name},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Projects
+# ---------------------------------------------------------------------------
+@bp.route("/projects")
+def project_list():
+    show_archived = request.args.get("show_archived", "0") == "1"
+    if show_archived:
+        projects = Project.query.order_by(Project.name).all()
+    else:
+        projects = Project.query.filter_by(active=True).order_by(Project.name).all()
+    users = {u.initials: u.name for u in User.query.all()}
+    # One grouped aggregate per entity instead of a query per project. Samples
+    # and files carry project_code on their own composite key, so neither needs
+    # to join through Experiment. Projects with zero rows are simply absent from
+    # the result (the template defaults missing codes to 0).
+    exp_counts = dict(
+        db.session.query(Experiment.project_code, func.count())
+        .group_by(Experiment.project_code).all()
+    )
+    sample_counts = dict(
+        db.session.query(MassSpecSample.project_code, func.count())
+        .group_by(MassSpecSample.project_code).all()
+    )
+    file_counts = dict(
+        db.session.query(AcquiredFile.project_code, func.count())
+        .group_by(AcquiredFile.project_code).all()
+    )
+    return render_template(
+        "project/list.html", projects=projects, show_archived=show_archived,
+        users=users, exp_counts=exp_counts, sample_counts=sample_counts, file_counts=file_counts
+    )
+
+
+@bp.route("/projects/<code>/toggle-active", methods=["POST"])
+def project_toggle_active(code):
+    project = db.get_or_404(Project, code)
+    project.active = not project.active
+    db.session.commit()
+    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+        return {"active": project.active}
+    show_archived = request.args.get("show_archived", "0")
+    return redirect(url_for("catalogue.project_list", show_archived=show_archived))
+
+
+@bp.route("/projects/<code>")
+def project_detail(code):
+    project = db.get_or_404(Project, code)
+    experiments = (
+        Experiment.query.filter_by(project_code=code).order_by(Experiment.name).all()
+    )
+    contact_user = (
+        User.query.filter_by(initials=project.user_initials).first()
+        if project.user_initials
+        else None
+    )
+    contact_name = contact_user.name if contact_user else project.user_initials
+    samples = _keyset_rows(
+        MassSpecSample.query.join(Experiment)
+        .options(load_only(*SAMPLE_TABLE_COLUMNS), joinedload(MassSpecSample.experiment))
+        .filter(Experiment.project_code == code),
+        *SAMPLE_LISTING_KEYS,
+    )
+    # One grouped pass over the project's files yields the summary totals, the
+    # per-experiment file counts and the chart; only the visible page of files
+    # is loaded as objects. Files with no date still count towards the totals.
+    grouped = (
+        db.session.query(
+            AcquiredFile.file_date,
+            AcquiredFile.experiment_code,
+            func.count().label("files"),
+            func.sum(AcquiredFile.size_bytes).label("total_bytes"),
+        )
+        .filter(AcquiredFile.project_code == code, AcquiredFile.sample_code.isnot(None))
+        .group_by(AcquiredFile.file_date, AcquiredFile.experiment_code)
+        .order_by(AcquiredFile.file_date)
+        .all()
+    )
+    file_count = sum(row.files for row in grouped)
+    total_size_gb = sum(row.total_bytes or 0 for row in grouped) / 1e9
+    chart_data = [
+        {"date": row.file_date.isoformat(), "experiment": row.experiment_code, "gb": round((row.total_bytes or 0) / 1e9, 4)}
+        for row in grouped
+        if row.file_date is not None
+    ]
+    sample_file_counts = _sample_file_counts(project_code=code)
+    sample_counts = _experiment_sample_counts(project_code=code)
+    page = _page_arg()
+    files = _file_page(
+        AcquiredFile.query.filter(AcquiredFile.project_code == code, AcquiredFile.sample_code.isnot(None)),
+        page,
+    )
+    users = {u.initials: u.name for u in User.query.all()}
+    return _stream_page(
+        "project/detail.html", project=project, experiments=experiments,
+        contact_name=contact_name, samples=samples, files=files,
+        experiment_count=len(experiments), sample_count=sum(sample_counts.values()),
+        file_count=file_count, total_size_gb=total_size_gb, users=users,
+        chart_data=chart_data, sample_counts=sample_counts,
+        sample_file_counts=sample_file_counts,
+        experiment_file_counts=_experiment_file_counts(sample_file_counts),
+        page=page, page_count=max(-(-file_count // FILES_PER_PAGE), 1),
+    )
+
+
+@bp.route("/projects/new", methods=["GET", "POST"])
+def project_create():
+    form = ProjectForm()
+    form.user_initials.choices = _user_initials_choices()
+    if form.validate_on_submit():
+        project = Project()
+        form.populate_obj(project)
+        db.session.add(project)
+        if _commit_unique(form, "code", "A project with code"):
+            flash("Project created.", "success")
+            return redirect(url_for("catalogue.project_detail", code=project.code))
+    return render_template("project/form.html", form=form, project=None)
+
+
+@bp.route("/projects/<code>/edit", methods=["GET", "POST"])
+def project_edit(code):
+    project = db.get_or_404(Project, code)
+    form = ProjectForm(obj=project)
+    del form.code
+    form.user_initials.choices = _user_initials_choices()
+    if form.validate_on_submit():
+        form.populate_obj(project)
+        db.session.commit()
+        flash("Project updated.", "success")
+        return redirect(url_for("catalogue.project_detail", code=project.code))
+    if request.method == "POST":
+        flash("Could not save — please check the fields below.", "error")
+    return render_template("project/form.html", form=form, project=project)
+
+
+def _user_initials_choices():
+    users = User.query.filter_by(active=True).order_by(User.name).all()
+    choices = [("", "— none —")]
+    choices += [(u.initials, u.name) for u in users if u.initials]
+    return choices
+
+
+def _user_name_choices():
+    users = User.query.filter_by(active=True).order_by(User.name).all()
+    choices = [("", "— none —")]
+    choices += [(u.name, u.name) for u in users]
+    return choices
+
+
+# ---------------------------------------------------------------------------
+# Experiments
+# ---------------------------------------------------------------------------
+@bp.route("/experiments")
+def experiment_list():
+    show_archived = request.args.get("show_archived", "0") == "1"
+    q = Experiment.query.join(Project).options(joinedload(Experiment.project))
+    if not show_archived:
+        q = q.filter(Project.active == True, Experiment.active == True)  # noqa: E712
+    experiments = q.order_by(Experiment.name).all()
+    users = {u.initials: u.name for u in User.query.all()}
+    return render_template(
+        "experiment/list.html", experiments=experiments, users=users, show_archived=show_archived,
+        sample_counts=_experiment_sample_counts(),
+        experiment_file_counts=_experiment_file_counts(_sample_file_counts()),
+    )
+
+
+@bp.route("/projects/<project_code>/experiments/<code>")
+def experiment_detail(project_code, code):
+    experiment = db.get_or_404(Experiment, (project_code, code))
+    samples = (
+        MassSpecSample.query
+        .options(load_only(*SAMPLE_TABLE_COLUMNS))
+        .filter_by(project_code=project_code, experiment_code=code)
+        .order_by(MassSpecSample.name).all()
+    )
+    file_count, total_bytes = (
+        db.session.query(func.count(), func.sum(AcquiredFile.size_bytes))
+        .filter(
+            AcquiredFile.project_code == project_code,
+            AcquiredFile.experiment_code == code,
+            AcquiredFile.sample_code.isnot(None),
+        )
+        .one()
+    )
+    page = _page_arg()
+    files = _file_page(
+        AcquiredFile.query.filter(
+            AcquiredFile.project_code == project_code,
+            AcquiredFile.experiment_code == code,
+            AcquiredFile.sample_code.isnot(None),
+        ),
+        page,
+    )
+    users = {u.initials: u.name for u in User.query.all()}
+    return render_template(
+        "experiment/detail.html", experiment=experiment, samples=samples, files=files,
+        sample_count=len(samples), file_count=file_count, total_size_gb=(total_bytes or 0) / 1e9,
+        users=users, sample_file_counts=_sample_file_counts(project_code, code),
+        page=page, page_count=max(-(-file_count // FILES_PER_PAGE), 1),
+    )
+
+
+@bp.route("/projects/<project_code>/experiments/<code>/delete", methods=["POST"])
+def experiment_delete(project_code, code):
+    experiment = db.get_or_404(Experiment, (project_code, code))
+    if _samples_have_files(project_code, code):
+        flash("Cannot delete an experiment whose samples have acquired files.", "error")
+        return redirect(url_for("catalogue.experiment_detail", project_code=project_code, code=code))
+    _delete_samples(project_code, code)
+    # experiment.samples is loaded only now, after the bulk delete, so the
+    # delete-orphan cascade finds nothing left to do.
+    db.session.delete(experiment)
+    db.session.commit()
+    flash("Experiment deleted.", "success")
+    return redirect(url_for("catalogue.project_detail", code=project_code))
+
+
+@bp.route("/projects/<project_code>/experiments/new", methods=["GET", "POST"])
+def experiment_create(project_code):
+    # The parent project is fixed by the URL (you reach this page from a project),
+    # so there's no project selector — it's shown read-only on the form.
+    project = db.get_or_404(Project, project_code)
+    form = ExperimentForm()
+    del form.project_code
+    form.user_initials.choices = _user_initials_choices()
+    if request.method == "GET":
+        if project.user_initials:
+            form.user_initials.data = project.user_initials
+        form.code.data = _next_experiment_code(project_code)
+    if form.validate_on_submit():
+        experiment = Experiment()
+        form.populate_obj(experiment)
+        experiment.project_code = project_code
+        db.session.add(experiment)
+        if _commit_unique(form, "code", "An experiment with code"):
+            flash("Experiment created.", "success")
+            return redirect(url_for("catalogue.experiment_detail", project_code=experiment.project_code, code=experiment.code))
+    cancel_url = url_for("catalogue.project_detail", code=project_code)
+    return render_template(
+        "experiment/form.html", form=form, experiment=None, samples=[],
+        project=project, cancel_url=cancel_url,
+    )
+
+
+@bp.route("/projects/<project_code>/experiments/<code>/edit", methods=["GET", "POST"])
+def experiment_edit(project_code, code):
+    experiment = db.get_or_404(Experiment, (project_code, code))
+    samples = (
+        MassSpecSample.query
+        .options(load_only(*SAMPLE_CHOICE_COLUMNS))
+        .filter_by(project_code=project_code, experiment_code=code)
+        .order_by(MassSpecSample.name).all()
+    )
+    form = ExperimentForm(obj=experiment)
+    del form.code
+    # project_code is part of the primary key — re-parenting is not supported.
+    del form.project_code
+    form.user_initials.choices = _user_initials_choices()
+    if form.validate_on_submit():
+        form.populate_obj(experiment)
+        db.session.commit()
+        flash("Experiment updated.", "success")
+        return redirect(url_for("catalogue.experiment_detail", project_code=experiment.project_code, code=experiment.code))
+    if request.method == "POST":
+        flash("Could not save — please check the fields below.", "error")
+    return render_template("experiment/form.html", form=form, experiment=experiment, samples=samples)
+
+
+# ---------------------------------------------------------------------------
+# Species
+# ---------------------------------------------------------------------------
+@bp.route("/species")
+def species_list():
+    species_list = Species.query.order_by(Species.species_name).all()
+    return render_template("species/list.html", species_list=species_list)
+
+
+@bp.route("/species/new", methods=["GET", "POST"])
+def species_create():
+    form = SpeciesForm()
+    if form.validate_on_submit():
+        species = Species()
+        form.populate_obj(species)
+        db.session.add(species)
+        db.session.commit()
+        flash("Species created.", "success")
+        return redirect(url_for("catalogue.species_detail", id=species.id))
+    return render_template("species/form.html", form=form, species=None)
+
+
+@bp.route("/species/<int:id>")
+def species_detail(id):
+    species = db.get_or_404(Species, id)
+    return render_template("species/detail.html", species=species)
+
+
+@bp.route("/species/<int:id>/edit", methods=["GET", "POST"])
+def species_edit(id):
+    species = db.get_or_404(Species, id)
+    form = SpeciesForm(obj=species)
+    if form.validate_on_submit():
+        form.populate_obj(species)
+        db.session.commit()
+        flash("Species updated.", "success")
+        return redirect(url_for("catalogue.species_detail", id=species.id))
+    return render_template("species/form.html", form=form, species=species)
+
+
+# ---------------------------------------------------------------------------
+# Cell Lines
+# ---------------------------------------------------------------------------
+def _species_choices():
+    species = Species.query.order_by(Species.species_name).all()
+    return [(0, "")] + [(s.id, s.species_name) for s in species]
+
+
+def _virus_multi_choices():
+    return [(v.id, v.name) for v in Virus.query.order_by(Virus.name).all()]
+
+
+@bp.route("/cell-lines")
+def cell_line_list():
+    cell_lines = CellLine.query.order_by(CellLine.cell_line_name).all()
+    return render_template("cell_line/list.html", cell_lines=cell_lines)
+
+
+@bp.route("/cell-lines/new", methods=["GET", "POST"])
+def cell_line_create():
+    form = CellLineForm()
+    form.species_id.choices = _species_choices()
+    form.virus_ids.choices = _virus_multi_choices()
+    if form.validate_on_submit():
+        cl = CellLine()
+        form.populate_obj(cl)
+        db.session.add(cl)
+        # Suppress autoflush so a duplicate Cellosaurus ID surfaces at commit
+        # (handled by _commit_unique) rather than from this query's autoflush.
+        with db.session.no_autoflush:
+            cl.viruses = Virus.query.filter(Virus.id.in_(form.virus_ids.data)).all()
+        if _commit_unique(form, "cellosaurus_id", "A cell line with Cellosaurus ID"):
+            flash("Cell line created.", "success")
+            return redirect(url_for("catalogue.cell_line_detail", cellosaurus_id=cl.cellosaurus_id))
+    return render_template("cell_line/form.html", form=form, cell_line=None)
+
+
+@bp.route("/cell-lines/<cellosaurus_id>")
+def cell_line_detail(cellosaurus_id):
+    cl = db.get_or_404(CellLine, cellosaurus_id)
+    return render_template("cell_line/detail.html", cell_line=cl)
+
+
+@bp.route("/cell-lines/<cellosaurus_id>/edit", methods=["GET", "POST"])
+def cell_line_edit(cellosaurus_id):
+    cl = db.get_or_404(CellLine, cellosaurus_id)
+    form = CellLineForm(obj=cl)
+    del form.cellosaurus_id  # primary key — not editable after creation
+    form.species_id.choices = _species_choices()
+    form.virus_ids.choices = _virus_multi_choices()
+    if request.method == "GET":
+        form.virus_ids.data = [v.id for v in cl.viruses]
+    if form.validate_on_submit():
+        form.populate_obj(cl)
+        cl.viruses = Virus.query.filter(Virus.id.in_(form.virus_ids.data)).all()
+        db.session.commit()
+        flash("Cell line updated.", "success")
+        return redirect(url_for("catalogue.cell_line_detail", cellosaurus_id=cl.cellosaurus_id))
+    return render_template("cell_line/form.html", form=form, cell_line=cl)
+
+
+# ---------------------------------------------------------------------------
+# Viruses
+# ---------------------------------------------------------------------------
+@bp.route("/viruses")
+def virus_list():
+    viruses = Virus.query.order_by(Virus.name).all()
+    return render_template("virus/list.html", viruses=viruses)
+
+
+@bp.route("/viruses/new", methods=["GET", "POST"])
+def virus_create():
+    form = VirusForm()
+    form.species_id.choices = _species_choices()
+    if form.validate_on_submit():
+        virus = Virus()
+        form.populate_obj(virus)
+        if virus.species_id == 0:
+            virus.species_id = None
+        db.session.add(virus)
+        db.session.commit()
+        flash("Virus created.", "success")
+        return redirect(url_for("catalogue.virus_detail", id=virus.id))
+    return render_template("virus/form.html", form=form, virus=None)
+
+
+@bp.route("/viruses/<int:id>")
+def virus_detail(id):
+    virus = db.get_or_404(Virus, id)
+    return render_template("virus/detail.html", virus=virus)
+
+
+@bp.route("/viruses/<int:id>/edit", methods=["GET", "POST"])
+def virus_edit(id):
+    virus = db.get_or_404(Virus, id)
+    form = VirusForm(obj=virus)
+    form.species_id.choices = _species_choices()
+    if request.method == "GET" and not virus.species_id:
+        form.species_id.data = 0
+    if form.validate_on_submit():
+        form.populate_obj(virus)
+        if virus.species_id == 0:
+            virus.species_id = None
+        db.session.commit()
+        flash("Virus updated.", "success")
+        return redirect(url_for("catalogue.virus_detail", id=virus.id))
+    return render_template("virus/form.html", form=form, virus=virus)
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+@bp.route("/users")
+def user_list():
+    users = User.query.order_by(User.name).all()
+    return render_template("user/list.html", users=users)
+
+
+@bp.route("/users/new", methods=["GET", "POST"])
+def user_create():
+    form = UserForm()
+    if form.validate_on_submit():
+        user = User()
+        form.populate_obj(user)
+        db.session.add(user)
+        if _commit_unique(form, "initials", "A user with initials"):
+            flash("User created.", "success")
+            return redirect(url_for("catalogue.user_detail", initials=user.initials))
+    return render_template("user/form.html", form=form, user=None)
+
+
+@bp.route("/users/<initials>")
+def user_detail(initials):
+    user = db.get_or_404(User, initials)
+    return render_template("user/detail.html", user=user)
+
+
+@bp.route("/users/<initials>/edit", methods=["GET", "POST"])
+def user_edit(initials):
+    user = db.get_or_404(User, initials)
+    form = UserForm(obj=user)
+    del form.initials  # primary key — not editable after creation
+    if form.validate_on_submit():
+        form.populate_obj(user)
+        db.session.commit()
+        flash("User updated.", "success")
+        return redirect(url_for("catalogue.user_detail", initials=user.initials))
+    return render_template("user/form.html", form=form, user=user)
+
+
+# ---------------------------------------------------------------------------
+# Instruments
+# ---------------------------------------------------------------------------
+@bp.route("/instruments")
+def instrument_list():
+    instruments = Instrument.query.order_by(Instrument.initial).all()
+    return render_template(
+        "instrument/list.html", instruments=instruments, templates=SEQUENCE_TEMPLATES
+    )
+
+
+@bp.route("/instruments/new", methods=["GET", "POST"])
+def instrument_create():
+    form = InstrumentForm()
+    if form.validate_on_submit():
+        instrument = Instrument()
+        form.populate_obj(instrument)
+        db.session.add(instrument)
+        if _commit_unique(form, "initial", "An instrument with initial"):
+            flash("Instrument created.", "success")
+            return redirect(url_for("catalogue.instrument_list"))
+    return render_template("instrument/form.html", form=form, instrument=None)
+
+
+@bp.route("/instruments/<initial>/edit", methods=["GET", "POST"])
+def instrument_edit(initial):
+    instrument = db.get_or_404(Instrument, initial)
+    form = InstrumentForm(obj=instrument)
+    del form.initial  # primary key — not editable after creation
+    if form.validate_on_submit():
+        form.populate_obj(instrument)
+        db.session.commit()
+        flash("Instrument updated.", "success")
+        return redirect(url_for("catalogue.instrument_list"))
+    return render_template("instrument/form.html", form=form, instrument=instrument)
+
+
+# ---------------------------------------------------------------------------
+# Samples
+# ---------------------------------------------------------------------------
+def _species_multi_choices():
+    return [(s.id, s.species_name) for s in Species.query.order_by(Species.species_name).all()]
+
+
+def _cell_line_multi_choices(ids=None):
+    """Cell-line checkbox choices. Forms pass the selected ``ids`` and find
+    others through /api/choices/cell-lines; None means every cell line."""
+    q = CellLine.query
+    if ids is not None:
+        if not ids:
+            return []
+        q = q.filter(CellLine.cellosaurus_id.in_(ids))
+    return [(cl.cellosaurus_id, cl.cell_line_name) for cl in q.order_by(CellLine.cell_line_name).all()]
+
+
+def _coerce_select_fields(sample):
+    """Convert empty-string values from optional SelectFields to None so they
+    satisfy the DB CHECK constraints (which allow NULL but not empty string)."""
+    for field in ("synthetic_peptide", "quantitation_method", "crosslinking_type"):
+        if getattr(sample, field) == "":
+            setattr(sample, field, None)
+
+
+def _nullify_crosslink_fields(sample):
+    """Clear crosslink fields when sample is identification type, and vice versa."""
+    crosslink_fields = [
+        "crosslinker", "crosslinking_type",
+        "protein_or_cell_concentration", "protein_or_cell_concentration_unit",
+        "crosslinker_or_compound_concentration", "crosslinker_or_compound_concentration_unit",
+        "organic_solvent_concentration", "organic_solvent_concentration_unit",
+        "reaction_temperature_in_celsius", "reaction_time_in_minutes",
+        "quenching_reagent", "uv_source", "uv_time_in_seconds",
+        "uv_wavelength_in_nanometers",
+    ]
+    identification_fields = ["peptide_level_fraction"]
+
+    if sample.crosslinked_sample:
+        for f in identification_fields:
+            setattr(sample, f, None)
+    else:
+        for f in crosslink_fields:
+            setattr(sample, f, None)
+
+
+@bp.route("/samples")
+def sample_list():
+    # Counted per row with each batch (an index-only probe of
+    # ix_acquired_file_sample), not grouped over every file before the first
+    # row can be sent.
+    file_count = (
+        db.session.query(func.count())
+        .filter(
+            AcquiredFile.project_code == MassSpecSample.project_code,
+            AcquiredFile.experiment_code == MassSpecSample.experiment_code,
+            AcquiredFile.sample_code == MassSpecSample.code,
+        )
+        .correlate(MassSpecSample)
+        .scalar_subquery()
+    )
+    samples = _keyset_rows(
+        db.session.query(MassSpecSample, file_count)
+        .join(Experiment)
+        .join(Project)
+        .options(
+            load_only(*SAMPLE_TABLE_COLUMNS),
+            joinedload(MassSpecSample.experiment).joinedload(Experiment.project),
+        )
+        .filter(Project.active == True),  # noqa: E712
+        *SAMPLE_LISTING_KEYS,
+    )
+    users = {u.initials: u.name for u in User.query.all()}
+    return _stream_page("sample/list.html", samples=samples, users=users)
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/new", methods=["GET", "POST"])
+def sample_create(project_code, experiment_code):
+    # The parent experiment is fixed by the URL (you reach this page from an
+    # experiment), so there's no experiment selector — it's shown read-only.
+    experiment = db.get_or_404(Experiment, (project_code, experiment_code))
+
+    # Optionally pre-fill the form from an existing sample (everything except the
+    # identity fields code/name and the parent experiment). Only relevant on GET —
+    # on POST the values come from the submitted form.
+    copy_source = None
+    copy_from = request.values.get("copy_from")
+    if copy_from:
+        parts = _split_token(copy_from)
+        if len(parts) == 3:
+            copy_source = db.session.get(MassSpecSample, tuple(parts), options=SAMPLE_DETAIL_OPTIONS)
+
+    if request.method == "GET" and copy_source:
+        form = MassSpecSampleForm(obj=copy_source)
+        # Identity fields must stay unique — don't copy them.
+        form.code.data = ""
+        form.name.data = ""
+        form.crosslinked_sample.data = bool(copy_source.crosslinked_sample)
+        form.quantitation.data = bool(copy_source.quantitation)
+        form.species_ids.data = [s.id for s in copy_source.species_list]
+        form.cellosaurus_ids.data = [cl.cellosaurus_id for cl in copy_source.cell_lines]
+    else:
+        form = MassSpecSampleForm()
+
+    del form.experiment_code
+    form.user_initials.choices = _user_initials_choices()
+    form.species_ids.choices = _species_multi_choices()
+    form.cellosaurus_ids.choices = _cell_line_multi_choices(form.cellosaurus_ids.data or [])
+    if request.method == "GET":
+        if not copy_source and experiment.user_initials:
+            form.user_initials.data = experiment.user_initials
+        form.code.data = _next_sample_code(project_code, experiment_code)
+    if form.validate_on_submit():
+        is_crosslinked = form.crosslinked_sample.data
+        if is_crosslinked:
+            sample = CrosslinkSample()
+        else:
+            sample = IdentificationSample()
+        form.populate_obj(sample)
+        sample.project_code = project_code
+        sample.experiment_code = experiment_code
+        sample.crosslinked_sample = 1 if is_crosslinked else 0
+        sample.quantitation = 1 if form.quantitation.data else 0
+        _coerce_select_fields(sample)
+        _nullify_crosslink_fields(sample)
+        db.session.add(sample)
+        # Resolve the many-to-many selections with autoflush suppressed: the
+        # sample is already pending, so an autoflush here would try to INSERT it
+        # mid-query and a duplicate code would raise IntegrityError from the
+        # query (not the commit), escaping _commit_unique below. Deferring the
+        # flush to commit keeps duplicate handling in one place.
+        with db.session.no_autoflush:
+            sample.species_list = Species.query.filter(
+                Species.id.in_(form.species_ids.data)
+            ).all()
+            sample.cell_lines = CellLine.query.filter(
+                CellLine.cellosaurus_id.in_(form.cellosaurus_ids.data)
+            ).all()
+        if _commit_unique(form, "code", "A sample with code"):
+            flash("Sample created.", "success")
+            return redirect(url_for("catalogue.sample_detail", project_code=sample.project_code, experiment_code=sample.experiment_code, code=sample.code))
+    cancel_url = url_for("catalogue.experiment_detail", project_code=project_code, code=experiment_code)
+    # The copy-from dropdown fetches its options per group from
+    # /api/choices/samples: this project's samples if it is active, then the
+    # shared FAV templates (always offered, even if the FAV project is archived).
+    copy_groups = [("Current project", project_code, True)]
+    if project_code != FAV_PROJECT_CODE:
+        copy_groups.append(("FAV templates", FAV_PROJECT_CODE, False))
+    copy_label = (
+        f"{copy_source.experiment_code} / {copy_source.code} — {copy_source.name}" if copy_source else None
+    )
+    return render_template(
+        "sample/form.html", form=form, sample=None, experiment=experiment,
+        copy_groups=copy_groups, copy_from=copy_from, copy_label=copy_label, cancel_url=cancel_url,
+    )
+
+
+# Bulk creation from a plate layout: one row per sample, columns named after
+# the MassSpecSampleForm fields. Species and cell lines are ';'-separated names
+# or ids; an optional ``well`` column (A1…P24) orders the rows so allocated
+# codes follow the plate.
+_UPLOAD_LIST_FIELDS = {"species": "species_ids", "cell_lines": "cellosaurus_ids"}
+_UPLOAD_BOOLEAN_FIELDS = ("crosslinked_sample", "quantitation")
+_UPLOAD_TRUE_VALUES = {"1", "y", "yes", "true", "x"}
+_WELL_RE = re.compile(r"^([A-Pa-p])0*(2[0-4]|1[0-9]|[1-9])$")
+_SAMPLE_CODE_RE = re.compile(r"^S(\d+)$")
+
+
+def _read_sample_table(stream):
+    """Rows of an uploaded CSV/TSV as dicts keyed by normalised header."""
+    text = stream.read().decode("utf-8-sig", errors="replace")
+    first_line = text.split("\n", 1)[0]
+    reader = csv.DictReader(io.StringIO(text), delimiter="\t" if "\t" in first_line else ",")
+    reader.fieldnames = [
+        (h or "").strip().lower().replace(" ", "_") for h in reader.fieldnames or []
+    ]
+    return [
+        {k: (v or "").strip() for k, v in row.items() if k}
+        for row in reader
+        if any((v or "").strip() for v in row.values() if isinstance(v, str))
+    ]
+
+
+def _upload_value(value):
+    """A JSON cell as the spreadsheet path would read it: scalars become
+    stripped strings (``{"well": 3}`` is ``"3"``); lists and null are kept."""
+    if value is None or isinstance(value, list):
+        return value
+    return str(value).strip()
+
+
+def _split_upload_list(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split(";") if v.strip()]
+
+
+def _well_sort_key(well):
+    m = _WELL_RE.match(well or "")
+    return (m.group(1).upper(), int(m.group(2))) if m else None
+
+
+def _build_upload_samples(experiment, rows):
+    """Validate uploaded rows against MassSpecSampleForm in one pass.
+
+    Reference data (users, species, cell lines, existing codes) is loaded once
+    up front rather than per row. Returns ``(samples, species_links,
+    cell_line_links, errors)``: column dicts ready for executemany, or a list of
+    ``{"row", "field", "message"}`` errors (row numbers count data rows from 1).
+    """
+    project_code, experiment_code = experiment.project_code, experiment.code
+    errors = []
+
+    def error(row_no, field, message):
+        errors.append({"row": row_no, "field": field, "message": message})
+
+    numbered = list(enumerate(rows, start=1))
+    if any(row.get("well") for _, row in numbered):
+        wells = {}
+        for row_no, row in numbered:
+            well = _well_sort_key(row.get("well"))
+            if well is None:
+                error(row_no, "well", f"“{row.get('well', '')}” is not a plate well (A1–P24).")
+            elif well in wells:
+                error(row_no, "well", f"Well “{row['well']}” is already used in row {wells[well]}.")
+            else:
+                wells[well] = row_no
+        if errors:
+            return [], [], [], errors
+        numbered.sort(key=lambda item: _well_sort_key(item[1]["well"]))
+
+    user_choices = _user_initials_choices()
+    species_choices = _species_multi_choices()
+    cell_line_choices = _cell_line_multi_choices()
+    species_ids = {str(i): i for i, _ in species_choices}
+    species_ids.update({name.casefold(): i for i, name in species_choices})
+    cell_line_ids = {cid.casefold(): cid for cid, _ in cell_line_choices}
+    cell_line_ids.update({name.casefold(): cid for cid, name in cell_line_choices})
+    lookups = {"species": species_ids, "cell_lines": cell_line_ids}
+
+    taken = {
+        code for (code,) in db.session.query(MassSpecSample.code).filter_by(
+            project_code=project_code, experiment_code=experiment_code
+        )
+    }
+    explicit = [row.get("code") for _, row in numbered if row.get("code")]
+    # Allocate missing codes as one contiguous range above every S<n> code
+    # already used in the experiment or in this upload.
+    next_n = max(
+        (int(m.group(1)) for m in map(_SAMPLE_CODE_RE.match, taken | set(explicit)) if m),
+        default=0,
+    ) + 1
+
+    samples, species_links, cell_line_links, seen = [], [], [], set()
+    for row_no, row in numbered:
+        code = row.get("code") or ""
+        if not code:
+            code = f"S{next_n:02d}"
+            next_n += 1
+        if code in taken:
+            error(row_no, "code", f"A sample with code “{code}” already exists in this experiment.")
+        elif code in seen:
+            error(row_no, "code", f"Code “{code}” appears more than once in the upload.")
+        seen.add(code)
+
+        formdata = MultiDict()
+        for key, value in row.items():
+            if key in _UPLOAD_LIST_FIELDS or key in ("well", "code", "experiment_code"):
+                continue
+            if key in _UPLOAD_BOOLEAN_FIELDS:
+                if str(value).strip().lower() in _UPLOAD_TRUE_VALUES:
+                    formdata[key] = "y"
+                continue
+            formdata[key] = "" if value is None else str(value)
+        formdata["code"] = code
+        if not formdata.get("user_initials") and experiment.user_initials:
+            formdata["user_initials"] = experiment.user_initials
+        for column, field in _UPLOAD_LIST_FIELDS.items():
+            for item in _split_upload_list(row.get(column)):
+                resolved = lookups[column].get(item.casefold())
+                if resolved is None:
+                    error(row_no, column, f"Unknown {column.replace('_', ' ')} “{item}”.")
+                else:
+                    formdata.add(field, str(resolved))
+
+        form = MassSpecSampleForm(formdata=formdata, meta={"csrf": False})
+        del form.experiment_code
+        form.user_initials.choices = user_choices
+        form.species_ids.choices = species_choices
+        form.cellosaurus_ids.choices = cell_line_choices
+        if not form.validate():
+            for field, messages in form.errors.items():
+                for message in messages:
+                    error(row_no, field, message)
+            continue
+        if errors:
+            continue
+
+        is_crosslinked = form.crosslinked_sample.data
+        sample = CrosslinkSample() if is_crosslinked else IdentificationSample()
+        form.populate_obj(sample)
+        sample.project_code = project_code
+        sample.experiment_code = experiment_code
+        sample.crosslinked_sample = 1 if is_crosslinked else 0
+        sample.quantitation = 1 if form.quantitation.data else 0
+        _coerce_select_fields(sample)
+        _nullify_crosslink_fields(sample)
+        samples.append({c.key: getattr(sample, c.key) for c in MassSpecSample.__table__.columns})
+        key = {"project_code": project_code, "experiment_code": experiment_code, "sample_code": code}
+        species_links += [{**key, "species_id": i} for i in dict.fromkeys(form.species_ids.data)]
+        cell_line_links += [{**key, "cellosaurus_id": c} for c in dict.fromkeys(form.cellosaurus_ids.data)]
+
+    if errors:
+        return [], [], [], errors
+    if not samples:
+        return [], [], [], [{"row": None, "field": None, "message": "The upload contains no samples."}]
+    return samples, species_links, cell_line_links, []
+
+
+def _create_upload_samples(experiment, rows):
+    """Validate and insert a whole upload in one transaction (all or nothing).
+    Returns ``(created_codes, errors)``."""
+    samples, species_links, cell_line_links, errors = _build_upload_samples(experiment, rows)
+    if errors:
+        return [], errors
+    try:
+        db.session.execute(MassSpecSample.__table__.insert(), samples)
+        if species_links:
+            db.session.execute(sample_species.insert(), species_links)
+        if cell_line_links:
+            db.session.execute(sample_cell_line.insert(), cell_line_links)
+        db.session.commit()
+    except IntegrityError:
+        # Someone else created one of these codes between validation and insert.
+        db.session.rollback()
+        return [], [{"row": None, "field": "code",
+                     "message": "Sample codes changed while uploading — please try again."}]
+    return [s["code"] for s in samples], []
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/upload", methods=["GET", "POST"])
+def sample_upload(project_code, experiment_code):
+    experiment = db.get_or_404(Experiment, (project_code, experiment_code))
+    form = SampleUploadForm()
+    errors = []
+    if form.validate_on_submit():
+        try:
+            rows = _read_sample_table(form.table.data.stream)
+        except csv.Error as exc:
+            errors = [{"row": None, "field": None, "message": f"Could not read the file: {exc}"}]
+        else:
+            created, errors = _create_upload_samples(experiment, rows)
+            if created:
+                flash(f"Created {len(created)} samples ({created[0]}–{created[-1]}).", "success")
+                return redirect(url_for("catalogue.experiment_detail", project_code=project_code, code=experiment_code))
+    return render_template("sample/upload.html", form=form, experiment=experiment, errors=errors)
+
+
+@bp.route("/api/projects/<project_code>/experiments/<experiment_code>/samples", methods=["POST"])
+def api_sample_upload(project_code, experiment_code):
+    """Create many samples from ``{"samples": [{field: value, ...}, ...]}``.
+
+    Same rules as the spreadsheet upload; species/cell_lines may be lists.
+    Responds 201 with the created codes, or 400 with every row error.
+    """
+    experiment = db.get_or_404(Experiment, (project_code, experiment_code))
+    data = request.get_json(silent=True) or {}
+    rows = data.get("samples")
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        abort(400, "samples must be a list of objects")
+    rows = [{str(k).strip().lower(): _upload_value(v) for k, v in r.items()} for r in rows]
+    created, errors = _create_upload_samples(experiment, rows)
+    if errors:
+        return jsonify({"errors": errors}), 400
+    return jsonify({"created": created}), 201
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/<code>")
+def sample_detail(project_code, experiment_code, code):
+    sample = db.get_or_404(
+        MassSpecSample, (project_code, experiment_code, code), options=SAMPLE_DETAIL_OPTIONS
+    )
+    total_size_gb = sum(f.size_bytes or 0 for f in sample.acquired_files) / 1e9
+    users = {u.initials: u.name for u in User.query.all()}
+    active_users = User.query.filter_by(active=True).order_by(User.name).all()
+    return render_template(
+        "sample/detail.html", sample=sample,
+        file_count=len(sample.acquired_files), total_size_gb=total_size_gb, users=users,
+        active_users=active_users,
+    )
+
+
+def _samples_have_files(project_code, experiment_code, code=None):
+    """True if any acquired file belongs to the experiment (or to one sample of
+    it when ``code`` is given) — a single EXISTS, however many samples."""
+    q = db.session.query(AcquiredFile.id).filter(
+        AcquiredFile.project_code == project_code,
+        AcquiredFile.experiment_code == experiment_code,
+    )
+    if code is not None:
+        q = q.filter(AcquiredFile.sample_code == code)
+    return db.session.query(q.exists()).scalar()
+
+
+def _delete_samples(project_code, experiment_code, code=None):
+    """Delete every sample of an experiment (or just ``code``) with its queued
+    runs and species/cell-line links: four set-based DELETEs regardless of the
+    number of samples. Caller checks _samples_have_files first and commits.
+
+    These bypass the ORM, so any sample objects already in the session are
+    stale afterwards — don't flush changes to them.
+    """
+    for table, code_column in (
+        (QueuedFile.__table__, "sample_code"),
+        (sample_species, "sample_code"),
+        (sample_cell_line, "sample_code"),
+        (MassSpecSample.__table__, "code"),
+    ):
+        stmt = db.delete(table).where(
+            table.c.project_code == project_code,
+            table.c.experiment_code == experiment_code,
+        )
+        if code is not None:
+            stmt = stmt.where(table.c[code_column] == code)
+        db.session.execute(stmt)
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/<code>/delete", methods=["POST"])
+def sample_delete(project_code, experiment_code, code):
+    db.get_or_404(MassSpecSample, (project_code, experiment_code, code))
+    if _samples_have_files(project_code, experiment_code, code):
+        flash("Cannot delete a sample that has acquired files.", "error")
+        return redirect(url_for("catalogue.sample_detail", project_code=project_code,
+                                experiment_code=experiment_code, code=code))
+    _delete_samples(project_code, experiment_code, code)
+    db.session.commit()
+    flash("Sample deleted.", "success")
+    return redirect(url_for("catalogue.experiment_detail", project_code=project_code, code=experiment_code))
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/<code>/edit", methods=["GET", "POST"])
+def sample_edit(project_code, experiment_code, code):
+    sample = db.get_or_404(
+        MassSpecSample, (project_code, experiment_code, code), options=SAMPLE_DETAIL_OPTIONS
+    )
+    form = MassSpecSampleForm(obj=sample)
+    del form.code
+    # experiment_code/project_code are part of the primary key — re-parenting
+    # is not supported, so the experiment selector is omitted on edit.
+    del form.experiment_code
+    form.user_initials.choices = _user_initials_choices()
+    if sample.user_initials and sample.user_initials not in [c[0] for c in form.user_initials.choices]:
+        form.user_initials.choices.append((sample.user_initials, sample.user_initials))
+    form.species_ids.choices = _species_multi_choices()
+
+    if request.method == "GET":
+        form.crosslinked_sample.data = bool(sample.crosslinked_sample)
+        form.quantitation.data = bool(sample.quantitation)
+        form.species_ids.data = [s.id for s in sample.species_list]
+        form.cellosaurus_ids.data = [cl.cellosaurus_id for cl in sample.cell_lines]
+    form.cellosaurus_ids.choices = _cell_line_multi_choices(form.cellosaurus_ids.data or [])
+
+    if form.validate_on_submit():
+        is_crosslinked = form.crosslinked_sample.data
+        form.populate_obj(sample)
+        sample.crosslinked_sample = 1 if is_crosslinked else 0
+        sample.quantitation = 1 if form.quantitation.data else 0
+        _coerce_select_fields(sample)
+        # Many-to-many sync
+        sample.species_list = Species.query.filter(
+            Species.id.in_(form.species_ids.data)
+        ).all()
+        sample.cell_lines = CellLine.query.filter(
+            CellLine.cellosaurus_id.in_(form.cellosaurus_ids.data)
+        ).all()
+        _nullify_crosslink_fields(sample)
+        key = (sample.project_code, sample.experiment_code, sample.code)
+        db.session.commit()
+        flash("Sample updated.", "success")
+        return redirect(url_for("catalogue.sample_detail", project_code=key[0], experiment_code=key[1], code=key[2]))
+    if request.method == "POST":
+        flash("Could not save — please check the fields below.", "error")
+    return render_template("sample/form.html", form=form, sample=sample)
+
+
+@bp.route("/about")
+def about():
+    return render_template("about.html")
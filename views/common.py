@@ -0,0 +1,237 @@
+"""Helpers shared by the view blueprints: composite-key tokens for form
+selects, form commits, paging and the per-sample/experiment counts the detail
+pages show, and streaming of long listings."""
+from collections import defaultdict
+
+from flask import Response, flash, request, stream_template
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import operators
+from sqlalchemy.orm import joinedload, undefer_group
+
+from models import AcquiredFile, DataVersion, Experiment, MassSpecSample, db
+
+
+# ---------------------------------------------------------------------------
+# Composite-key encoding for SelectField values
+# A bare code is no longer unique, so dropdown values that identify an
+# experiment or sample encode the full parent chain, joined by \x1f (a char
+# that never appears in a code).
+# ---------------------------------------------------------------------------
+TOKEN_SEP = "\x1f"
+
+# Project holding commonly-used template samples, offered as copy sources from
+# any project's new-sample form.
+FAV_PROJECT_CODE = "FAV"
+
+
+def _exp_token(project_code, experiment_code):
+    return f"{project_code}{TOKEN_SEP}{experiment_code}"
+
+
+def _sample_token(project_code, experiment_code, code):
+    return TOKEN_SEP.join([project_code, experiment_code, code])
+
+
+def _next_experiment_code(project_code):
+    """Suggested code for a new experiment: 'E' + zero-padded (count + 1)."""
+    n = Experiment.query.filter_by(project_code=project_code).count() + 1
+    return f"E{n:02d}"
+
+
+def _next_sample_code(project_code, experiment_code):
+    """Suggested code for a new sample: 'S' + zero-padded (count + 1)."""
+    n = MassSpecSample.query.filter_by(
+        project_code=project_code, experiment_code=experiment_code
+    ).count() + 1
+    return f"S{n:02d}"
+
+
+def _commit_unique(form, field_name, what):
+    """Commit a pending insert, turning a duplicate-key clash into a form error.
+
+    Codes are (part of) the primary key, so re-submitting an existing one — e.g.
+    hitting Save again after navigating back — raises an IntegrityError that would
+    otherwise surface as a 500. We catch the duplicate, roll back, and report it
+    inline on the offending field. Returns True if committed, False if it was a
+    duplicate (in which case the caller should re-render the form). Any other
+    IntegrityError is genuinely unexpected and is re-raised.
+    """
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError as exc:
+        db.session.rollback()
+        if "UNIQUE constraint failed" not in str(getattr(exc, "orig", exc)):
+            raise
+        field = getattr(form, field_name, None)
+        value = field.data if field is not None else ""
+        message = f"{what} “{value}” already exists — please choose a different one."
+        if field is not None:
+            field.errors.append(message)
+        flash(message, "error")
+        return False
+
+
+def _split_token(token):
+    """Split a \x1f-joined token into its parts, or () for an empty value."""
+    return tuple(token.split(TOKEN_SEP)) if token else ()
+
+
+# ---------------------------------------------------------------------------
+# Aggregates for detail pages
+# ---------------------------------------------------------------------------
+FILES_PER_PAGE = 100
+
+# MassSpecSample columns each kind of view renders. Listings load only these
+# (load_only); the crosslink/identification/description groups deferred on the
+# model are undefered only where a whole sample is shown or edited.
+#   SAMPLE_TABLE_COLUMNS  — sample_table macro (sample list, project and
+#                           experiment pages)
+#   SAMPLE_CHOICE_COLUMNS — option lists (copy-from dropdown, file-edit
+#                           cascade, experiment edit page)
+SAMPLE_TABLE_COLUMNS = (
+    MassSpecSample.code, MassSpecSample.name, MassSpecSample.description,
+    MassSpecSample.crosslinked_sample, MassSpecSample.user_initials,
+)
+SAMPLE_CHOICE_COLUMNS = (MassSpecSample.code, MassSpecSample.name, MassSpecSample.crosslinked_sample)
+SAMPLE_DETAIL_OPTIONS = (
+    undefer_group("description"), undefer_group("crosslink"), undefer_group("identification"),
+)
+# Order of the streamed sample tables (by name), as the keys of
+# ix_mass_spec_sample_listing.
+SAMPLE_LISTING_KEYS = (
+    MassSpecSample.name, MassSpecSample.project_code, MassSpecSample.experiment_code, MassSpecSample.code,
+)
+
+
+def _page_arg():
+    try:
+        return max(int(request.args.get("page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+def _sample_file_counts(project_code=None, experiment_code=None):
+    """{(project, experiment, sample): acquired-file count} in one grouped query,
+    so the sample/experiment tables never lazy-load files per row."""
+    q = db.session.query(
+        AcquiredFile.project_code, AcquiredFile.experiment_code, AcquiredFile.sample_code,
+        func.count(),
+    ).filter(AcquiredFile.sample_code.isnot(None))
+    if project_code is not None:
+        q = q.filter(AcquiredFile.project_code == project_code)
+    if experiment_code is not None:
+        q = q.filter(AcquiredFile.experiment_code == experiment_code)
+    q = q.group_by(AcquiredFile.project_code, AcquiredFile.experiment_code, AcquiredFile.sample_code)
+    return {(p, e, s): n for p, e, s, n in q}
+
+
+def _experiment_file_counts(sample_file_counts):
+    counts = defaultdict(int)
+    for (p, e, _), n in sample_file_counts.items():
+        counts[(p, e)] += n
+    return counts
+
+
+def _experiment_sample_counts(project_code=None):
+    q = db.session.query(MassSpecSample.project_code, MassSpecSample.experiment_code, func.count())
+    if project_code is not None:
+        q = q.filter(MassSpecSample.project_code == project_code)
+    q = q.group_by(MassSpecSample.project_code, MassSpecSample.experiment_code)
+    return {(p, e): n for p, e, n in q}
+
+
+def _file_page(query, page):
+    """One page of a file listing, with the relationships file_table renders."""
+    return (
+        query.options(
+            joinedload(AcquiredFile.sample).joinedload(MassSpecSample.experiment).joinedload(Experiment.project)
+        )
+        .order_by(AcquiredFile.file_date.desc(), AcquiredFile.filename)
+        .limit(FILES_PER_PAGE).offset((page - 1) * FILES_PER_PAGE)
+        .all()
+    )
+
+
+# Long listings are streamed: the page head goes out before the first row is
+# read, and rows come from the database in batches of STREAM_BATCH_ROWS, so
+# neither time to first byte nor memory grows with the table. Each batch is a
+# complete statement (keyset paging, see _keyset_rows) rather than one cursor
+# read as the page is sent: an open cursor holds SQLite's read lock, and a
+# slow or stalled browser would then block every writer.
+# Jinja emits many tiny strings; they are sent in chunks of ~STREAM_CHUNK_CHARS.
+# Everything that can fail with an error page (404s, form checks) must happen
+# before the response starts.
+STREAM_BATCH_ROWS = 500
+STREAM_CHUNK_CHARS = 16 * 1024
+
+
+def _keyset_rows(query, *keys):
+    """The entities of ``query`` ordered by ``keys``, read STREAM_BATCH_ROWS
+    at a time, each batch starting after the last row of the one before.
+
+    ``keys`` are columns or column expressions, each optionally ``.desc()``;
+    together they must identify a row, none may be NULL, and an index in the
+    same order keeps every batch a short range scan. A query selecting more
+    than one entity or column yields tuples of them instead.
+    """
+    columns = [
+        (key.element, True) if getattr(key, "modifier", None) is operators.desc_op else (key, False)
+        for key in keys
+    ]
+    width = len(query.column_descriptions)
+    query = query.add_columns(*(column for column, _ in columns)).order_by(*keys)
+    after = None
+    while True:
+        batch = query if after is None else query.filter(_after_key(columns, after))
+        rows = batch.limit(STREAM_BATCH_ROWS).all()
+        for row in rows:
+            yield row[0] if width == 1 else tuple(row[:width])
+        if len(rows) < STREAM_BATCH_ROWS:
+            return
+        after = tuple(rows[-1])[width:]
+
+
+def _after_key(columns, values):
+    """Rows after ``values`` in the order of ``columns`` ((column, descending)
+    pairs): the first key past its value, or equal and the rest past theirs.
+    The leading bound is repeated on its own so it can drive an index range."""
+    clause = None
+    for (column, descending), value in reversed(list(zip(columns, values))):
+        past = column < value if descending else column > value
+        clause = past if clause is None else or_(past, and_(column == value, clause))
+    (first, descending), value = columns[0], values[0]
+    return and_(first <= value if descending else first >= value, clause)
+
+
+def _stream_page(template_name, **context):
+    # Called here, not inside chunks(): stream_template binds the request
+    # context now and re-enters it while the body is being sent.
+    pieces = stream_template(template_name, **context)
+
+    def chunks():
+        buffer, size = [], 0
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= STREAM_CHUNK_CHARS:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    return Response(chunks(), mimetype="text/html")
+
+
+# Part of every API ETag: bump it when the JSON an endpoint returns changes
+# shape, so clients holding the old format refetch.
+API_REVISION = 1
+
+
+def _api_validators(scope, *key):
+    """(ETag, Last-Modified) for a JSON response built from ``scope``'s
+    tables (see data_version in schema.sql) plus any request ``key``."""
+    row = db.session.get(DataVersion, scope)
+    version, changed_at = (row.version, row.changed_at) if row is not None else (0, None)
+    return "-".join(str(part) for part in (scope, API_REVISION, version, *key)), changed_at
@@ -0,0 +1,95 @@
+"""Acquired-file records."""
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from sqlalchemy import String, func, literal_column
+from sqlalchemy.orm import joinedload
+
+from forms import AcquiredFileEditForm, AcquiredFileForm
+from models import AcquiredFile, Experiment, MassSpecSample, Project, User, db
+
+from .common import _exp_token, _keyset_rows, _sample_token, _split_token, _stream_page
+
+
+bp = Blueprint("files", __name__)
+
+# /files order (newest first, then by name), as the keys of
+# ix_acquired_file_listing: NULL dates and names sort as '' so keyset paging
+# can compare them.
+FILE_LISTING_KEYS = (
+    func.ifnull(AcquiredFile.file_date, literal_column("''"), type_=String).desc(),
+    func.ifnull(AcquiredFile.filename, literal_column("''"), type_=String),
+    AcquiredFile.id,
+)
+
+
+@bp.route("/files")
+def file_list():
+    files = _keyset_rows(
+        AcquiredFile.query.options(
+            joinedload(AcquiredFile.sample).joinedload(MassSpecSample.experiment).joinedload(Experiment.project)
+        ),
+        *FILE_LISTING_KEYS,
+    )
+    users = {u.initials: u.name for u in User.query.all()}
+    return _stream_page("file/list.html", files=files, users=users)
+
+
+@bp.route("/projects/<project_code>/experiments/<experiment_code>/samples/<code>/db-files/new", methods=["GET", "POST"])
+def file_create(project_code, experiment_code, code):
+    sample = db.get_or_404(MassSpecSample, (project_code, experiment_code, code))
+    form = AcquiredFileForm()
+    if form.validate_on_submit():
+        f = AcquiredFile(
+            project_code=project_code, experiment_code=experiment_code, sample_code=code
+        )
+        form.populate_obj(f)
+        f.meta = form.meta_json.data
+        if f.size_bytes is not None:
+            f.size_bytes = int(f.size_bytes * 1e9)
+        db.session.add(f)
+        db.session.commit()
+        flash("File record created.", "success")
+        return redirect(url_for("files.file_detail", id=f.id))
+    return render_template("file/form.html", form=form, file=None, sample=sample)
+
+
+@bp.route("/files/<int:id>")
+def file_detail(id):
+    f = db.get_or_404(AcquiredFile, id)
+    return render_template("file/detail.html", file=f)
+
+
+@bp.route("/files/<int:id>/edit", methods=["GET", "POST"])
+def file_edit(id):
+    f = db.get_or_404(AcquiredFile, id)
+    form = AcquiredFileEditForm()
+    form.project_code.choices = [("", "—")] + [
+        (p.code, f"{p.code} — {p.name}")
+        for p in Project.query.order_by(Project.name).all()
+    ]
+    # experiment/sample option lists are fetched by JS from /api/choices; the
+    # server-side choices only need to contain the currently-selected value so
+    # WTForms validates the POST.
+    form.experiment_code.choices = [("", "—")]
+    form.sample_code.choices = [("", "—")]
+    if request.method == "GET" and f.sample is not None:
+        e = f.sample.experiment
+        exp_token = _exp_token(e.project_code, e.code)
+        sample_token = _sample_token(f.sample.project_code, f.sample.experiment_code, f.sample.code)
+        form.experiment_code.choices.append((exp_token, f"{e.code} — {e.name}"))
+        form.sample_code.choices.append((sample_token, f"{f.sample.code} — {f.sample.name}"))
+        form.project_code.data = e.project_code
+        form.experiment_code.data = exp_token
+        form.sample_code.data = sample_token
+    if form.validate_on_submit():
+        # The server only needs the sample token; project/experiment selects are
+        # pure UX scaffolding handled client-side. Decode the posted token into
+        # the composite key and let the FK constraint reject anything bogus.
+        parts = _split_token(request.form.get("sample_code") or "")
+        if len(parts) == 3:
+            f.project_code, f.experiment_code, f.sample_code = parts
+        else:
+            f.project_code = f.experiment_code = f.sample_code = None
+        db.session.commit()
+        flash("File association updated.", "success")
+        return redirect(url_for("files.file_detail", id=f.id))
+    return render_template("file/edit.html", form=form, file=f)
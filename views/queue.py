@@ -0,0 +1,375 @@
+"""Instrument day queues: queuing sample runs and blanks, the queue panel's
+JSON API and sequence-file export."""
+import re
+from collections import defaultdict
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, url_for
+from sqlalchemy import false, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+import http_cache
+from models import Instrument, MassSpecSample, QueueHighWater, QueueVersion, QueuedFile, QueuedFileArchive, db
+from sequence_export import SEQUENCE_TEMPLATES, SequenceCache, SequenceRun
+
+from .common import _api_validators
+
+
+bp = Blueprint("queue", __name__)
+
+
+def queued_filename(qf):
+    """Build the run filename for a QueuedFile row.
+
+    Sample run: {inst}_{YYYYMMDD}-{NNN}_{proj}_{user}_{exp}_{samp}_{postfix}
+    Blank run:  {inst}_{YYYYMMDD}_BLANK-AND-CLEANING
+    NNN = run_number (sample runs only, blanks excluded) padded to 3 digits;
+    blanks carry no NNN at all.
+
+    file_name_root is the DB-generated part up to and including the '_' before the
+    postfix, so the full filename is just root + postfix.
+    """
+    root = qf.file_name_root  # ends with the '_' separator before the postfix
+    if qf.sample_code:
+        return f"{root}{qf.postfix}" if qf.postfix else root[:-1]
+    # Blank / cleaning run — postfix carries the label.
+    return f"{root}{qf.postfix or 'BLANK-AND-CLEANING'}"
+
+
+def _parse_queue_date(date_str):
+    try:
+        return datetime.strptime(date_str, "%Y%m%d").date()
+    except (ValueError, TypeError):
+        abort(400, "date must be YYYYMMDD")
+
+
+def _queue_max(column, archived_column, instrument, day):
+    """Highest value of a numbering column for an instrument's day, across both
+    the live queue and the high-water mark left behind by archived rows."""
+    live = (
+        db.select(func.max(column))
+        .filter_by(instrument_initial=instrument, date_queued=day)
+        .scalar_subquery()
+    )
+    archived = (
+        db.select(archived_column)
+        .filter_by(instrument_initial=instrument, date_queued=day)
+        .scalar_subquery()
+    )
+    return db.session.execute(
+        db.select(func.max(func.coalesce(live, 0), func.coalesce(archived, 0)))
+    ).scalar()
+
+
+def _next_daily_counter(instrument, day):
+    """Next run-order slot for an instrument on a day (append to the end).
+
+    Counts *all* rows for the day, including exported and archived ones, on
+    purpose: clearing the queue marks rows exported instead of deleting them, and
+    archiving them leaves a high-water mark, so the counter keeps climbing and
+    never re-uses a run number already burned into an exported CSV.
+    """
+    return _queue_max(
+        QueuedFile.daily_counter, QueueHighWater.daily_counter, instrument, day
+    ) + 1
+
+
+def _next_run_number(instrument, day):
+    """Next sample run number for an instrument on a day.
+
+    Counts only sample runs (``run_number`` is NULL on BLANK-AND-CLEANING rows),
+    so blanks never consume a run number and the per-day sample numbering stays
+    contiguous regardless of how many blanks are interleaved.
+    """
+    return _queue_max(
+        QueuedFile.run_number, QueueHighWater.run_number, instrument, day
+    ) + 1
+
+
+def _append_to_queue(instrument, day, build_rows, attempts=5):
+    """Append rows to an instrument's day queue, race-safe.
+
+    ``build_rows(counter_start, run_start)`` returns the ``QueuedFile`` rows to
+    insert, numbered from the first free ``daily_counter`` (the PK ordering slot)
+    and ``run_number`` (the sample run number). Two concurrent requests can read
+    the same maxima and pick the same slot; the loser's commit then violates the
+    composite PK. We catch that, roll back, recompute both, and retry the whole
+    (re-numbered) batch — each attempt commits atomically, so there are never
+    partial inserts. Recomputing run_start in lockstep with the PK slot keeps
+    sample run numbers unique even though they aren't themselves part of the PK.
+    """
+    for _ in range(attempts):
+        rows = build_rows(
+            _next_daily_counter(instrument, day), _next_run_number(instrument, day)
+        )
+        db.session.add_all(rows)
+        try:
+            db.session.commit()
+            return rows
+        except IntegrityError:
+            db.session.rollback()
+    abort(409, "Could not assign a queue slot — please retry.")
+
+
+def _day_queue_json(day):
+    """Snapshot of the queue for one day: tab list + rows grouped by instrument."""
+    # Literal false() (not a bound False) so SQLite can match the predicate to
+    # the partial ix_queued_file_pending* indexes.
+    instruments = [
+        r[0] for r in db.session.query(QueuedFile.instrument_initial)
+        .filter(QueuedFile.exported == false())
+        .distinct().order_by(QueuedFile.instrument_initial).all()
+    ]
+    rows = (
+        QueuedFile.query.options(joinedload(QueuedFile.sample))
+        .filter(QueuedFile.date_queued == day, QueuedFile.exported == false())
+        .order_by(QueuedFile.instrument_initial, QueuedFile.daily_counter)
+        .all()
+    )
+    queues = defaultdict(list)
+    for qf in rows:
+        queues[qf.instrument_initial].append({
+            "daily_counter": qf.daily_counter,
+            "run_number": qf.run_number,
+            "filename": queued_filename(qf),
+            "postfix": qf.postfix,
+            "user_initials": qf.user_initials,
+            "project_code": qf.project_code,
+            "experiment_code": qf.experiment_code,
+            "sample_code": qf.sample_code,
+            "sample_url": (
+                url_for("catalogue.sample_detail", project_code=qf.project_code,
+                        experiment_code=qf.experiment_code, code=qf.sample_code)
+                if qf.sample_code else None
+            ),
+            "is_blank": not qf.sample_code,
+        })
+    return {"date": day.isoformat(), "instruments": instruments, "queues": dict(queues)}
+
+
+def _sequence_template(instrument):
+    """Export template for an instrument; unregistered instruments (and unknown
+    template keys) fall back to Xcalibur, the layout every instrument used
+    before the registry existed."""
+    key = instrument.sequence_template if instrument is not None else None
+    return SEQUENCE_TEMPLATES.get(key) or SEQUENCE_TEMPLATES["xcalibur"]
+
+
+def _sequence_runs(rows):
+    return [
+        SequenceRun(
+            filename=queued_filename(qf),
+            label=(f"{qf.project_code}_{qf.experiment_code}_{qf.sample_code}"
+                   if qf.sample_code else None),
+            sample_name=qf.sample.name if qf.sample else "",
+            is_blank=not qf.sample_code,
+        )
+        for qf in rows
+    ]
+
+
+@bp.route(
+    "/projects/<project_code>/experiments/<experiment_code>/samples/<code>/queue",
+    methods=["POST"],
+)
+def sample_queue(project_code, experiment_code, code):
+    """Append a batch of runs for one sample to an instrument's day queue."""
+    db.get_or_404(MassSpecSample, (project_code, experiment_code, code))
+    data = request.get_json(silent=True) or {}
+    inst = (data.get("instrument_initial") or "").strip()
+    user = (data.get("user_initials") or "").strip()
+    day = _parse_queue_date((data.get("date") or "").strip())
+    try:
+        count = int(data.get("count"))
+    except (TypeError, ValueError):
+        abort(400, "count must be an integer")
+    if not inst or not user:
+        abort(400, "instrument_initial and user_initials are required")
+    if count < 1:
+        abort(400, "count must be >= 1")
+
+    _append_to_queue(inst, day, lambda counter_start, run_start: [
+        QueuedFile(
+            instrument_initial=inst,
+            date_queued=day,
+            daily_counter=counter_start + i,
+            run_number=run_start + i,
+            project_code=project_code,
+            experiment_code=experiment_code,
+            sample_code=code,
+            user_initials=user,
+            postfix=f"f{i + 1:02d}",
+        )
+        for i in range(count)
+    ])
+    return jsonify(_day_queue_json(day))
+
+
+@bp.route("/api/queue/lookup")
+def api_queue_lookup():
+    """Resolve a raw-file name (or path) to the queued sample run it was
+    acquired for: one probe of the unique run_name index, then of the
+    archive's run_name index for runs moved out by `flask archive-queue`."""
+    filename = (request.args.get("filename") or "").strip()
+    if not filename:
+        abort(400, "filename is required")
+    # Same rule as acquired_file.run_name: the name up to its first '.', so
+    # X.raw, X.d and X.mzML all resolve to run X.
+    run_name = re.split(r"[\\/]", filename)[-1].split(".", 1)[0]
+    qf = (
+        QueuedFile.query.options(joinedload(QueuedFile.sample).load_only(MassSpecSample.name))
+        .filter(QueuedFile.run_name == run_name, QueuedFile.run_number.isnot(None))
+        .one_or_none()
+    )
+    archived = qf is None
+    if archived:
+        qf = (
+            QueuedFileArchive.query
+            .filter(QueuedFileArchive.run_name == run_name, QueuedFileArchive.run_number.isnot(None))
+            .order_by(QueuedFileArchive.date_queued.desc())
+            .first()
+        )
+    if qf is None:
+        abort(404, f"no queued sample run named {run_name}")
+    # The archive has no sample relationship (it outlives sample deletion).
+    sample = (
+        db.session.get(MassSpecSample, (qf.project_code, qf.experiment_code, qf.sample_code))
+        if archived else qf.sample
+    )
+    return jsonify({
+        "run_name": run_name,
+        "instrument_initial": qf.instrument_initial,
+        "date": qf.date_queued.strftime("%Y%m%d"),
+        "daily_counter": qf.daily_counter,
+        "run_number": qf.run_number,
+        "exported": True if archived else qf.exported,
+        "archived": archived,
+        "user_initials": qf.user_initials,
+        "project_code": qf.project_code,
+        "experiment_code": qf.experiment_code,
+        "sample_code": qf.sample_code,
+        "sample_name": sample.name if sample else None,
+        "sample_url": url_for(
+            "catalogue.sample_detail", project_code=qf.project_code,
+            experiment_code=qf.experiment_code, code=qf.sample_code,
+        ) if sample else None,
+    })
+
+
+@bp.route("/api/queue")
+def api_queue():
+    date_str = (request.args.get("date") or "").strip()
+    day = _parse_queue_date(date_str) if date_str else date.today()
+    # The day is part of the tag: without ?date the answer changes at midnight.
+    etag, changed_at = _api_validators("queue", day.isoformat())
+    cached = http_cache.not_modified(etag, changed_at)
+    if cached is not None:
+        return cached
+    return http_cache.validate(jsonify(_day_queue_json(day)), etag, changed_at)
+
+
+@bp.route("/api/queue/blank", methods=["POST"])
+def api_queue_blank():
+    data = request.get_json(silent=True) or {}
+    inst = (data.get("instrument_initial") or "").strip()
+    user = (data.get("user_initials") or "").strip() or None
+    day = _parse_queue_date((data.get("date") or "").strip())
+    if not inst:
+        abort(400, "instrument_initial is required")
+    # run_number is left NULL so the blank doesn't consume a sample run number
+    # and its filename carries no -NN (see file_name_root).
+    _append_to_queue(inst, day, lambda counter_start, run_start: [QueuedFile(
+        instrument_initial=inst,
+        date_queued=day,
+        daily_counter=counter_start,
+        user_initials=user,
+        postfix="BLANK-AND-CLEANING",
+    )])
+    return jsonify(_day_queue_json(day))
+
+
+def _queue_row_or_404(data):
+    inst = (data.get("instrument_initial") or "").strip()
+    day = _parse_queue_date((data.get("date") or "").strip())
+    try:
+        counter = int(data.get("daily_counter"))
+    except (TypeError, ValueError):
+        abort(400, "daily_counter must be an integer")
+    qf = db.session.get(QueuedFile, (inst, day, counter))
+    if qf is None:
+        abort(404)
+    return qf, day
+
+
+@bp.route("/api/queue/update", methods=["POST"])
+def api_queue_update():
+    data = request.get_json(silent=True) or {}
+    qf, day = _queue_row_or_404(data)
+    qf.postfix = (data.get("postfix") or "").strip() or None
+    db.session.commit()
+    return jsonify(_day_queue_json(day))
+
+
+@bp.route("/api/queue/delete", methods=["POST"])
+def api_queue_delete():
+    data = request.get_json(silent=True) or {}
+    qf, day = _queue_row_or_404(data)
+    db.session.delete(qf)
+    db.session.commit()
+    return jsonify(_day_queue_json(day))
+
+
+@bp.route("/api/queue/clear", methods=["POST"])
+def api_queue_clear():
+    """Hide an instrument's day queue by marking its runs exported (not deleted),
+    so the daily_counter keeps climbing for any runs re-queued the same day."""
+    data = request.get_json(silent=True) or {}
+    inst = (data.get("instrument_initial") or "").strip()
+    day = _parse_queue_date((data.get("date") or "").strip())
+    if not inst:
+        abort(400, "instrument_initial is required")
+    QueuedFile.query.filter_by(
+        instrument_initial=inst, date_queued=day, exported=False
+    ).update({"exported": True})
+    db.session.commit()
+    return jsonify(_day_queue_json(day))
+
+
+@bp.route("/api/queue/csv")
+def api_queue_csv():
+    inst = (request.args.get("instrument") or "").strip()
+    day = _parse_queue_date((request.args.get("date") or "").strip())
+    if not inst:
+        abort(400, "instrument is required")
+    instrument = db.session.get(Instrument, inst)
+    template = _sequence_template(instrument)
+    # The version is bumped by triggers on every change to this day queue, so
+    # together with the row's token (which tells databases apart) and the
+    # instrument's settings it fully determines the file, and a repeat
+    # download skips the row query and sample join entirely.
+    token, version = (
+        db.session.query(QueueVersion.token, QueueVersion.version)
+        .filter_by(instrument_initial=inst, date_queued=day)
+        .first()
+    ) or (None, 0)
+    key = SequenceCache.key(
+        inst, day.isoformat(), token, version, template.key, template.revision,
+        template.data_path(day, instrument), template.method(instrument),
+    )
+    cache = current_app.extensions["sequence_cache"]
+    data = cache.get(key)
+    if data is None:
+        rows = (
+            QueuedFile.query.options(joinedload(QueuedFile.sample))
+            .filter_by(instrument_initial=inst, date_queued=day)
+            .order_by(QueuedFile.daily_counter)
+            .all()
+        )
+        data = template.render(_sequence_runs(rows), day, instrument)
+        cache.put(key, data)
+    resp = Response(data, mimetype=template.mimetype)
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="{inst}_{day:%Y%m%d}_sequence.{template.extension}"'
+    )
+    return resp
@@ -0,0 +1,213 @@
+"""Reports over the whole catalogue: instrument usage and statistics, queue
+reconciliation, disk usage and, while profiling, the SQL query report.
+
+Rarely visited, so this module is not imported with the app: views/__init__.py
+registers these functions' URL rules with lazy views, and the first request
+to one of them imports it.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from flask import abort, current_app, jsonify, render_template, request
+from sqlalchemy import func
+
+import instrument_stats
+import query_profiler
+import reconciliation
+from models import AcquiredFile, Experiment, InstrumentDayStats, MassSpecSample, Project, db
+
+
+# SQL expressions bucketing acquired_file.file_date (an ISO date string) to the
+# first day of its day / ISO week (Monday) / month.
+USAGE_BUCKETS = {
+    "day": lambda col: func.date(col),
+    "week": lambda col: func.date(col, "-6 days", "weekday 1"),
+    "month": lambda col: func.strftime("%Y-%m-01", col),
+}
+
+
+def _parse_iso_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        abort(400, f"{name} must be YYYY-MM-DD")
+
+
+def _usage_window():
+    """(start, end, bucket) from the query string.
+
+    Defaults to the year up to the latest acquisition (not today, so a database
+    that stopped receiving files still shows something), and to a bucket width
+    that keeps the chart to at most a few hundred bars.
+    """
+    end_arg = request.args.get("end")
+    if end_arg:
+        end = _parse_iso_date(end_arg, "end")
+    else:
+        latest = db.session.query(func.max(AcquiredFile.file_date)).scalar()
+        end = latest or date.today()
+    start_arg = request.args.get("start")
+    start = _parse_iso_date(start_arg, "start") if start_arg else end - timedelta(days=365)
+    if start > end:
+        abort(400, "start must not be after end")
+    bucket = request.args.get("bucket") or "auto"
+    if bucket == "auto":
+        span = (end - start).days
+        bucket = "day" if span <= 92 else "week" if span <= 2 * 366 else "month"
+    if bucket not in USAGE_BUCKETS:
+        abort(400, "bucket must be one of auto, day, week, month")
+    return start, end, bucket
+
+
+def api_instrument_usage():
+    """Acquired bytes per instrument, bucket and project, as columnar arrays.
+
+    Filtering and bucketing happen in SQL over the date-ordered index, so the
+    response covers only the requested window. Per instrument: ``dates`` (bucket
+    start) and, for each project, a ``bytes`` array aligned to ``dates``.
+    """
+    start, end, bucket = _usage_window()
+    period = USAGE_BUCKETS[bucket](AcquiredFile.file_date).label("period")
+    q = (
+        db.session.query(
+            AcquiredFile.instrument_initial, period, AcquiredFile.project_code,
+            func.sum(AcquiredFile.size_bytes).label("total_bytes"),
+        )
+        # A file with a project_code must reference a real sample (FK), so
+        # there's no need to join through sample/experiment/project.
+        .filter(AcquiredFile.project_code.isnot(None))
+        .filter(AcquiredFile.instrument_initial.isnot(None))
+        .filter(AcquiredFile.file_date.between(start, end))
+    )
+    instrument = (request.args.get("instrument") or "").strip()
+    if instrument:
+        q = q.filter(AcquiredFile.instrument_initial == instrument)
+    rows = (
+        q.group_by(AcquiredFile.instrument_initial, period, AcquiredFile.project_code)
+        .order_by(AcquiredFile.instrument_initial, period)
+        .all()
+    )
+    cells = defaultdict(dict)
+    for inst, day, project, total in rows:
+        cells[inst][(day, project)] = int(total or 0)
+    instruments = {}
+    for inst, values in cells.items():
+        dates = sorted({d for d, _ in values})
+        projects = sorted({p for _, p in values})
+        instruments[inst] = {
+            "dates": dates,
+            "projects": projects,
+            "bytes": {p: [values.get((d, p), 0) for d in dates] for p in projects},
+        }
+    return jsonify({
+        "start": start.isoformat(), "end": end.isoformat(), "bucket": bucket,
+        "instruments": instruments,
+    })
+
+
+def instrument_usage():
+    # The page is a shell; the chart fetches its window from the API above.
+    return render_template("instrument_usage.html")
+
+
+def instrument_stats_view():
+    """Throughput per instrument over a window, from the materialised daily stats."""
+    latest = db.session.query(func.max(InstrumentDayStats.day)).scalar() or date.today()
+    end = _parse_iso_date(request.args["end"], "end") if request.args.get("end") else latest
+    start = (
+        _parse_iso_date(request.args["start"], "start") if request.args.get("start")
+        else end - timedelta(days=29)
+    )
+    in_window = InstrumentDayStats.day.between(start, end)
+    summary = (
+        db.session.query(
+            InstrumentDayStats.instrument_initial,
+            func.count().label("days"),
+            func.sum(InstrumentDayStats.queued_runs).label("queued_runs"),
+            func.sum(InstrumentDayStats.blank_runs).label("blank_runs"),
+            func.sum(InstrumentDayStats.acquired_files).label("acquired_files"),
+            func.sum(InstrumentDayStats.acquired_bytes).label("acquired_bytes"),
+            func.sum(InstrumentDayStats.matched_runs).label("matched_runs"),
+            func.sum(InstrumentDayStats.lag_days_total).label("lag_days_total"),
+        )
+        .filter(in_window)
+        .group_by(InstrumentDayStats.instrument_initial)
+        .order_by(InstrumentDayStats.instrument_initial)
+        .all()
+    )
+    daily = defaultdict(list)
+    for row in (
+        InstrumentDayStats.query.filter(in_window)
+        .order_by(InstrumentDayStats.instrument_initial, InstrumentDayStats.day.desc())
+    ):
+        daily[row.instrument_initial].append(row)
+    refreshed_at = db.session.query(func.max(InstrumentDayStats.refreshed_at)).scalar()
+    return render_template(
+        "instrument_stats.html", start=start, end=end, summary=summary, daily=daily,
+        window_days=(end - start).days + 1, refreshed_at=refreshed_at,
+        pending_days=instrument_stats.pending_days(db.session),
+    )
+
+
+def reconciliation_view():
+    """Queued runs with no acquired file and acquired files with no queued run.
+
+    Per-day counts come from the materialised daily stats; the two lists are
+    index-probe queries over the window, capped at RECONCILIATION_LIMIT rows.
+    """
+    latest = db.session.query(func.max(InstrumentDayStats.day)).scalar() or date.today()
+    end = _parse_iso_date(request.args["end"], "end") if request.args.get("end") else latest
+    start = (
+        _parse_iso_date(request.args["start"], "start") if request.args.get("start")
+        else end - timedelta(days=6)
+    )
+    instrument = request.args.get("instrument") or None
+    query = InstrumentDayStats.query.filter(
+        InstrumentDayStats.day.between(start, end),
+        (InstrumentDayStats.queued_runs > InstrumentDayStats.matched_runs)
+        | (InstrumentDayStats.orphan_files > 0),
+    )
+    if instrument:
+        query = query.filter(InstrumentDayStats.instrument_initial == instrument)
+    days = query.order_by(InstrumentDayStats.day.desc(), InstrumentDayStats.instrument_initial).all()
+    limit = current_app.config["RECONCILIATION_LIMIT"]
+    instruments = [
+        i for (i,) in db.session.query(InstrumentDayStats.instrument_initial)
+        .distinct().order_by(InstrumentDayStats.instrument_initial)
+    ]
+    return render_template(
+        "reconciliation.html", start=start, end=end, instrument=instrument,
+        instruments=instruments, days=days, limit=limit,
+        missing=reconciliation.missing_runs(db.session, start, end, instrument, limit),
+        orphans=reconciliation.orphan_files(db.session, start, end, instrument, limit),
+        refreshed_at=db.session.query(func.max(InstrumentDayStats.refreshed_at)).scalar(),
+        pending_days=instrument_stats.pending_days(db.session),
+    )
+
+
+def disk_usage():
+    rows = (
+        db.session.query(
+            Project.code.label("project_code"),
+            func.sum(AcquiredFile.size_bytes).label("total_bytes"),
+        )
+        .join(AcquiredFile.sample)
+        .join(MassSpecSample.experiment)
+        .join(Experiment.project)
+        .group_by(Project.code)
+        .order_by(func.sum(AcquiredFile.size_bytes).desc())
+        .all()
+    )
+    data = [
+        {"project": row.project_code, "gb": round((row.total_bytes or 0) / 1e9, 4)}
+        for row in rows
+    ]
+    return render_template("disk_usage.html", data=data)
+
+
+def debug_queries():
+    profiler = current_app.extensions["query_profiler"]
+    return render_template(
+        "debug/queries.html", requests=list(profiler.recent),
+        threshold=query_profiler.REPEAT_THRESHOLD, budget=current_app.config["QUERY_STATEMENT_BUDGET"],
+    )